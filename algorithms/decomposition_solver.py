@@ -0,0 +1,191 @@
+"""
+Decomposition solver for the Synthetic Errands Scheduler.
+
+Splits an instance into partitions that are solved independently in worker processes
+with any registered algorithm:
+- regions: the city grid is cut along road lines into rectangles with about the same
+  number of customers each (recursive bisection of the longer side). Customers and
+  contractors belong to the region of their (initial) location.
+- week blocks (optional): the scheduling horizon is cut into blocks of seven days.
+  Each region's customers are dealt out to the blocks in proportion to their length,
+  and each block's copy of a contractor has the days outside the block blocked.
+
+Partition results come back as compact assignment arrays and are replayed into the
+contractors' calendars. Customers left unscheduled, because their partition ran out
+of capacity or has no contractors, are then inserted across partition borders by the
+greedy scheduler over all contractors.
+"""
+
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from constants import (DECOMPOSITION_ALGORITHM, DECOMPOSITION_REGIONS, DECOMPOSITION_WEEK_BLOCKS,
+                       DECOMPOSITION_WORKERS)
+from models.contractor import Contractor
+from models.customer import Customer
+from models.schedule import Schedule
+from algorithms.initial_greedy_scheduler import GreedyScheduler, build_travel_matrix
+from algorithms.registry import register_algorithm, get_algorithm, as_customer_list
+from utils.city_map import GRID_SIZE, ROAD_SPACING
+from utils.planning_context import PlanningContext, get_planning_context
+from utils.travel_matrix import TravelMatrix
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# Travel matrix shared by the partitions of a worker process, set by the pool initializer.
+_worker_travel_matrix: Optional[TravelMatrix] = None
+
+Region = Tuple[int, int, int, int]  # x_start, x_end, y_start, y_end (half-open)
+
+DAYS_PER_BLOCK = 7
+
+@register_algorithm('decomposition')
+def decomposition_schedule(customers: Iterable[Customer], contractors: List[Contractor],
+                           travel_matrix: Optional[TravelMatrix] = None, algorithm: str = DECOMPOSITION_ALGORITHM,
+                           num_regions: int = DECOMPOSITION_REGIONS, week_blocks: bool = DECOMPOSITION_WEEK_BLOCKS,
+                           num_workers: Optional[int] = DECOMPOSITION_WORKERS) -> Schedule:
+    """Create a schedule by solving regions (and week blocks) of the instance in parallel."""
+    customers = as_customer_list(customers)
+    solver = DecompositionSolver(customers, contractors, algorithm, num_regions, week_blocks, num_workers, travel_matrix)
+    return solver.solve()
+
+def split_regions(points: np.ndarray, region: Region, count: int) -> List[Region]:
+    """
+    Cut a region along road lines into `count` regions with about equal numbers of points.
+
+    Fewer regions are returned when a region is too narrow to cut further.
+    """
+    if count <= 1:
+        return [region]
+    x_start, x_end, y_start, y_end = region
+    axis = 0 if x_end - x_start >= y_end - y_start else 1
+    low, high = (x_start, x_end) if axis == 0 else (y_start, y_end)
+    low_count = count // 2
+    if len(points):
+        cut = float(np.quantile(points[:, axis], low_count / count))
+    else:
+        cut = low + (high - low) * low_count / count
+    # Cut on the nearest road line inside the region, so that no block between roads is split.
+    cut = min(max(int(round(cut / ROAD_SPACING)) * ROAD_SPACING, low + 1), high - 1)
+    if cut <= low or cut >= high:
+        return [region]
+    below = points[:, axis] < cut
+    if axis == 0:
+        low_region, high_region = (x_start, cut, y_start, y_end), (cut, x_end, y_start, y_end)
+    else:
+        low_region, high_region = (x_start, x_end, y_start, cut), (x_start, x_end, cut, y_end)
+    return (split_regions(points[below], low_region, low_count) +
+            split_regions(points[~below], high_region, count - low_count))
+
+def region_of(location: Tuple[int, int], regions: Sequence[Region]) -> int:
+    x, y = location
+    for index, (x_start, x_end, y_start, y_end) in enumerate(regions):
+        if x_start <= x < x_end and y_start <= y < y_end:
+            return index
+    return len(regions) - 1
+
+class DecompositionSolver:
+    def __init__(self, customers: List[Customer], contractors: List[Contractor],
+                 algorithm: str = DECOMPOSITION_ALGORITHM, num_regions: int = DECOMPOSITION_REGIONS,
+                 week_blocks: bool = DECOMPOSITION_WEEK_BLOCKS, num_workers: Optional[int] = DECOMPOSITION_WORKERS,
+                 travel_matrix: Optional[TravelMatrix] = None):
+        if num_regions < 1:
+            raise ValueError("The decomposition needs at least one region")
+        if algorithm == 'decomposition':
+            raise ValueError("The decomposition solver cannot solve its own partitions")
+        get_algorithm(algorithm)  # Fail early on unknown names.
+        self.customers = customers
+        self.contractors = contractors
+        self.algorithm = algorithm
+        self.travel_matrix = travel_matrix
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.context: PlanningContext = contractors[0].calendar.context if contractors else get_planning_context()
+        num_days = self.context.num_days
+
+        points = np.array([customer.location for customer in customers], dtype=np.int64).reshape(-1, 2)
+        self.regions: List[Region] = split_regions(points, (0, GRID_SIZE, 0, GRID_SIZE), num_regions)
+        if week_blocks:
+            self.blocks: List[range] = [range(start, min(start + DAYS_PER_BLOCK, num_days))
+                                        for start in range(0, num_days, DAYS_PER_BLOCK)]
+        else:
+            self.blocks = [range(num_days)]
+
+    def partitions(self) -> List[Tuple[List[Customer], List[Contractor]]]:
+        """The (customers, contractors) sub-problems, one per region and block that has both."""
+        region_customers: List[List[Customer]] = [[] for _ in self.regions]
+        region_contractors: List[List[Contractor]] = [[] for _ in self.regions]
+        for customer in self.customers:
+            region_customers[region_of(customer.location, self.regions)].append(customer)
+        for contractor in self.contractors:
+            region_contractors[region_of(contractor.initial_location, self.regions)].append(contractor)
+
+        # Block of each day, to deal customers out to blocks in proportion to their number of days.
+        # Copies in this context with the request time fixed, so that workers charge as this process does.
+        context = self.context.frozen()
+        block_of_day = np.concatenate([np.full(len(block), index) for index, block in enumerate(self.blocks)])
+        partitions = []
+        for customers, contractors in zip(region_customers, region_contractors):
+            if not customers or not contractors:
+                continue
+            days = ((np.arange(len(customers)) + 0.5) * self.context.num_days / len(customers)).astype(np.int64)
+            customer_blocks = block_of_day[days]
+            for index, block in enumerate(self.blocks):
+                block_customers = [customer for customer, customer_block in zip(customers, customer_blocks)
+                                   if customer_block == index]
+                if not block_customers:
+                    continue
+                block_contractors = []
+                for contractor in contractors:
+                    copy = contractor.copy_unscheduled(context)
+                    for day in range(self.context.num_days):
+                        if day not in block:
+                            copy.calendar.block_day(day)
+                    block_contractors.append(copy)
+                partitions.append((block_customers, block_contractors))
+        return partitions
+
+    def solve(self) -> Schedule:
+        """Solve the partitions in parallel, merge them and insert the customers left over across borders."""
+        partitions = self.partitions()
+        num_workers = max(1, min(self.num_workers, len(partitions)))
+        # The travel matrix goes to each worker once, not with every partition.
+        tasks = [(self.algorithm, customers, contractors) for customers, contractors in partitions]
+        if num_workers == 1:
+            _init_worker(self.travel_matrix)
+            results = [_solve_partition(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker,
+                                     initargs=(self.travel_matrix,)) as executor:
+                results = list(executor.map(_solve_partition, tasks))
+
+        compact = np.concatenate(results) if results else np.zeros((0, 4), dtype=np.int64)
+        Schedule.from_compact(self.contractors, self.customers, compact, self.travel_matrix)
+        logger.info(f"Decomposition solved {len(partitions)} partitions ({len(self.regions)} regions, "
+                    f"{len(self.blocks)} blocks) on {num_workers} workers with '{self.algorithm}': "
+                    f"{len(compact)} of {len(self.customers)} customers scheduled")
+
+        scheduled = set(compact[:, 0].tolist())
+        remaining = [customer for customer in self.customers if customer.id not in scheduled]
+        if remaining:
+            travel_matrix = self.travel_matrix
+            if travel_matrix is None:
+                travel_matrix = build_travel_matrix(remaining, self.contractors)
+            # The greedy run's schedule knows all customers, as the calendars hold the partitions' errands.
+            GreedyScheduler(remaining, self.contractors, travel_matrix=travel_matrix,
+                            schedule=Schedule(self.contractors, self.customers, travel_matrix)).generate_schedule()
+            for contractor in self.contractors:
+                contractor.reset_location()
+        schedule = Schedule(self.contractors, self.customers, self.travel_matrix)
+        logger.info(f"Decomposition completed. Total profit: ${schedule.calculate_total_profit():.2f}")
+        return schedule
+
+def _init_worker(travel_matrix: Optional[TravelMatrix]) -> None:
+    global _worker_travel_matrix
+    _worker_travel_matrix = travel_matrix
+
+def _solve_partition(task: Tuple[str, List[Customer], List[Contractor]]) -> np.ndarray:
+    """Solve one partition with the named algorithm and the worker's travel matrix, returning its compact assignments."""
+    algorithm, customers, contractors = task
+    return get_algorithm(algorithm)(customers, contractors, travel_matrix=_worker_travel_matrix).to_compact()
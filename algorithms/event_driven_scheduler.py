@@ -0,0 +1,192 @@
+"""
+Event-driven greedy scheduler for the Synthetic Errands Scheduler.
+
+Instead of looping over days and re-scanning every unscheduled customer against every
+contractor, this scheduler keeps a priority queue of contractor "next free minute"
+events. It repeatedly takes the earliest-free contractor and gives them the pending
+customer with the shortest travel time that still fits in their current free
+interval. Pending customers are grouped by location and errand type, and the
+locations with pending customers are kept in a spatial index, so each decision only
+looks at the customers around the contractor.
+
+Like the day-loop greedy, every day of the scheduling period is used and contractors
+start each day from their initial location.
+"""
+
+import heapq
+import logging
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+from models.schedule import Schedule
+from models.customer import Customer
+from models.contractor import Contractor
+from algorithms.initial_greedy_scheduler import build_travel_matrix
+from utils.spatial_index import SpatialIndex
+from utils.travel_matrix import TravelMatrix
+from utils.time_utils import MINUTES_PER_DAY
+from algorithms.registry import register_algorithm, as_customer_list
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+Point = Tuple[int, int]
+
+@register_algorithm('event_driven')
+def event_driven_schedule(customers: Iterable[Customer], contractors: List[Contractor],
+                          travel_matrix: Optional[TravelMatrix] = None) -> Schedule:
+    """Create an initial schedule with the event-driven greedy algorithm."""
+    customers = as_customer_list(customers)
+    if travel_matrix is None:
+        travel_matrix = build_travel_matrix(customers, contractors)
+    scheduler = EventDrivenScheduler(customers, contractors, travel_matrix)
+    return scheduler.generate_schedule()
+
+class EventDrivenScheduler:
+    def __init__(self, customers: List[Customer], contractors: List[Contractor], travel_matrix: Optional[TravelMatrix] = None):
+        self.customers = customers
+        self.contractors = contractors
+        self.schedule = Schedule(contractors, customers, travel_matrix)
+        self.unscheduled_customers: List[Customer] = list(customers)
+
+        # List positions of the pending customers, and the customers grouped by location and errand (type, base minutes).
+        self._positions: Dict[int, int] = {customer.id: position for position, customer in enumerate(customers)}
+        self._pending: Dict[Point, Dict[Tuple, Deque[Customer]]] = {}
+        self._pending_index = SpatialIndex()
+        self._pending_counts: Dict[Tuple, int] = {}
+        self._pending_count: int = 0
+        for customer in customers:
+            self._add_pending(customer)
+
+        # Free intervals of each contractor over the period, the one being filled, and the day it is on.
+        self._free_intervals: List[List[Tuple[int, int]]] = []
+        for contractor in contractors:
+            calendar = self.schedule.contractor_calendars[contractor.id]
+            self._free_intervals.append([interval for day in range(len(calendar.errands))
+                                         for interval in calendar.get_free_intervals_minutes(day)])
+        self._interval_positions: List[int] = [0] * len(contractors)
+        self._contractor_days: List[Optional[int]] = [None] * len(contractors)
+        self._events: List[Tuple[int, int]] = []
+
+    @staticmethod
+    def _errand_key(customer: Customer) -> Tuple:
+        return customer.desired_errand.type, customer.desired_errand.base_minutes
+
+    def _add_pending(self, customer: Customer) -> None:
+        key = self._errand_key(customer)
+        by_errand = self._pending.get(customer.location)
+        if by_errand is None:
+            by_errand = self._pending[customer.location] = {}
+            self._pending_index.insert(customer.location, customer.location)
+        by_errand.setdefault(key, deque()).append(customer)
+        self._pending_counts[key] = self._pending_counts.get(key, 0) + 1
+        self._pending_count += 1
+
+    def _remove_pending(self, customer: Customer) -> None:
+        """Remove a customer that is first in line at its location."""
+        key = self._errand_key(customer)
+        by_errand = self._pending[customer.location]
+        by_errand[key].popleft()
+        if not by_errand[key]:
+            del by_errand[key]
+            if not by_errand:
+                del self._pending[customer.location]
+                self._pending_index.remove(customer.location)
+        self._pending_counts[key] -= 1
+        if not self._pending_counts[key]:
+            del self._pending_counts[key]
+        self._pending_count -= 1
+
+    def generate_schedule(self) -> Schedule:
+        """Generate the complete schedule by processing contractor events in time order."""
+        for row in range(len(self.contractors)):
+            self._push_current_interval(row)
+
+        while self._events and self._pending_count:
+            minute, row = heapq.heappop(self._events)
+            self.process_event(minute, row)
+
+        self.unscheduled_customers = [customer for customer in self.customers if customer.id in self._positions]
+        self.log_results()
+        return self.schedule
+
+    def _push_current_interval(self, row: int) -> None:
+        """Queue the start of the contractor's current free interval, if any remain."""
+        position = self._interval_positions[row]
+        if position < len(self._free_intervals[row]):
+            heapq.heappush(self._events, (self._free_intervals[row][position][0], row))
+
+    def _advance_interval(self, row: int) -> None:
+        self._interval_positions[row] += 1
+        self._push_current_interval(row)
+
+    def process_event(self, minute: int, row: int) -> None:
+        """Assign the best pending customer to a contractor that is free from `minute`."""
+        contractor = self.contractors[row]
+        day = minute // MINUTES_PER_DAY
+        if self._contractor_days[row] != day:
+            contractor.reset_location()
+            self._contractor_days[row] = day
+
+        interval_end = self._free_intervals[row][self._interval_positions[row]][1]
+        best = self.find_best_customer(contractor.location, interval_end - minute)
+        if best is None:
+            # Nothing fits in what is left of this interval; later intervals may be longer.
+            self._advance_interval(row)
+            return
+
+        customer, duration = best
+        if not self.schedule.add_assignment_minutes(minute, customer, contractor):
+            logger.warning(f"Could not reserve {minute}-{minute + duration} for contractor {contractor.id}")
+            self._advance_interval(row)
+            return
+        self._remove_pending(customer)
+        del self._positions[customer.id]
+
+        # The reservation starts the interval, so the remainder starts at the task end.
+        self._free_intervals[row][self._interval_positions[row]] = (minute + duration, interval_end)
+        if minute + duration < interval_end:
+            heapq.heappush(self._events, (minute + duration, row))
+        else:
+            self._advance_interval(row)
+
+    def find_best_customer(self, location: Point, available_minutes: int) -> Optional[Tuple[Customer, int]]:
+        """
+        Find the pending customer with the shortest travel time from a location whose errand fits.
+
+        Locations are searched by increasing distance, which never exceeds the travel time,
+        so the search stops at the first distance beyond the best travel time found.
+        Ties go to the customer that comes first in the customer list.
+
+        Args:
+            location (Point): The contractor's current location.
+            available_minutes (int): Minutes left in the contractor's free interval.
+
+        Returns:
+            Optional[Tuple[Customer, int]]: The customer and the travel plus errand minutes, or None.
+        """
+        shortest_errand = min(key[1] for key in self._pending_counts)
+        if available_minutes < shortest_errand:
+            return None
+        best = None
+        for distance, point in self._pending_index.iter_nearest(location, available_minutes - shortest_errand):
+            if best is not None and distance > best[0]:
+                break
+            travel = self.schedule.get_travel_minutes(location, point)
+            for key, queue in self._pending[point].items():
+                if travel + key[1] > available_minutes:
+                    continue
+                customer = queue[0]
+                rank = (travel, self._positions[customer.id])
+                if best is None or rank < best[:2]:
+                    best = (travel, rank[1], customer, travel + key[1])
+        if best is None:
+            return None
+        return best[2], best[3]
+
+    def log_results(self) -> None:
+        """Log the results of the scheduling process."""
+        total_profit = self.schedule.calculate_total_profit()
+        scheduled_count = len(self.customers) - len(self.unscheduled_customers)
+        logger.info(f"Event-driven greedy scheduling completed. Total profit: ${total_profit:.2f}")
+        logger.info(f"Scheduled customers: {scheduled_count}, Unscheduled: {len(self.unscheduled_customers)}")
+        if self.unscheduled_customers:
+            logger.warning(f"Failed to schedule {len(self.unscheduled_customers)} customers")
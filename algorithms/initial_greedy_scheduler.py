@@ -3,16 +3,30 @@ Initial Greedy Scheduler for the Synthetic Errands Scheduler.
 Implements a simple greedy initial scheduling algorithm as a baseline for performance comparison.
 """
 
+import itertools
 import logging
-from typing import List, Tuple, Optional
+import random
+from collections.abc import Sequence
+from typing import Iterable, List, Tuple, Optional
+import numpy as np
 from models.schedule import Schedule
 from models.customer import Customer
 from models.contractor import Contractor
 from models.contractor_calendar import ContractorCalendar
+from models.occupancy_matrix import OccupancyMatrix
 from datetime import datetime, timedelta
-from constants import SCHEDULING_DAYS, WORK_START_TIME_OBJ
+from constants import (CALENDAR_ENGINE, CALENDAR_RESOLUTION,
+                       USE_TRAVEL_MATRIX, USE_ROAD_NETWORK, TRAVEL_CACHE_DIR, TRAVEL_CACHE_MAX_MB,
+                       CANDIDATE_LIMIT, CANDIDATE_RADIUS, CANDIDATE_FALLBACK, STREAM_BATCH_SIZE)
 from utils.scheduling_utils import SchedulingUtilities
-from utils.travel_time import calculate_travel_time
+from utils.road_network import RoadNetwork
+from utils.spatial_index import SpatialIndex
+from utils.travel_cache import TravelCache
+from utils.travel_matrix import TravelMatrix
+from utils.travel_time import calculate_travel_minutes_batch
+from utils.time_utils import MINUTES_PER_DAY
+from utils.planning_context import PlanningContext
+from algorithms.registry import register_algorithm
 
 logger: logging.Logger = logging.getLogger(__name__)
 
@@ -20,33 +34,146 @@ class InitialSchedulingError(Exception):
     """Custom exception for errors during initial scheduling."""
     pass
 
-def initial_greedy_schedule(customers: List[Customer], contractors: List[Contractor]) -> Schedule:
-    """Create an initial schedule using a simple greedy algorithm."""
-    scheduler = GreedyScheduler(customers, contractors)
+CALENDAR_ENGINES = ('slots', 'bitmap')
+
+@register_algorithm('day_loop')
+def initial_greedy_schedule(customers: Iterable[Customer], contractors: List[Contractor], engine: str = CALENDAR_ENGINE,
+                            travel_matrix: Optional[TravelMatrix] = None) -> Schedule:
+    """
+    Create an initial schedule using a simple greedy algorithm.
+
+    A list (or other sequence) of customers is scheduled in one greedy run; customers
+    given as any other iterable, e.g. a generator, are scheduled as a stream with
+    schedule_customer_stream().
+    """
+    if not isinstance(customers, Sequence):
+        return schedule_customer_stream(customers, contractors, engine, travel_matrix)
+    if travel_matrix is None:
+        travel_matrix = build_travel_matrix(customers, contractors)
+    scheduler = GreedyScheduler(customers, contractors, engine, travel_matrix=travel_matrix)
     return scheduler.generate_schedule()
 
+def schedule_customer_stream(customers: Iterable[Customer], contractors: List[Contractor], engine: str = CALENDAR_ENGINE,
+                             travel_matrix: Optional[TravelMatrix] = None, batch_size: int = STREAM_BATCH_SIZE,
+                             keep_unscheduled: bool = True) -> Schedule:
+    """
+    Schedule customers arriving over a stream, one batch at a time as they come.
+
+    Each batch of batch_size customers is scheduled by a greedy run into the capacity
+    the earlier batches left in the contractors' calendars. Without a travel matrix,
+    one is built per batch as configured, so the per-batch working state stays bounded
+    by the batch size rather than by the length of the stream.
+
+    Args:
+        customers (Iterable[Customer]): The customers, in arrival order.
+        contractors (List[Contractor]): The contractors; the schedule is built in their calendars.
+        engine (str): Calendar engine of the greedy scheduler.
+        travel_matrix (Optional[TravelMatrix]): Travel times covering every customer of the stream, if available.
+        batch_size (int): Number of customers taken from the stream per greedy run.
+        keep_unscheduled (bool): Whether customers that found no slot stay in the schedule's customer list;
+            if False only the scheduled customers are kept, so memory does not grow with the stream.
+
+    Returns:
+        Schedule: The schedule of all batches.
+    """
+    if batch_size < 1:
+        raise InitialSchedulingError("The stream batch size must be at least 1")
+    customers = iter(customers)
+    known_customers: List[Customer] = []
+    batch_count = received_count = 0
+    while True:
+        batch = list(itertools.islice(customers, batch_size))
+        if not batch:
+            break
+        batch_matrix = travel_matrix if travel_matrix is not None else build_travel_matrix(batch, contractors)
+        # The batch's schedule shares the customer list, which also holds the earlier customers
+        # whose errands are already in the calendars, rather than copying it for every batch.
+        known_customers.extend(batch)
+        schedule = Schedule(contractors, known_customers, batch_matrix)
+        scheduler = GreedyScheduler(batch, contractors, engine, travel_matrix=batch_matrix, schedule=schedule)
+        scheduler.schedule_days()
+        if not keep_unscheduled and scheduler.unscheduled_customers:
+            unscheduled_ids = {customer.id for customer in scheduler.unscheduled_customers}
+            del known_customers[-len(batch):]
+            known_customers.extend(customer for customer in batch if customer.id not in unscheduled_ids)
+        batch_count += 1
+        received_count += len(batch)
+        logger.debug(f"Scheduled stream batch {batch_count}: {len(batch) - len(scheduler.unscheduled_customers)} "
+                     f"of {len(batch)} customers")
+
+    schedule = Schedule(contractors, known_customers, travel_matrix)
+    scheduled_count = len(schedule.get_assignments())
+    logger.info(f"Streamed greedy scheduling completed in {batch_count} batches. "
+                f"Total profit: ${schedule.calculate_total_profit():.2f}")
+    logger.info(f"Scheduled customers: {scheduled_count}, Unscheduled: {received_count - scheduled_count}")
+    return schedule
+
+def build_travel_matrix(customers: List[Customer], contractors: List[Contractor]) -> Optional[TravelMatrix]:
+    """Travel matrix for the instance as configured in the scheduling section, or None if disabled."""
+    if not (USE_ROAD_NETWORK or USE_TRAVEL_MATRIX):
+        return None
+    cache = TravelCache(TRAVEL_CACHE_DIR, TRAVEL_CACHE_MAX_MB) if TRAVEL_CACHE_DIR else None
+    router = RoadNetwork.from_city_map(cache=cache) if USE_ROAD_NETWORK else None
+    return TravelMatrix.from_problem(customers, contractors, router, cache)
+
 class GreedyScheduler:
-    def __init__(self, customers: List[Customer], contractors: List[Contractor]):
+    def __init__(self, customers: List[Customer], contractors: List[Contractor], engine: str = CALENDAR_ENGINE,
+                 resolution: int = CALENDAR_RESOLUTION, travel_matrix: Optional[TravelMatrix] = None,
+                 candidate_limit: Optional[int] = CANDIDATE_LIMIT, candidate_radius: Optional[int] = CANDIDATE_RADIUS,
+                 candidate_fallback: bool = CANDIDATE_FALLBACK, rng: Optional[random.Random] = None,
+                 context: Optional[PlanningContext] = None, schedule: Optional[Schedule] = None):
+        if engine not in CALENDAR_ENGINES:
+            raise InitialSchedulingError(f"Unknown calendar engine '{engine}', expected one of {CALENDAR_ENGINES}")
         self.customers = customers
         self.contractors = contractors
-        self.schedule = Schedule(contractors, customers)
+        self.travel_matrix = travel_matrix
+        # The schedule may be given when the calendars already hold errands of other customers it knows.
+        self.schedule = schedule if schedule is not None else Schedule(contractors, customers, travel_matrix, context)
+        self.context: PlanningContext = self.schedule.context
         self.unscheduled_customers: List[Customer] = list(customers)
-        self.current_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.current_minute: int = 0  # Minutes since the planning epoch shared with the calendars
+        # Random source for breaking ties between equally early slots; the first contractor wins if None.
+        self.rng: Optional[random.Random] = rng
+        self.occupancy: Optional[OccupancyMatrix] = None
+        self.contractor_rows = {contractor.id: row for row, contractor in enumerate(contractors)}
+        if engine == 'bitmap':
+            self.occupancy = OccupancyMatrix(
+                [self.schedule.contractor_calendars[contractor.id] for contractor in contractors], resolution,
+                self.context)
+        # Travel matrix indices of the contractors' current locations, for batched travel lookups.
+        self.location_indices: Optional[np.ndarray] = None
+        # Contractor rows indexed by current location, when candidates are pruned by distance.
+        self.candidate_limit = candidate_limit
+        self.candidate_radius = candidate_radius
+        self.candidate_fallback = candidate_fallback
+        self.contractor_index: Optional[SpatialIndex] = None
+        if candidate_limit is not None or candidate_radius is not None:
+            self.contractor_index = SpatialIndex((row, contractor.location) for row, contractor in enumerate(contractors))
 
     def generate_schedule(self) -> Schedule:
         """Generate the complete schedule."""
-        for day in range(SCHEDULING_DAYS):
-            self.reset_contractor_locations()
-            self.schedule_day(day)
-            self.current_date += timedelta(days=1)
-        
+        self.schedule_days()
         self.log_results()
         return self.schedule
 
+    def schedule_days(self) -> None:
+        """Schedule the customers day by day over the horizon, without logging the results."""
+        for day in range(self.context.num_days):
+            self.reset_contractor_locations()
+            self.schedule_day(day)
+            self.current_minute += MINUTES_PER_DAY
+
     def reset_contractor_locations(self) -> None:
         """Reset all contractors to their initial locations."""
         for contractor in self.contractors:
             contractor.reset_location()
+        if self.contractor_index is not None:
+            for row, contractor in enumerate(self.contractors):
+                self.contractor_index.move(row, contractor.location)
+        if self.occupancy is not None and self.travel_matrix is not None:
+            locations = [contractor.location for contractor in self.contractors]
+            if all(location in self.travel_matrix for location in locations):
+                self.location_indices = np.array([self.travel_matrix.index_of(location) for location in locations])
 
     def schedule_day(self, day: int) -> None:
         """Schedule all customers for a single day."""
@@ -57,37 +184,101 @@ class GreedyScheduler:
         """Attempt to schedule a single customer."""
         valid_slot_info = self.find_earliest_valid_slot(customer)
         if valid_slot_info:
-            selected_contractor, travel_start_time, task_end_time = valid_slot_info
-            if self.attempt_scheduling(customer, selected_contractor, travel_start_time, task_end_time):
+            selected_contractor, travel_start, task_end = valid_slot_info
+            if self.attempt_scheduling(customer, selected_contractor, travel_start, task_end):
                 self.unscheduled_customers.remove(customer)
                 return
 
-    def find_earliest_valid_slot(self, customer: Customer) -> Optional[Tuple[Contractor, datetime, datetime]]:
-        """Find the earliest valid slot among all contractors for a given customer."""
-        earliest_valid_slot = None
-        selected_contractor = None
-        for contractor in self.contractors:
-            travel_duration, _ = calculate_travel_time(contractor.location, customer.location)
-            task_duration = customer.desired_errand.base_time
-            total_duration = travel_duration + task_duration
+    def find_earliest_valid_slot(self, customer: Customer) -> Optional[Tuple[Contractor, int, int]]:
+        """Find the earliest valid slot among all contractors for a given customer, as (contractor, start, end) minutes."""
+        rows = self.candidate_rows(customer)
+        valid_slot = self.find_earliest_valid_slot_among(customer, rows)
+        if valid_slot is None and rows is not None and self.candidate_fallback and len(rows) < len(self.contractors):
+            valid_slot = self.find_earliest_valid_slot_among(customer, None)
+        return valid_slot
+
+    def candidate_rows(self, customer: Customer) -> Optional[np.ndarray]:
+        """Rows of the contractors nearest to the customer in list order, or None to consider every contractor."""
+        if self.contractor_index is None:
+            return None
+        limit = self.candidate_limit if self.candidate_limit is not None else len(self.contractors)
+        if limit >= len(self.contractors) and self.candidate_radius is None:
+            return None
+        # Manhattan distance never exceeds travel time, so the radius keeps every contractor within it.
+        rows = self.contractor_index.nearest(customer.location, limit, self.candidate_radius)
+        return np.sort(np.array(rows, dtype=np.int64))
+
+    def find_earliest_valid_slot_among(self, customer: Customer, rows: Optional[np.ndarray]) -> Optional[Tuple[Contractor, int, int]]:
+        """Find the earliest valid slot among the contractors at the given rows (all contractors if None)."""
+        if rows is not None and not len(rows):
+            return None
+        if self.occupancy is not None:
+            return self.find_earliest_valid_slot_vectorized(customer, rows)
+
+        earliest_valid_slots = []
+        task_duration = customer.desired_errand.base_minutes
+        contractors = self.contractors if rows is None else [self.contractors[row] for row in rows]
+        for contractor in contractors:
+            total_duration = self.schedule.get_travel_minutes(contractor.location, customer.location) + task_duration
             calendar = self.schedule.contractor_calendars[contractor.id]
-            potential_slot = calendar.get_next_available_slot(self.current_date, total_duration)
-            if potential_slot:
-                travel_start_time = potential_slot['start']
-                travel_end_time = travel_start_time + travel_duration
-                task_start_time = travel_end_time
-                task_end_time = task_start_time + task_duration
-                if SchedulingUtilities.is_valid_assignment(contractor, customer, travel_start_time, task_end_time):
-                    if earliest_valid_slot is None or travel_start_time < earliest_valid_slot['start']:
-                        earliest_valid_slot = potential_slot
-                        selected_contractor = contractor
-        
-        return (selected_contractor, earliest_valid_slot['start'], earliest_valid_slot['start'] + total_duration) if selected_contractor and earliest_valid_slot else None
-
-    def attempt_scheduling(self, customer: Customer, contractor: Contractor, travel_start_time: datetime, task_end_time: datetime) -> bool:
-        """Attempt to schedule a customer with a contractor at a specific time."""
-        if SchedulingUtilities.is_valid_assignment(contractor, customer, travel_start_time, task_end_time):
-            if self.schedule.add_assignment(travel_start_time, customer, contractor):
+            travel_start = calendar.get_next_available_minute(self.current_minute, total_duration)
+            if travel_start is not None:
+                task_end = travel_start + total_duration
+                if SchedulingUtilities.is_valid_assignment_minutes(contractor, customer, travel_start, task_end):
+                    if not earliest_valid_slots or travel_start < earliest_valid_slots[0][1]:
+                        earliest_valid_slots = [(contractor, travel_start, task_end)]
+                    elif travel_start == earliest_valid_slots[0][1]:
+                        earliest_valid_slots.append((contractor, travel_start, task_end))
+
+        if not earliest_valid_slots:
+            return None
+        if self.rng is not None:
+            return self.rng.choice(earliest_valid_slots)
+        return earliest_valid_slots[0]
+
+    def find_earliest_valid_slot_vectorized(self, customer: Customer,
+                                            rows: Optional[np.ndarray] = None) -> Optional[Tuple[Contractor, int, int]]:
+        """Find the earliest valid slot with one occupancy matrix query covering the contractors at the given rows."""
+        if rows is None:
+            rows = np.arange(len(self.contractors))
+        if self.location_indices is not None and customer.location in self.travel_matrix:
+            travel = self.travel_matrix.batch_minutes(self.location_indices[rows], self.travel_matrix.index_of(customer.location))
+        elif self.travel_matrix is not None:
+            travel = np.array([self.travel_matrix.travel_minutes(self.contractors[row].location, customer.location)
+                               for row in rows])
+        else:
+            travel = calculate_travel_minutes_batch([self.contractors[row].location for row in rows], customer.location)
+        durations = travel.astype(np.int64) + customer.desired_errand.base_minutes
+        starts = self.occupancy.earliest_fit(durations, self.current_minute, rows)
+        candidates = np.flatnonzero(starts >= 0)
+        if not candidates.size:
+            return None
+
+        # argmin returns the first contractor among equally early starts, as the slot search does.
+        position = candidates[starts[candidates].argmin()]
+        if self.rng is not None:
+            tied = candidates[starts[candidates] == starts[position]]
+            position = tied[self.rng.randrange(len(tied))]
+        travel_start = int(starts[position])
+        task_end = travel_start + int(durations[position])
+        contractor = self.contractors[rows[position]]
+        if SchedulingUtilities.is_valid_assignment_minutes(contractor, customer, travel_start, task_end):
+            return contractor, travel_start, task_end
+        return None
+
+    def attempt_scheduling(self, customer: Customer, contractor: Contractor, travel_start: int, task_end: int) -> bool:
+        """Attempt to schedule a customer with a contractor at a specific time, given in minutes since the planning epoch."""
+        if SchedulingUtilities.is_valid_assignment_minutes(contractor, customer, travel_start, task_end):
+            if self.schedule.add_assignment_minutes(travel_start, customer, contractor):
+                if self.contractor_index is not None:
+                    self.contractor_index.move(self.contractor_rows[contractor.id], customer.location)
+                if self.occupancy is not None:
+                    row = self.contractor_rows[contractor.id]
+                    self.occupancy.reserve(row, travel_start, task_end)
+                    if self.location_indices is not None and customer.location in self.travel_matrix:
+                        self.location_indices[row] = self.travel_matrix.index_of(customer.location)
+                    else:
+                        self.location_indices = None
                 return True
         return False
 
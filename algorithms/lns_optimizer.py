@@ -0,0 +1,204 @@
+"""
+Large neighbourhood search optimizer for the Synthetic Errands Scheduler.
+
+An anytime optimizer: starting from a constructed schedule (normally the greedy one),
+it repeatedly destroys part of the current RoutePlan and repairs it by regret
+insertion. Three destroy operators are used, chosen at random each iteration:
+- random: remove customers anywhere;
+- related: remove a customer and the assigned customers closest to it;
+- route: remove whole contractor-day routes.
+
+A repaired plan replaces the current one if it is at least as profitable, or
+otherwise with the simulated annealing probability exp(delta / temperature). The
+temperature cools geometrically from a fraction of the average profit per customer
+to near zero over the time budget, so the search moves freely at first and only
+accepts improvements at the end.
+
+Every new best plan is yielded, so callers can stop as soon as the quality is good
+enough, or keep the last one when the time budget runs out. The budget runs from the
+moment the optimizer is created from a schedule, so building the plan and reinserting
+the unassigned customers count against it.
+"""
+
+import logging
+import math
+import random
+import time
+from typing import Callable, Iterator, List, Optional
+import numpy as np
+from constants import OPTIMIZATION_MAX_TIME, OPTIMIZATION_LOG_PROGRESS, REGRET_K, CANDIDATE_LIMIT
+from models.route_plan import RoutePlan
+from models.schedule import Schedule
+from algorithms.regret_insertion_scheduler import RegretInsertionScheduler
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# Smallest profit gain counted as a new best, to ignore floating point noise.
+MIN_IMPROVEMENT: float = 1e-6
+
+def optimize_schedule(schedule: Schedule, max_seconds: Optional[float] = OPTIMIZATION_MAX_TIME,
+                      callback: Optional[Callable[[Schedule, float], None]] = None,
+                      seed: Optional[int] = None) -> Schedule:
+    """
+    Improve a schedule by large neighbourhood search and return the best schedule found.
+
+    Args:
+        schedule (Schedule): The starting schedule, e.g. from the greedy scheduler.
+        max_seconds (Optional[float]): Wall-clock budget in seconds from this call; None runs until interrupted.
+            With no time left the schedule is returned unchanged.
+        callback (Optional[Callable[[Schedule, float], None]]): Called with every improved schedule and its profit;
+            the schedules are only built when there is a callback.
+        seed (Optional[int]): Seed of the search's random choices, for reproducible runs.
+
+    Returns:
+        Schedule: The best schedule found, or the given schedule if the search did not improve on it
+            (e.g. when the budget ran out while reinserting customers).
+    """
+    if max_seconds is not None and max_seconds <= 0:
+        return schedule
+    optimizer = LNSOptimizer.from_schedule(schedule, max_seconds, seed=seed)
+    for improved in optimizer.iterate():
+        if callback is not None:
+            callback(improved.to_schedule(), optimizer.best_profit)
+    if optimizer.best_profit <= schedule.calculate_total_profit() + MIN_IMPROVEMENT:
+        return schedule
+    return optimizer.best_schedule()
+
+class LNSOptimizer:
+    """Destroy-and-repair search over a RoutePlan with simulated annealing acceptance."""
+
+    def __init__(self, plan: RoutePlan, deadline: Optional[float] = None,
+                 log_progress: bool = OPTIMIZATION_LOG_PROGRESS, seed: Optional[int] = None,
+                 k: int = REGRET_K, candidate_limit: Optional[int] = CANDIDATE_LIMIT,
+                 min_removed: int = 5, max_removed: int = 60, removal_fraction: float = 0.15,
+                 start_temperature: float = 0.05, end_temperature: float = 1e-4):
+        self.deadline = deadline  # time.perf_counter() reading at which the search stops, None for no limit
+        self.log_progress = log_progress
+        self.random = random.Random(seed)
+        self.min_removed = min_removed
+        self.max_removed = max_removed
+        self.removal_fraction = removal_fraction
+        self.repair = RegretInsertionScheduler(plan, k, candidate_limit)
+        self.destroy_operators: List[Callable[[RoutePlan, int], List[int]]] = [
+            self.random_removal, self.related_removal, self.route_removal]
+
+        self.current = plan
+        self.current_profit = plan.total_profit()
+        self.best = plan.copy()
+        self.best_profit = self.current_profit
+        # Temperatures are relative to the average profit per customer of the starting plan.
+        assigned = max(1, int((plan.assigned_rows >= 0).sum()))
+        scale = max(abs(self.current_profit) / assigned, 1.0)
+        self.start_temperature = start_temperature * scale
+        self.end_temperature = end_temperature * scale
+        self.iterations: int = 0
+        self.accepted: int = 0
+        self.improvements: int = 0
+
+    @classmethod
+    def from_schedule(cls, schedule: Schedule, max_seconds: Optional[float] = OPTIMIZATION_MAX_TIME,
+                      **kwargs) -> 'LNSOptimizer':
+        """
+        Start from a schedule, reinserting the customers it leaves unassigned where profitable.
+
+        The time budget of max_seconds starts now, and the reinsertion stops when it runs out.
+        """
+        deadline = None if max_seconds is None else time.perf_counter() + max_seconds
+        plan = RoutePlan.from_schedule(schedule)
+        optimizer = cls(plan, deadline, **kwargs)
+        optimizer.repair.insert_customers(plan.unassigned(), deadline)
+        optimizer.current_profit = optimizer.best_profit = plan.total_profit()
+        optimizer.best = plan.copy()
+        return optimizer
+
+    def temperature(self, progress: float) -> float:
+        """Geometric cooling from the start to the end temperature as the search progresses from 0 to 1."""
+        progress = min(progress, 1.0)
+        return self.start_temperature * (self.end_temperature / self.start_temperature) ** progress
+
+    def iterate(self) -> Iterator[RoutePlan]:
+        """
+        Run the search, yielding the best plan each time a new one is found.
+
+        The yielded plans are not changed by the search afterwards. The search stops when
+        the deadline passes or the caller stops iterating; best_schedule() returns the
+        best plan found so far either way. The temperature cools over the time left.
+        """
+        start = time.perf_counter()
+        if self.log_progress:
+            logger.info(f"LNS started. Initial profit: ${self.best_profit:.2f}")
+        while True:
+            now = time.perf_counter()
+            if self.deadline is not None and now >= self.deadline:
+                break
+            elapsed = now - start
+            progress = elapsed / (self.deadline - start) if self.deadline is not None else 0.0
+            if self.step(self.temperature(progress)):
+                self.improvements += 1
+                if self.log_progress:
+                    logger.info(f"LNS iteration {self.iterations} ({elapsed:.1f}s): "
+                                f"new best profit ${self.best_profit:.2f}")
+                yield self.best
+        if self.log_progress:
+            logger.info(f"LNS finished after {self.iterations} iterations in {time.perf_counter() - start:.1f}s "
+                        f"({self.accepted} accepted, {self.improvements} improvements). "
+                        f"Best profit: ${self.best_profit:.2f}")
+
+    def step(self, temperature: float) -> bool:
+        """Run one destroy-and-repair iteration, returning whether it found a new best plan."""
+        self.iterations += 1
+        candidate = self.current.copy()
+        assigned = int((candidate.assigned_rows >= 0).sum())
+        if not assigned:
+            return False
+        upper = max(self.min_removed, min(self.max_removed, int(assigned * self.removal_fraction)))
+        count = self.random.randint(min(self.min_removed, assigned), min(upper, assigned))
+        destroy = self.random.choice(self.destroy_operators)
+        destroy(candidate, count)
+
+        self.repair.plan = candidate
+        self.repair.insert_customers(candidate.unassigned())
+        profit = candidate.total_profit()
+
+        delta = profit - self.current_profit
+        if delta >= 0 or self.random.random() < math.exp(delta / temperature):
+            self.current, self.current_profit = candidate, profit
+            self.accepted += 1
+        if profit > self.best_profit + MIN_IMPROVEMENT:
+            self.best, self.best_profit = candidate.copy(), profit
+            return True
+        return False
+
+    def best_schedule(self) -> Schedule:
+        return self.best.to_schedule()
+
+    def random_removal(self, plan: RoutePlan, count: int) -> List[int]:
+        """Remove `count` assigned customers chosen uniformly at random."""
+        removed = self.random.sample(np.flatnonzero(plan.assigned_rows >= 0).tolist(), count)
+        for customer in removed:
+            plan.remove(customer)
+        return removed
+
+    def related_removal(self, plan: RoutePlan, count: int) -> List[int]:
+        """Remove a random assigned customer and the assigned customers with the shortest travel time to it."""
+        assigned = np.flatnonzero(plan.assigned_rows >= 0)
+        seed_customer = int(assigned[self.random.randrange(len(assigned))])
+        minutes = plan.travel[plan.customer_points[seed_customer], plan.customer_points[assigned]]
+        nearest = np.argpartition(minutes, count - 1)[:count]
+        removed = assigned[nearest].tolist()
+        for customer in removed:
+            plan.remove(customer)
+        return removed
+
+    def route_removal(self, plan: RoutePlan, count: int) -> List[int]:
+        """Empty randomly chosen contractor-day routes until at least `count` customers are removed."""
+        routes = [(row, day) for row in range(len(plan.contractors)) for day in range(plan.num_days)
+                  if plan.routes[row][day]]
+        self.random.shuffle(routes)
+        removed: List[int] = []
+        for row, day in routes:
+            if len(removed) >= count:
+                break
+            removed.extend(plan.routes[row][day])
+            plan.set_route(row, day, [])
+        return removed
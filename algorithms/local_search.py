@@ -0,0 +1,335 @@
+"""
+Local search improvement for the Synthetic Errands Scheduler.
+
+Improves a RoutePlan with four classic moves between contractor-day routes:
+- relocate: move one customer to another position or route;
+- swap: exchange two customers;
+- 2-opt: reverse a stretch of a route;
+- or-opt: move a run of two or three consecutive customers.
+
+Every move is scored in constant time from the travel legs around the changed
+positions. Per-route prefix sums of the forward and backward legs give the cost of
+the moved or reversed stretch, so the evaluation is exact for asymmetric travel times
+too. Candidate moves are limited to each customer's nearest neighbours (a granular
+neighbourhood), and the first improving move found is applied.
+"""
+
+import logging
+import time
+from typing import List, Optional, Tuple
+import numpy as np
+from models.route_plan import RoutePlan
+from models.schedule import Schedule
+from algorithms.regret_insertion_scheduler import RegretInsertionScheduler
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# Smallest profit gain accepted as an improvement, to ignore floating point noise.
+MIN_IMPROVEMENT: float = 1e-6
+
+def improve_schedule(schedule: Schedule, max_seconds: Optional[float] = None, num_neighbors: int = 10) -> Schedule:
+    """
+    Improve a schedule with local search and return the improved schedule.
+
+    Customers the schedule leaves unassigned, or that do not fit its routes once they
+    are packed, are first inserted again by regret insertion where that is profitable.
+    The time limit counts from this call and covers that reinsertion. With no time left,
+    or if the result is not more profitable, the schedule is returned unchanged.
+    """
+    if max_seconds is not None and max_seconds <= 0:
+        return schedule
+    deadline = None if max_seconds is None else time.perf_counter() + max_seconds
+    plan = RoutePlan.from_schedule(schedule)
+    RegretInsertionScheduler(plan).insert_customers(plan.unassigned(), deadline)
+    if deadline is None:
+        LocalSearch(plan, num_neighbors).run()
+    elif time.perf_counter() < deadline:
+        LocalSearch(plan, num_neighbors).run(deadline - time.perf_counter())
+    if plan.total_profit() <= schedule.calculate_total_profit() + MIN_IMPROVEMENT:
+        return schedule
+    return plan.to_schedule()
+
+class LocalSearch:
+    """First-improvement local search over relocate, swap, 2-opt and or-opt moves."""
+
+    def __init__(self, plan: RoutePlan, num_neighbors: int = 10, max_segment: int = 3):
+        self.plan = plan
+        self.max_segment = max_segment
+        self.travel = plan.travel
+        self.num_days = plan.num_days
+        self.moves_evaluated: int = 0
+        self.moves_applied: int = 0
+
+        # Nearest other customers of each customer by travel time, the granular neighbourhood.
+        num_customers = len(plan.customers)
+        self.neighbors: List[List[int]] = []
+        count = min(num_neighbors, num_customers - 1)
+        for customer in range(num_customers):
+            if count <= 0:
+                self.neighbors.append([])
+                continue
+            minutes = self.travel[plan.customer_points[customer], plan.customer_points].astype(np.int64)
+            minutes[customer] = np.iinfo(np.int64).max
+            nearest = np.argpartition(minutes, count - 1)[:count]
+            self.neighbors.append(nearest[np.argsort(minutes[nearest], kind='stable')].tolist())
+
+        # Per route (row * num_days + day): matrix points with the depot first, prefix sums of forward and
+        # backward legs and of errand minutes, all indexed by sequence position (0 is the depot).
+        num_routes = len(plan.contractors) * self.num_days
+        self._points: List[List[int]] = [[] for _ in range(num_routes)]
+        self._forward: List[List[int]] = [[] for _ in range(num_routes)]
+        self._backward: List[List[int]] = [[] for _ in range(num_routes)]
+        self._bases: List[List[int]] = [[] for _ in range(num_routes)]
+        self._route_of: List[int] = [-1] * num_customers
+        self._position_of: List[int] = [0] * num_customers
+        self._charges: List[List[float]] = plan.charges.tolist()
+        self._base_minutes: List[int] = plan.base_minutes.tolist()
+        self._rates: List[float] = plan.rates.tolist()
+        self._durations: List[int] = plan.durations.ravel().tolist()
+        self._capacities: List[int] = plan.capacities.ravel().tolist()
+        for route_id in range(num_routes):
+            self._rebuild(route_id)
+
+    def _route(self, route_id: int) -> List[int]:
+        return self.plan.routes[route_id // self.num_days][route_id % self.num_days]
+
+    def _rebuild(self, route_id: int) -> None:
+        """Refresh the cached points, prefix sums and positions of a route after it changed."""
+        row, day = divmod(route_id, self.num_days)
+        route = self.plan.routes[row][day]
+        points = [int(self.plan.depot_points[row])] + [int(self.plan.customer_points[c]) for c in route]
+        forward, backward, bases = [0], [0], [0]
+        for position in range(1, len(points)):
+            forward.append(forward[-1] + self.travel.item(points[position - 1], points[position]))
+            backward.append(backward[-1] + self.travel.item(points[position], points[position - 1]))
+            bases.append(bases[-1] + self._base_minutes[route[position - 1]])
+        self._points[route_id] = points
+        self._forward[route_id] = forward
+        self._backward[route_id] = backward
+        self._bases[route_id] = bases
+        self._durations[route_id] = forward[-1] + bases[-1]
+        for position, customer in enumerate(route, start=1):
+            self._route_of[customer] = route_id
+            self._position_of[customer] = position
+
+    def _leg(self, points: List[int], start: int, end: int) -> int:
+        """Travel from sequence position start to end, or 0 if end is past the end of the route."""
+        return self.travel.item(points[start], points[end]) if end < len(points) else 0
+
+    # Move evaluation. Each returns (profit gain, added minutes of route A, added minutes of route B) or None
+    # if the move is infeasible. Positions are sequence positions (1-based, 0 is the depot).
+
+    def evaluate_segment_move(self, route_a: int, start: int, end: int, route_b: int, after: int) -> Optional[Tuple[float, int, int]]:
+        """Move customers at positions start..end of route A to follow position `after` of route B (relocate/or-opt)."""
+        self.moves_evaluated += 1
+        travel = self.travel
+        points_a = self._points[route_a]
+        first, last = points_a[start], points_a[end]
+        internal = self._forward[route_a][end] - self._forward[route_a][start]
+        bases = self._bases[route_a][end] - self._bases[route_a][start - 1]
+        before = points_a[start - 1]
+        has_next = end + 1 < len(points_a)
+        removed = travel.item(before, first) + internal + (travel.item(last, points_a[end + 1]) if has_next else 0)
+        bridge = travel.item(before, points_a[end + 1]) if has_next else 0
+
+        if route_a == route_b:
+            if start - 1 <= after <= end:
+                return None
+            # after < start - 1 moves the run backward, after > end moves it forward; the gap it leaves is bridged.
+            points = points_a
+            has_following = after + 1 < len(points)
+            gap = travel.item(points[after], points[after + 1]) if has_following else 0
+            added = (travel.item(points[after], first) + internal + (travel.item(last, points[after + 1]) if has_following else 0)
+                     - gap + bridge - removed)
+            if self._durations[route_a] + added > self._capacities[route_a]:
+                return None
+            return -self._rates[route_a // self.num_days] * added, added, 0
+
+        points_b = self._points[route_b]
+        has_following = after + 1 < len(points_b)
+        gap = travel.item(points_b[after], points_b[after + 1]) if has_following else 0
+        added_b = (travel.item(points_b[after], first) + internal + (travel.item(last, points_b[after + 1]) if has_following else 0)
+                   - gap + bases)
+        if self._durations[route_b] + added_b > self._capacities[route_b]:
+            return None
+        added_a = bridge - removed - bases
+        day_a, day_b = route_a % self.num_days, route_b % self.num_days
+        charge_gain = 0.0
+        if day_a != day_b:
+            route = self._route(route_a)
+            for customer in route[start - 1:end]:
+                charges = self._charges[customer]
+                charge_gain += charges[day_b] - charges[day_a]
+        gain = (charge_gain - self._rates[route_a // self.num_days] * added_a
+                - self._rates[route_b // self.num_days] * added_b)
+        return gain, added_a, added_b
+
+    def evaluate_swap(self, route_a: int, position_a: int, route_b: int, position_b: int) -> Optional[Tuple[float, int, int]]:
+        """Exchange the customers at two positions."""
+        self.moves_evaluated += 1
+        travel = self.travel
+        if route_a == route_b:
+            if position_a == position_b:
+                return None
+            if position_a > position_b:
+                position_a, position_b = position_b, position_a
+            points = self._points[route_a]
+            x, y = points[position_a], points[position_b]
+            a = points[position_a - 1]
+            if position_b == position_a + 1:
+                # a x y b -> a y x b
+                added = (travel.item(a, y) + travel.item(y, x) + self._leg_from(points, x, position_b + 1)
+                         - travel.item(a, x) - travel.item(x, y) - self._leg(points, position_b, position_b + 1))
+            else:
+                c = points[position_b - 1]
+                added = (travel.item(a, y) + travel.item(y, points[position_a + 1]) + travel.item(c, x)
+                         + self._leg_from(points, x, position_b + 1)
+                         - travel.item(a, x) - travel.item(x, points[position_a + 1]) - travel.item(c, y)
+                         - self._leg(points, position_b, position_b + 1))
+            if self._durations[route_a] + added > self._capacities[route_a]:
+                return None
+            return -self._rates[route_a // self.num_days] * added, added, 0
+
+        points_a, points_b = self._points[route_a], self._points[route_b]
+        x, y = points_a[position_a], points_b[position_b]
+        route_a_customers, route_b_customers = self._route(route_a), self._route(route_b)
+        customer_x, customer_y = route_a_customers[position_a - 1], route_b_customers[position_b - 1]
+        base_change = self._base_minutes[customer_y] - self._base_minutes[customer_x]
+        added_a = (travel.item(points_a[position_a - 1], y) + self._leg_from(points_a, y, position_a + 1)
+                   - travel.item(points_a[position_a - 1], x) - self._leg(points_a, position_a, position_a + 1) + base_change)
+        added_b = (travel.item(points_b[position_b - 1], x) + self._leg_from(points_b, x, position_b + 1)
+                   - travel.item(points_b[position_b - 1], y) - self._leg(points_b, position_b, position_b + 1) - base_change)
+        if (self._durations[route_a] + added_a > self._capacities[route_a] or
+                self._durations[route_b] + added_b > self._capacities[route_b]):
+            return None
+        day_a, day_b = route_a % self.num_days, route_b % self.num_days
+        charges_x, charges_y = self._charges[customer_x], self._charges[customer_y]
+        charge_gain = charges_x[day_b] - charges_x[day_a] + charges_y[day_a] - charges_y[day_b]
+        gain = (charge_gain - self._rates[route_a // self.num_days] * added_a
+                - self._rates[route_b // self.num_days] * added_b)
+        return gain, added_a, added_b
+
+    def _leg_from(self, points: List[int], point: int, position: int) -> int:
+        """Travel from a point to the customer at a sequence position, or 0 past the end of the route."""
+        return self.travel.item(point, points[position]) if position < len(points) else 0
+
+    def evaluate_two_opt(self, route_id: int, start: int, end: int) -> Optional[Tuple[float, int, int]]:
+        """Reverse the customers at positions start..end of a route."""
+        self.moves_evaluated += 1
+        if start >= end:
+            return None
+        points = self._points[route_id]
+        forward, backward = self._forward[route_id], self._backward[route_id]
+        a = points[start - 1]
+        added = (self.travel.item(a, points[end]) + (backward[end] - backward[start]) + self._leg_from(points, points[start], end + 1)
+                 - self.travel.item(a, points[start]) - (forward[end] - forward[start]) - self._leg(points, end, end + 1))
+        if self._durations[route_id] + added > self._capacities[route_id]:
+            return None
+        return -self._rates[route_id // self.num_days] * added, added, 0
+
+    # Move application.
+
+    def _set_route(self, route_id: int, route: List[int]) -> None:
+        row, day = divmod(route_id, self.num_days)
+        self.plan.set_route(row, day, route)
+        self._rebuild(route_id)
+
+    def apply_segment_move(self, route_a: int, start: int, end: int, route_b: int, after: int) -> None:
+        route = self._route(route_a)
+        segment = route[start - 1:end]
+        if route_a == route_b:
+            remaining = route[:start - 1] + route[end:]
+            insert_at = after if after < start else after - len(segment)
+            self._set_route(route_a, remaining[:insert_at] + segment + remaining[insert_at:])
+            return
+        target = self._route(route_b)
+        self._set_route(route_a, route[:start - 1] + route[end:])
+        self._set_route(route_b, target[:after] + segment + target[after:])
+
+    def apply_swap(self, route_a: int, position_a: int, route_b: int, position_b: int) -> None:
+        if route_a == route_b:
+            route = list(self._route(route_a))
+            route[position_a - 1], route[position_b - 1] = route[position_b - 1], route[position_a - 1]
+            self._set_route(route_a, route)
+            return
+        first, second = list(self._route(route_a)), list(self._route(route_b))
+        first[position_a - 1], second[position_b - 1] = second[position_b - 1], first[position_a - 1]
+        self._set_route(route_a, first)
+        self._set_route(route_b, second)
+
+    def apply_two_opt(self, route_id: int, start: int, end: int) -> None:
+        route = self._route(route_id)
+        self._set_route(route_id, route[:start - 1] + route[start - 1:end][::-1] + route[end:])
+
+    # Search.
+
+    def improve_customer(self, customer: int) -> bool:
+        """Try the moves between a customer and its neighbours; apply the first improving one."""
+        route_a = self._route_of[customer]
+        if route_a < 0:
+            return False
+        position_a = self._position_of[customer]
+        length_a = len(self._points[route_a]) - 1
+        for neighbor in self.neighbors[customer]:
+            route_b = self._route_of[neighbor]
+            if route_b < 0:
+                continue
+            position_b = self._position_of[neighbor]
+
+            # Relocate and or-opt: runs starting at the customer, placed after or before the neighbour.
+            for length in range(1, self.max_segment + 1):
+                end = position_a + length - 1
+                if end > length_a:
+                    break
+                for after in (position_b, position_b - 1):
+                    result = self.evaluate_segment_move(route_a, position_a, end, route_b, after)
+                    if result is not None and result[0] > MIN_IMPROVEMENT:
+                        self.apply_segment_move(route_a, position_a, end, route_b, after)
+                        return True
+
+            result = self.evaluate_swap(route_a, position_a, route_b, position_b)
+            if result is not None and result[0] > MIN_IMPROVEMENT:
+                self.apply_swap(route_a, position_a, route_b, position_b)
+                return True
+
+            if route_a == route_b:
+                # Reverse so that the customer ends up next to the neighbour.
+                if position_b > position_a:
+                    start, end = position_a + 1, position_b
+                else:
+                    start, end = position_b, position_a - 1
+                result = self.evaluate_two_opt(route_a, start, end)
+                if result is not None and result[0] > MIN_IMPROVEMENT:
+                    self.apply_two_opt(route_a, start, end)
+                    return True
+        return False
+
+    def run(self, max_seconds: Optional[float] = None) -> int:
+        """
+        Apply improving moves until none is left or the time limit is reached.
+
+        Args:
+            max_seconds (Optional[float]): Time limit, or None to run to a local optimum.
+
+        Returns:
+            int: The number of moves applied.
+        """
+        start_time = time.perf_counter()
+        start_profit = self.plan.total_profit()
+        applied_before = self.moves_applied
+        improved = True
+        while improved:
+            improved = False
+            for customer in range(len(self.plan.customers)):
+                if self.improve_customer(customer):
+                    self.moves_applied += 1
+                    improved = True
+                if max_seconds is not None and time.perf_counter() - start_time > max_seconds:
+                    improved = False
+                    break
+
+        elapsed = time.perf_counter() - start_time
+        logger.info(f"Local search applied {self.moves_applied - applied_before} moves "
+                    f"({self.moves_evaluated} evaluated in {elapsed:.2f}s), "
+                    f"profit ${start_profit:.2f} -> ${self.plan.total_profit():.2f}")
+        return self.moves_applied - applied_before
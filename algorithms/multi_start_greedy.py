@@ -0,0 +1,99 @@
+"""
+Multi-start greedy scheduler for the Synthetic Errands Scheduler.
+
+Runs several variants of the greedy day-loop scheduler in a process pool and keeps
+the most profitable schedule. The first variant is the plain greedy run; every other
+variant shuffles the customer order and breaks ties between equally early slots at
+random, each with its own seed. The problem is sent to each worker process once, and
+workers only send back the profit and the compact assignment array of each run, from
+which the best schedule is rebuilt in the calling process.
+"""
+
+import logging
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Optional, Tuple
+import numpy as np
+from constants import MULTI_START_RUNS, MULTI_START_WORKERS, CALENDAR_ENGINE
+from models.contractor import Contractor
+from models.customer import Customer
+from models.schedule import Schedule
+from algorithms.initial_greedy_scheduler import GreedyScheduler, build_travel_matrix
+from algorithms.registry import register_algorithm, as_customer_list
+from utils.travel_matrix import TravelMatrix
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# Problem shared by the runs of a worker process, set by the pool initializer.
+_worker_problem: Optional[Tuple[List[Customer], List[Contractor], str, Optional[TravelMatrix]]] = None
+
+@register_algorithm('multi_start')
+def multi_start_greedy_schedule(customers: Iterable[Customer], contractors: List[Contractor],
+                                num_runs: Optional[int] = MULTI_START_RUNS, num_workers: Optional[int] = MULTI_START_WORKERS,
+                                seed: Optional[int] = None, engine: str = CALENDAR_ENGINE,
+                                travel_matrix: Optional[TravelMatrix] = None) -> Schedule:
+    """
+    Run randomized greedy variants in parallel and return the most profitable schedule.
+
+    Args:
+        customers (Iterable[Customer]): The customers to schedule, collected into a list if given as a stream.
+        contractors (List[Contractor]): The contractors; the best schedule is built in their calendars.
+        num_runs (Optional[int]): Number of greedy runs, including the plain (unshuffled) one; one per worker if None,
+            so that the runs take about as long as a single greedy run.
+        num_workers (Optional[int]): Worker processes, one per CPU if None; 1 runs everything in this process.
+        seed (Optional[int]): Base seed of the randomized runs; run i uses seed + i. Random if None.
+        engine (str): Calendar engine of the greedy scheduler.
+        travel_matrix (Optional[TravelMatrix]): Travel times, built as configured if None.
+
+    Returns:
+        Schedule: The schedule of the most profitable run (the earliest run among equals).
+    """
+    num_workers = num_workers or os.cpu_count() or 1
+    if num_runs is None:
+        num_runs = num_workers
+    if num_runs < 1:
+        raise ValueError("Multi-start greedy needs at least one run")
+    customers = as_customer_list(customers)
+    if travel_matrix is None:
+        travel_matrix = build_travel_matrix(customers, contractors)
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    seeds = [None] + [seed + run for run in range(1, num_runs)]
+    num_workers = min(num_workers, num_runs)
+
+    # Workers get the contractors in this process's planning context, with the request time fixed so that
+    # all runs are charged alike whatever the process start method.
+    context = contractors[0].calendar.context.frozen() if contractors else None
+    problem = (customers, [contractor.copy_unscheduled(context) for contractor in contractors], engine, travel_matrix)
+    if num_workers == 1:
+        _init_worker(*problem)
+        results = [_run_variant(run_seed) for run_seed in seeds]
+    else:
+        with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker, initargs=problem) as executor:
+            results = list(executor.map(_run_variant, seeds))
+
+    profits = [profit for profit, _ in results]
+    best_run = int(np.argmax(profits))
+    logger.info(f"Multi-start greedy completed {num_runs} runs on {num_workers} workers. "
+                f"Profit of the plain run: ${profits[0]:.2f}, best: ${profits[best_run]:.2f} (run {best_run})")
+    return Schedule.from_compact(contractors, customers, results[best_run][1], travel_matrix)
+
+def _init_worker(customers: List[Customer], contractors: List[Contractor], engine: str,
+                 travel_matrix: Optional[TravelMatrix]) -> None:
+    global _worker_problem
+    _worker_problem = (customers, contractors, engine, travel_matrix)
+
+def _run_variant(seed: Optional[int]) -> Tuple[float, np.ndarray]:
+    """Run one greedy variant on the worker's problem, returning its profit and compact assignments."""
+    customers, contractors, engine, travel_matrix = _worker_problem
+    # Fresh contractors, so that runs in the same process do not share calendars.
+    contractors = [contractor.copy_unscheduled() for contractor in contractors]
+    rng = None
+    if seed is not None:
+        rng = random.Random(seed)
+        customers = list(customers)
+        rng.shuffle(customers)
+    scheduler = GreedyScheduler(customers, contractors, engine, travel_matrix=travel_matrix, rng=rng)
+    schedule = scheduler.generate_schedule()
+    return schedule.calculate_total_profit(), schedule.to_compact()
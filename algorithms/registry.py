@@ -0,0 +1,66 @@
+"""
+Registry of the construction algorithms of the Synthetic Errands Scheduler.
+
+Algorithms are registered under a name with the register_algorithm decorator and
+looked up with get_algorithm, e.g. from the scheduling.scheduler_mode config key or
+by solvers that run another algorithm on parts of an instance. A registered algorithm
+is called as algorithm(customers, contractors, travel_matrix=None) and returns a
+Schedule built in the given contractors' calendars. The customers may be any
+iterable: the greedy day loop consumes a stream in batches, the other algorithms
+collect it into a list first (as_customer_list).
+"""
+
+import importlib
+from typing import Callable, Dict, Iterable, List, Optional
+from models.contractor import Contractor
+from models.customer import Customer
+from models.schedule import Schedule
+from utils.travel_matrix import TravelMatrix
+
+SchedulingAlgorithm = Callable[..., Schedule]
+
+_algorithms: Dict[str, SchedulingAlgorithm] = {}
+
+# Modules of the built-in algorithms, which register themselves when imported.
+BUILTIN_ALGORITHM_MODULES = (
+    'algorithms.initial_greedy_scheduler',
+    'algorithms.event_driven_scheduler',
+    'algorithms.regret_insertion_scheduler',
+    'algorithms.multi_start_greedy',
+    'algorithms.decomposition_solver',
+)
+
+def register_algorithm(name: str) -> Callable[[SchedulingAlgorithm], SchedulingAlgorithm]:
+    """Decorator registering a scheduling algorithm under the given name."""
+    def decorator(algorithm: SchedulingAlgorithm) -> SchedulingAlgorithm:
+        if _algorithms.get(name, algorithm) is not algorithm:
+            raise ValueError(f"Scheduling algorithm '{name}' is already registered")
+        _algorithms[name] = algorithm
+        return algorithm
+    return decorator
+
+def _load_builtin_algorithms() -> None:
+    for module in BUILTIN_ALGORITHM_MODULES:
+        importlib.import_module(module)
+
+def get_algorithm(name: str) -> SchedulingAlgorithm:
+    """Look up a registered scheduling algorithm by name."""
+    if name not in _algorithms:
+        _load_builtin_algorithms()
+    if name not in _algorithms:
+        from algorithms.initial_greedy_scheduler import InitialSchedulingError
+        raise InitialSchedulingError(f"Unknown scheduling algorithm '{name}', expected one of {available_algorithms()}")
+    return _algorithms[name]
+
+def available_algorithms() -> List[str]:
+    _load_builtin_algorithms()
+    return sorted(_algorithms)
+
+def as_customer_list(customers: Iterable[Customer]) -> List[Customer]:
+    """The customers as a list, collecting them if they are given as another iterable."""
+    return customers if isinstance(customers, list) else list(customers)
+
+def run_algorithm(name: str, customers: Iterable[Customer], contractors: List[Contractor],
+                  travel_matrix: Optional[TravelMatrix] = None) -> Schedule:
+    """Schedule the customers with the contractors using the named algorithm."""
+    return get_algorithm(name)(customers, contractors, travel_matrix=travel_matrix)
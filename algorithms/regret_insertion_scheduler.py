@@ -0,0 +1,235 @@
+"""
+Regret insertion scheduler for the Synthetic Errands Scheduler.
+
+Builds a schedule by repeatedly inserting the pending customer with the highest
+regret: the profit lost by not giving it its best insertion now, measured as the sum
+of the differences between its best insertion and its next k - 1 best insertions
+across all contractor-days (regret-k). Not scheduling a customer is worth 0, so
+customers with few profitable options go first and unprofitable insertions are never
+made.
+
+Only the best few insertions of each pending customer are kept, best first (ties go
+to the lower contractor row, then the earlier day). After an insertion only the
+changed route is evaluated again for the pending customers that may use it; a
+customer's insertions into all its candidate routes are only evaluated again when
+the changes leave fewer than k insertions known to be its best.
+"""
+
+import logging
+import time
+from typing import Iterable, List, Optional, Sequence
+import numpy as np
+from constants import REGRET_K, CANDIDATE_LIMIT
+from models.contractor import Contractor
+from models.customer import Customer
+from models.route_plan import RoutePlan
+from models.schedule import Schedule
+from algorithms.initial_greedy_scheduler import build_travel_matrix
+from algorithms.registry import register_algorithm, as_customer_list
+from utils.spatial_index import SpatialIndex
+from utils.travel_matrix import TravelMatrix
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+@register_algorithm('regret')
+def regret_insertion_schedule(customers: Iterable[Customer], contractors: List[Contractor],
+                              travel_matrix: Optional[TravelMatrix] = None, k: int = REGRET_K) -> Schedule:
+    """Create a schedule with regret-k insertion."""
+    customers = as_customer_list(customers)
+    if travel_matrix is None:
+        travel_matrix = build_travel_matrix(customers, contractors)
+    scheduler = RegretInsertionScheduler(RoutePlan(customers, contractors, travel_matrix), k)
+    return scheduler.generate_schedule()
+
+# Insertions kept per pending customer beyond the k that its regret needs, so that they
+# seldom have to be evaluated again from all candidate routes when routes fill up.
+SPARE_INSERTIONS: int = 14
+
+class RegretInsertionScheduler:
+    def __init__(self, plan: RoutePlan, k: int = REGRET_K, candidate_limit: Optional[int] = CANDIDATE_LIMIT):
+        if k < 1:
+            raise ValueError("Regret k must be at least 1")
+        self.plan = plan
+        self.k = k
+        num_customers, num_contractors = len(plan.customers), len(plan.contractors)
+
+        # Candidate contractor rows per customer, the nearest candidate_limit (None when all contractors are),
+        # and the customers that have each contractor as a candidate, for route updates.
+        self.candidates: Optional[np.ndarray] = None
+        self._users: Optional[List[np.ndarray]] = None
+        if candidate_limit is not None and candidate_limit < num_contractors:
+            index = SpatialIndex((row, contractor.initial_location) for row, contractor in enumerate(plan.contractors))
+            self.candidates = np.array([sorted(index.nearest(customer.location, candidate_limit))
+                                        for customer in plan.customers], dtype=np.int64).reshape(num_customers, -1)
+            order = np.argsort(self.candidates, axis=None, kind='stable')
+            bounds = np.searchsorted(self.candidates.ravel()[order], np.arange(num_contractors + 1))
+            users = order // max(1, self.candidates.shape[1])
+            self._users = [users[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+        # Best insertions of each customer as profit and route (row * num_days + day), best first and padded
+        # with (-inf, -1), and their number. Every candidate route not listed is a worse insertion than the
+        # last one listed, and where `complete` is set none of them fits at all.
+        width = k + SPARE_INSERTIONS
+        self.top_profits = np.full((num_customers, width), -np.inf)
+        self.top_routes = np.full((num_customers, width), -1, dtype=np.int64)
+        self.sizes = np.zeros(num_customers, dtype=np.int64)
+        self.complete = np.zeros(num_customers, dtype=bool)
+        self.pending = np.zeros(num_customers, dtype=bool)
+        self.regret = np.full(num_customers, -np.inf)
+
+    def generate_schedule(self, schedule: Optional[Schedule] = None) -> Schedule:
+        """
+        Insert every customer that can be inserted profitably and build the schedule in the plan's contractors.
+
+        Errands the contractors already hold for other customers keep their time; the
+        schedule of the contractors that knows those customers may be given to add to.
+        """
+        self.insert_customers(self.plan.unassigned())
+        self.log_results()
+        return self.plan.to_schedule(in_place=True, schedule=schedule)
+
+    def insert_customers(self, customers: Sequence[int], deadline: Optional[float] = None) -> int:
+        """
+        Insert the given unassigned customers by regret until none fits profitably.
+
+        Args:
+            customers (Sequence[int]): Customer positions in the plan to insert.
+            deadline (Optional[float]): time.perf_counter() reading after which no more customers are inserted.
+
+        Returns:
+            int: The number of customers inserted.
+        """
+        customers = np.unique(np.asarray(customers, dtype=np.int64))
+        self.pending[:] = False
+        if deadline is not None and time.perf_counter() >= deadline:
+            return 0
+        self.pending[customers] = True
+        self._evaluate(customers)
+
+        inserted = 0
+        while deadline is None or time.perf_counter() < deadline:
+            best = self.top_profits[:, 0]
+            eligible = self.pending & (best > 0)
+            if not eligible.any():
+                break
+            regret = np.where(eligible, self.regret, -np.inf)
+            # Highest regret first, then the highest profit, then the first customer in list order.
+            tied = np.flatnonzero(regret == regret.max())
+            customer = int(tied[best[tied].argmax()])
+            row, day = divmod(int(self.top_routes[customer, 0]), self.plan.num_days)
+
+            _, positions = self.plan.insertion_costs(row, day, np.array([customer]))
+            self.plan.insert(customer, row, day, int(positions[0]))
+            self.pending[customer] = False
+            inserted += 1
+            self._update_route(row, day)
+        return inserted
+
+    def _evaluate(self, customers: np.ndarray) -> None:
+        """Find the best insertions of the given customers among all their candidate routes."""
+        plan = self.plan
+        num_days = plan.num_days
+        width = self.top_profits.shape[1]
+        # Customers are evaluated in chunks, to bound the routes x customers cost tables.
+        chunk = max(1, 1_000_000 // max(1, len(plan.contractors) * num_days))
+        for start in range(0, len(customers), chunk):
+            block = customers[start:start + chunk]
+            rows = np.arange(len(plan.contractors)) if self.candidates is None else np.unique(self.candidates[block])
+            route_rows, route_days = np.repeat(rows, num_days), np.tile(np.arange(num_days), len(rows))
+            added, _ = plan.insertion_costs_batch(route_rows, route_days, block)
+            added = added.T
+            profits = plan.charges[block][:, route_days] - plan.rates[route_rows] * added
+            profits[plan.durations[route_rows, route_days] + added > plan.capacities[route_rows, route_days]] = -np.inf
+            if self.candidates is not None:
+                allowed = (self.candidates[block][:, :, None] == rows[None, None, :]).any(axis=1)
+                profits[~np.repeat(allowed, num_days, axis=1)] = -np.inf
+            fits = profits > -np.inf
+            self.sizes[block] = np.minimum(fits.sum(axis=1), width)
+            self.complete[block] = fits.sum(axis=1) <= width
+            self.top_profits[block] = -np.inf
+            self.top_routes[block] = -1
+            if not profits.shape[1]:
+                continue
+
+            # The fitting routes at least as good as each customer's width-th best, in list order (columns are
+            # in route order), of which the first width are listed.
+            count = min(width, profits.shape[1])
+            threshold = -np.partition(-profits, count - 1, axis=1)[:, count - 1:count]
+            positions, columns = np.nonzero(fits & (profits >= threshold))
+            values = profits[positions, columns]
+            order = np.lexsort((columns, -values, positions))
+            positions, columns, values = positions[order], columns[order], values[order]
+            ranks = np.arange(len(positions)) - np.searchsorted(positions, positions)
+            keep = ranks < width
+            listed, ranks = block[positions[keep]], ranks[keep]
+            self.top_profits[listed, ranks] = values[keep]
+            self.top_routes[listed, ranks] = route_rows[columns[keep]] * num_days + route_days[columns[keep]]
+        self._refresh(customers)
+
+    def _update_route(self, row: int, day: int) -> None:
+        """Evaluate a changed route again for the pending customers that may use it, updating their best insertions."""
+        if self._users is None:
+            customers = np.flatnonzero(self.pending)
+        else:
+            customers = self._users[row][self.pending[self._users[row]]]
+        if not len(customers):
+            return
+        added, _ = self.plan.insertion_costs(row, day, customers)
+        profits = self.plan.charges[customers, day] - self.plan.rates[row] * added
+        profits[self.plan.durations[row, day] + added > self.plan.capacities[row, day]] = -np.inf
+
+        route = row * self.plan.num_days + day
+        top_routes = self.top_routes[customers]
+        width = top_routes.shape[1]
+        sizes = self.sizes[customers]
+        # The last listed insertion bounds the unlisted ones.
+        last = np.maximum(sizes - 1, 0)
+        last_profits, last_routes = self.top_profits[customers, last], top_routes[np.arange(len(customers)), last]
+        precedes_last = (sizes > 0) & ((profits > last_profits) | ((profits == last_profits) & (route < last_routes)))
+        old = top_routes == route
+        listed = old.any(axis=1)
+        remaining = sizes - listed
+
+        # The route's insertion is listed if it is known to rank among the listed ones: it comes before the last
+        # one, or the list held every fitting route. It takes the place of its old entry, or else of the padding
+        # or of the last insertion, which a full list drops.
+        complete = self.complete[customers]
+        fits = profits > -np.inf
+        insert = fits & (precedes_last | (complete & (remaining < width)))
+        self.complete[customers] = complete & ~(fits & ~insert) & ~(insert & (remaining == width))
+        self.sizes[customers] = np.minimum(remaining + insert, width)
+        changed = listed | insert
+        slots = np.where(listed, old.argmax(axis=1), np.minimum(sizes, width - 1))[changed]
+        customers, insert = customers[changed], insert[changed]
+        self.top_profits[customers, slots] = np.where(insert, profits[changed], -np.inf)
+        self.top_routes[customers, slots] = np.where(insert, route, -1)
+        # Put the changed lists back in order: higher profit first, then the lower route, with the padding last.
+        top_profits, top_routes = self.top_profits[customers], self.top_routes[customers]
+        order = np.lexsort((top_routes, -top_profits))
+        self.top_profits[customers] = np.take_along_axis(top_profits, order, axis=1)
+        self.top_routes[customers] = np.take_along_axis(top_routes, order, axis=1)
+
+        # Lists that no longer hold k insertions known to be the best are evaluated again.
+        stale = ~self.complete[customers] & (self.sizes[customers] < self.k)
+        if stale.any():
+            self._evaluate(customers[stale])
+        self._refresh(customers[~stale])
+
+    def _refresh(self, customers: np.ndarray) -> None:
+        """Recompute the regret of the given customers from their best insertions."""
+        if not len(customers):
+            return
+        top = self.top_profits[customers, :self.k]
+        if self.k == 1:
+            self.regret[customers] = top[:, 0]
+        else:
+            # Options that are infeasible or unprofitable are worth the same as not scheduling the customer.
+            self.regret[customers] = (top[:, :1] - np.maximum(top[:, 1:], 0)).sum(axis=1)
+
+    def log_results(self) -> None:
+        """Log the results of the scheduling process."""
+        unassigned = len(self.plan.unassigned())
+        logger.info(f"Regret-{self.k} insertion completed. Total profit: ${self.plan.total_profit():.2f}")
+        logger.info(f"Scheduled customers: {len(self.plan.customers) - unassigned}, Unscheduled: {unassigned}")
+        if unassigned:
+            logger.warning(f"Failed to schedule {unassigned} customers")
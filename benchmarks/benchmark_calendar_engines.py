@@ -0,0 +1,87 @@
+"""
+Benchmark of the greedy scheduler's calendar engines.
+
+Runs the greedy scheduler on the same random instance with the slot-list calendar
+search and with the NumPy occupancy matrix, and reports wall-clock time and whether
+both produced the same assignments. End-to-end times include travel time lookups,
+so the calendar search alone is also timed on the scheduled calendars: one
+earliest-fit query across all contractors per sampled duration.
+
+Usage (from the project root):
+    python -m benchmarks.benchmark_calendar_engines --contractors 1000 --customers 2000
+"""
+
+import argparse
+import copy
+import logging
+import random
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+from algorithms.initial_greedy_scheduler import initial_greedy_schedule, CALENDAR_ENGINES
+from models.occupancy_matrix import OccupancyMatrix
+from models.schedule import Schedule
+from utils.problem_generator import generate_problem
+from utils.travel_matrix import TravelMatrix
+
+def run_engine(engine: str, customers, contractors, use_travel_matrix: bool) -> Tuple[float, List[Tuple[int, int, int]], float]:
+    """Schedule a private copy of the instance with one engine."""
+    customers, contractors = copy.deepcopy((customers, contractors))
+    start = time.perf_counter()
+    travel_matrix = TravelMatrix.from_problem(customers, contractors) if use_travel_matrix else None
+    schedule = initial_greedy_schedule(customers, contractors, engine, travel_matrix)
+    elapsed = time.perf_counter() - start
+    assignments = sorted((customer.id, contractor.id, errand.travel_start)
+                         for errand, customer, contractor in schedule.get_assignments())
+    return elapsed, assignments, schedule.calculate_total_profit()
+
+def time_calendar_queries(schedule: Schedule, num_queries: int, seed: int) -> Tuple[float, float]:
+    """Time earliest-fit queries across all contractor calendars with both backends."""
+    calendars = [schedule.contractor_calendars[contractor.id] for contractor in schedule.contractors]
+    rng = np.random.default_rng(seed)
+    queries = rng.integers(15, 480, size=(num_queries, len(calendars)))
+
+    start = time.perf_counter()
+    slot_results = [[calendar.get_next_available_minute(0, int(duration)) for calendar, duration in zip(calendars, durations)]
+                    for durations in queries]
+    slots_elapsed = time.perf_counter() - start
+
+    occupancy = OccupancyMatrix(calendars)
+    start = time.perf_counter()
+    matrix_results = [occupancy.earliest_fit(durations, 0) for durations in queries]
+    matrix_elapsed = time.perf_counter() - start
+
+    for expected, actual in zip(slot_results, matrix_results):
+        assert [-1 if value is None else value for value in expected] == actual.tolist()
+    return slots_elapsed, matrix_elapsed
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--contractors', type=int, default=1000)
+    parser.add_argument('--customers', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--travel-matrix', action='store_true', help="precompute travel times (included in the timing)")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    random.seed(args.seed)
+    customers, contractors = generate_problem(args.customers, args.contractors)
+
+    results = {engine: run_engine(engine, customers, contractors, args.travel_matrix) for engine in CALENDAR_ENGINES}
+    for engine, (elapsed, assignments, profit) in results.items():
+        print(f"{engine:>7}: {elapsed:8.2f}s  {len(assignments)} assignments  profit ${profit:.2f}")
+    reference = results[CALENDAR_ENGINES[0]][1]
+    identical = all(assignments == reference for _, assignments, _ in results.values())
+    print(f"Identical assignments: {identical}")
+
+    customers, contractors = copy.deepcopy((customers, contractors))
+    schedule = initial_greedy_schedule(customers, contractors, CALENDAR_ENGINES[0])
+    slots_elapsed, matrix_elapsed = time_calendar_queries(schedule, args.queries, args.seed)
+    print(f"Calendar search only, {args.queries} queries x {len(contractors)} contractors: "
+          f"slots {slots_elapsed:.2f}s, bitmap {matrix_elapsed:.2f}s")
+
+if __name__ == "__main__":
+    main()
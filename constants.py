@@ -14,7 +14,7 @@ update the config.yaml file instead.
 
 from utils.config_manager import config
 from utils.time_utils import convert_minutes_to_time
-from typing import List, Tuple, Union, Dict
+from typing import List, Tuple, Union, Dict, Optional
 from enum import Enum, auto
 import datetime
 
@@ -79,6 +79,10 @@ ERRAND_RATES: Dict[ErrandType, float] = {
 WORK_START_TIME_OBJ: datetime.time = convert_minutes_to_time(config.get('work_start_time'))
 WORK_END_TIME_OBJ: datetime.time = convert_minutes_to_time(config.get('work_end_time'))
 
+# The same working hours as minutes since midnight, used by the integer-minute scheduling core.
+WORK_START_MINUTES: int = config.get('work_start_time')
+WORK_END_MINUTES: int = config.get('work_end_time')
+
 # Default problem generation parameters
 # These values are used when generating random problem instances.
 DEFAULT_NUM_CUSTOMERS: int = config.get('default_num_customers')
@@ -88,6 +92,49 @@ DEFAULT_NUM_CONTRACTORS: int = config.get('default_num_contractors')
 # The number of days to schedule errands for.
 SCHEDULING_DAYS: int = config.get('scheduling_days')
 
+# Scheduling engine parameters
+# The greedy scheduler searches calendars either slot by slot ('slots') or through a NumPy
+# occupancy matrix covering all contractors at once ('bitmap', with the given minute resolution).
+CALENDAR_ENGINE: str = config.get('scheduling', {}).get('calendar_engine', 'slots')
+CALENDAR_RESOLUTION: int = config.get('scheduling', {}).get('calendar_resolution', 1)
+# Construction algorithm used by the application: the greedy day loop ('day_loop'), the contractor event
+# queue ('event_driven'), profit-aware regret insertion ('regret') or the best of several randomized
+# greedy runs in parallel processes ('multi_start'), or the decomposition solver ('decomposition');
+# any name registered in algorithms/registry.py is accepted.
+SCHEDULER_MODE: str = config.get('scheduling', {}).get('scheduler_mode', 'day_loop')
+# Number of greedy runs of the multi-start mode (one per worker if unset), and of worker processes
+# (one per CPU if unset).
+MULTI_START_RUNS: Optional[int] = config.get('scheduling', {}).get('multi_start_runs')
+MULTI_START_WORKERS: Optional[int] = config.get('scheduling', {}).get('multi_start_workers')
+# Decomposition solver: registered algorithm run on each partition, number of regions of the city,
+# whether the horizon is also split into week blocks, and worker processes (one per CPU if unset).
+DECOMPOSITION_ALGORITHM: str = config.get('scheduling', {}).get('decomposition_algorithm', 'day_loop')
+DECOMPOSITION_REGIONS: int = config.get('scheduling', {}).get('decomposition_regions', 4)
+DECOMPOSITION_WEEK_BLOCKS: bool = config.get('scheduling', {}).get('decomposition_week_blocks', False)
+DECOMPOSITION_WORKERS: Optional[int] = config.get('scheduling', {}).get('decomposition_workers')
+# Whether the greedy scheduler precomputes all pairwise travel times for the instance.
+USE_TRAVEL_MATRIX: bool = config.get('scheduling', {}).get('travel_matrix', False)
+# Whether travel times come from shortest paths on the city road network (implies a travel matrix).
+USE_ROAD_NETWORK: bool = config.get('scheduling', {}).get('road_network', False)
+# Candidate pruning: only consider the nearest contractors and/or those within a travel radius
+# (minutes) of each customer, falling back to all contractors when none of them has a valid slot.
+CANDIDATE_LIMIT: Optional[int] = config.get('scheduling', {}).get('candidate_limit')
+CANDIDATE_RADIUS: Optional[int] = config.get('scheduling', {}).get('candidate_radius')
+CANDIDATE_FALLBACK: bool = config.get('scheduling', {}).get('candidate_fallback', True)
+# Whether the constructed schedule is improved by local search (within OPTIMIZATION_MAX_TIME seconds, shared with LNS).
+USE_LOCAL_SEARCH: bool = config.get('scheduling', {}).get('local_search', False)
+# Whether the constructed schedule is optimized by large neighbourhood search (within OPTIMIZATION_MAX_TIME seconds, shared with local search).
+USE_LNS: bool = config.get('scheduling', {}).get('lns', False)
+# Whether the schedule's total profit is recomputed from every assignment and checked against the running totals.
+PROFIT_AUDIT: bool = config.get('scheduling', {}).get('profit_audit', False)
+# Number of best insertions compared by the regret insertion scheduler (regret-k).
+REGRET_K: int = config.get('scheduling', {}).get('regret_k', 2)
+# Directory where travel tables are kept between runs (disabled when unset) and its size limit.
+TRAVEL_CACHE_DIR: Optional[str] = config.get('scheduling', {}).get('travel_cache_dir')
+TRAVEL_CACHE_MAX_MB: float = config.get('scheduling', {}).get('travel_cache_max_mb', 256)
+# Number of customers taken at a time when the greedy scheduler consumes customers from a stream.
+STREAM_BATCH_SIZE: int = config.get('scheduling', {}).get('stream_batch_size', 10000)
+
 # Optimization parameters
 # These parameters are used by the optimization algorithm.
 OPTIMIZATION_MAX_TIME: int = config.get('optimization', {}).get('max_time_in_seconds', 60)
@@ -3,19 +3,23 @@ Contractor model for the Synthetic Errands Scheduler.
 Defines the Contractor class representing a contractor in the scheduling system.
 """
 
+import copy
 from typing import Tuple, Optional, Dict, List
 from datetime import datetime, timedelta
 from .contractor_calendar import ContractorCalendar
+from utils.planning_context import PlanningContext
 
 class Contractor:
     """Represents a contractor in the scheduling system."""
 
-    def __init__(self, id: int, location: Tuple[int, int], rate: float):
+    __slots__ = ('id', 'location', 'initial_location', 'rate', 'calendar')
+
+    def __init__(self, id: int, location: Tuple[int, int], rate: float, context: Optional[PlanningContext] = None):
         self.id: int = id
         self.location: Tuple[int, int] = location
         self.initial_location: Tuple[int, int] = location  # Starting location for each day
         self.rate: float = rate
-        self.calendar: ContractorCalendar = ContractorCalendar()
+        self.calendar: ContractorCalendar = ContractorCalendar(context)
     
     def reset_location(self) -> None:
         """Reset the contractor's location to the initial location."""
@@ -25,6 +29,24 @@ class Contractor:
         """Update the contractor's current location."""
         self.location = new_location
 
+    def snapshot(self) -> 'Contractor':
+        """A copy of the contractor whose calendar shares unchanged days with this one (copy on write)."""
+        contractor = copy.copy(self)
+        contractor.calendar = self.calendar.snapshot()
+        return contractor
+
+    def copy_unscheduled(self, context: Optional[PlanningContext] = None) -> 'Contractor':
+        """
+        A copy of the contractor at its initial location with no errands, keeping the time
+        taken out of blocked days, in the given planning context or the calendar's.
+        """
+        contractor = Contractor(self.id, self.initial_location, self.rate, context or self.calendar.context)
+        for day in self.calendar.blocked_days:
+            contractor.calendar.block_day(day)
+            for start, end in self.calendar.get_unreserved_intervals_minutes(day):
+                contractor.calendar.release_time_slot_minutes(start, end)
+        return contractor
+
     def __str__(self) -> str:
         """Return a string representation of the Contractor object."""
         return f"Contractor(id={self.id}, location={self.location}, rate=${self.rate:.2f}/minute)"
@@ -1,133 +1,516 @@
+import copy
+from bisect import bisect_left, bisect_right
+from collections import deque
+from itertools import chain
 from datetime import datetime, timedelta
-from typing import List, Tuple, Optional
-from constants import SCHEDULING_DAYS, WORK_START_TIME_OBJ, WORK_END_TIME_OBJ
-from utils.time_utils import is_time_within_range, get_next_working_day
+from typing import Deque, List, Set, Tuple, Optional
+from utils.planning_context import PlanningContext, get_planning_context
+from utils.time_utils import MINUTES_PER_DAY, datetime_to_minutes, minutes_to_datetime
+from utils.undo_log import UndoLog
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Number of recent errand changes a calendar keeps for views to catch up with (see changes_since).
+CHANGE_LOG_LENGTH = 64
+
+# A change to a day's errands: (day, errand removed, errand added), one of them None unless re-timed.
+ErrandChange = Tuple[int, Optional['ErrandAssignment'], Optional['ErrandAssignment']]
+
 class ContractorAvailabilitySlot:
+    __slots__ = ('start_time', 'end_time', 'available')
+
     def __init__(self, start_time: datetime, end_time: datetime):
         self.start_time = start_time
         self.end_time = end_time
         self.available = True
 
 class ErrandAssignment:
-    def __init__(self, errand_id: str, errand_type: str, travel_start_time: datetime, travel_end_time: datetime, 
-                 task_start_time: datetime, task_end_time: datetime, travel_duration: timedelta, total_duration: timedelta):
+    """
+    A reserved errand. Times are stored as integer minutes since the calendar's
+    epoch; the datetime and timedelta attributes are derived on access.
+    """
+
+    __slots__ = ('errand_id', 'customer_id', 'errand_type', 'travel_start', 'travel_end', 'task_start', 'task_end',
+                 'epoch')
+
+    def __init__(self, errand_id: str, errand_type: str, travel_start: int, travel_end: int,
+                 task_start: int, task_end: int, epoch: datetime, customer_id: Optional[int] = None):
         self.errand_id = errand_id
+        self.customer_id = customer_id  # Set when reserved through a Schedule
         self.errand_type = errand_type
-        self.travel_start_time = travel_start_time
-        self.travel_end_time = travel_end_time
-        self.task_start_time = task_start_time
-        self.task_end_time = task_end_time
-        self.travel_duration = travel_duration
-        self.total_duration = total_duration
+        self.travel_start = travel_start
+        self.travel_end = travel_end
+        self.task_start = task_start
+        self.task_end = task_end
+        self.epoch = epoch
+
+    @property
+    def travel_minutes(self) -> int:
+        return self.travel_end - self.travel_start
+
+    @property
+    def total_minutes(self) -> int:
+        return self.task_end - self.travel_start
+
+    @property
+    def travel_start_time(self) -> datetime:
+        return minutes_to_datetime(self.travel_start, self.epoch)
+
+    @property
+    def travel_end_time(self) -> datetime:
+        return minutes_to_datetime(self.travel_end, self.epoch)
+
+    @property
+    def task_start_time(self) -> datetime:
+        return minutes_to_datetime(self.task_start, self.epoch)
+
+    @property
+    def task_end_time(self) -> datetime:
+        return minutes_to_datetime(self.task_end, self.epoch)
+
+    @property
+    def travel_duration(self) -> timedelta:
+        return timedelta(minutes=self.travel_minutes)
+
+    @property
+    def total_duration(self) -> timedelta:
+        return timedelta(minutes=self.total_minutes)
 
 class ContractorCalendar:
-    def __init__(self):
-        self.calendar: List[Tuple[datetime, List[ContractorAvailabilitySlot]]] = []
+    """
+    Availability and errand bookkeeping for a single contractor.
+
+    Times are integer minutes since the epoch of the planning context (start_date),
+    whose horizon and working hours the calendar also follows, so day d covers
+    minutes [d * MINUTES_PER_DAY, (d + 1) * MINUTES_PER_DAY). Free time is kept per
+    day as parallel sorted lists of interval starts and ends; the day is found by
+    integer division and the slot by binary search. The datetime methods are thin
+    wrappers over the *_minutes methods for callers at the edges (GUI, formatters).
+
+    Changes can be made tentatively: after savepoint(), every change to the free
+    intervals, errands and blocked days is recorded in an undo log, and rollback()
+    reverts them in time proportional to the entries changed. snapshot() makes a
+    copy-on-write clone that shares unchanged days. `version` counts the changes to
+    the errands, so views derived from them (see Schedule) know when they are stale;
+    the most recent changes are kept so such views can be updated in place rather
+    than rebuilt (changes_since). Errands are never modified once reserved: re-timing
+    one replaces it with a copy.
+    """
+
+    def __init__(self, context: Optional[PlanningContext] = None):
+        self.context: PlanningContext = context if context is not None else get_planning_context()
         self.errands: List[Tuple[datetime, List[ErrandAssignment]]] = []
-        self.start_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.start_date = self.context.epoch
+        self._work_start: int = self.context.work_start_minutes
+        self._work_end: int = self.context.work_end_minutes
+        self._free_starts: List[List[int]] = []
+        self._free_ends: List[List[int]] = []
+        self._working_days: List[bool] = []
+        self._blocked_days: Set[int] = set()
+        self._undo_log: Optional[UndoLog] = None  # Records changes while a transaction is open
+        self.version: int = 0  # Incremented whenever an errand is added, removed or re-timed
+        self._changes: Deque[ErrandChange] = deque(maxlen=CHANGE_LOG_LENGTH)  # The changes leading to `version`
+        # Copy on write: whether the per-day lists may be shared with snapshots, and which days are private.
+        self._shared: bool = False
+        self._owned_days: List[bool] = []
         self._initialize_calendar()
 
     def _initialize_calendar(self):
-        for day in range(SCHEDULING_DAYS):
+        for day in range(self.context.num_days):
             current_date = self.start_date + timedelta(days=day)
-            work_start = current_date.replace(hour=WORK_START_TIME_OBJ.hour, minute=WORK_START_TIME_OBJ.minute)
-            work_end = current_date.replace(hour=WORK_END_TIME_OBJ.hour, minute=WORK_END_TIME_OBJ.minute)
-            self.calendar.append((current_date, [ContractorAvailabilitySlot(work_start, work_end)]))
+            day_start = day * MINUTES_PER_DAY
+            self._free_starts.append([day_start + self._work_start])
+            self._free_ends.append([day_start + self._work_end])
+            self._working_days.append(current_date.weekday() < 5)
             self.errands.append((current_date, []))
-        logger.debug(f"Calendar initialized for {SCHEDULING_DAYS} days starting from {self.start_date}")
+            self._owned_days.append(True)
+        logger.debug(f"Calendar initialized for {self.context.num_days} days starting from {self.start_date}")
+
+    @property
+    def calendar(self) -> List[Tuple[datetime, List[ContractorAvailabilitySlot]]]:
+        """The free-interval index as a list of (date, slots) pairs."""
+        return [
+            (date_key, [ContractorAvailabilitySlot(minutes_to_datetime(start, self.start_date),
+                                                   minutes_to_datetime(end, self.start_date))
+                        for start, end in zip(starts, ends)])
+            for (date_key, _), starts, ends in zip(self.errands, self._free_starts, self._free_ends)
+        ]
+
+    def get_free_intervals_minutes(self, day: int) -> List[Tuple[int, int]]:
+        """Free (start, end) intervals of a day, in minutes since the planning epoch."""
+        return list(zip(self._free_starts[day], self._free_ends[day]))
+
+    def is_working_day(self, day: int) -> bool:
+        return self._working_days[day]
+
+    def block_day(self, day: int) -> None:
+        """Take a day out of the contractor's availability without reserving an errand."""
+        self._set_intervals(day, 0, len(self._free_starts[day]), [], [])
+        self._set_blocked(day, True)
+
+    def is_blocked_day(self, day: int) -> bool:
+        """Whether time was taken out of the day with block_day() and not all of it released since."""
+        return day in self._blocked_days
+
+    def get_unreserved_intervals_minutes(self, day: int) -> List[Tuple[int, int]]:
+        """
+        The (start, end) intervals of a day that are free or held by errands: the working
+        hours less the time taken out with block_day() and not released.
+        """
+        spans = sorted(chain(zip(self._free_starts[day], self._free_ends[day]),
+                             ((errand.travel_start, errand.task_end) for errand in self.errands[day][1])))
+        intervals: List[Tuple[int, int]] = []
+        for start, end in spans:
+            if intervals and start <= intervals[-1][1]:
+                intervals[-1] = (intervals[-1][0], max(intervals[-1][1], end))
+            else:
+                intervals.append((start, end))
+        return intervals
+
+    @property
+    def blocked_days(self) -> List[int]:
+        return sorted(self._blocked_days)
+
+    def to_minutes(self, value: datetime) -> int:
+        return datetime_to_minutes(value, self.start_date)
 
     def is_available(self, start_time: datetime, end_time: datetime) -> bool:
-        date_key = start_time.replace(hour=0, minute=0, second=0, microsecond=0)
-        
-        calendar_entry = next((entry for entry in self.calendar if entry[0] == date_key), None)
-        if not calendar_entry:
-            logger.debug(f"Date {date_key} is outside the initialized range")
+        return self.is_available_minutes(self.to_minutes(start_time), self.to_minutes(end_time))
+
+    def is_available_minutes(self, start: int, end: int) -> bool:
+        day = start // MINUTES_PER_DAY
+        if not 0 <= day < len(self._free_starts):
             return False
-        
-        if not is_time_within_range(start_time.time(), WORK_START_TIME_OBJ, WORK_END_TIME_OBJ) or \
-           not is_time_within_range(end_time.time(), WORK_START_TIME_OBJ, WORK_END_TIME_OBJ):
-            logger.debug(f"Time slot {start_time} - {end_time} is outside working hours")
+
+        day_start = day * MINUTES_PER_DAY
+        if not day_start + self._work_start <= start <= end <= day_start + self._work_end:
             return False
-        
-        for slot in calendar_entry[1]:
-            if slot.available and slot.start_time <= start_time and slot.end_time >= end_time:
-                logger.debug(f"Available slot found: {slot.start_time} - {slot.end_time}")
-                return True
-        logger.debug(f"No available slot found for {start_time} - {end_time}")
-        return False
+
+        # The only interval that can contain the range is the last one starting at or before it.
+        slot_index = bisect_right(self._free_starts[day], start) - 1
+        return slot_index >= 0 and self._free_ends[day][slot_index] >= end
 
     def reserve_time_slot(self, errand_id: str, errand_type: str, travel_start_time: datetime, travel_end_time: datetime, 
                           task_start_time: datetime, task_end_time: datetime) -> bool:
-        if self.is_available(travel_start_time, task_end_time):
-            date_key = travel_start_time.replace(hour=0, minute=0, second=0, microsecond=0)
-            travel_duration = travel_end_time - travel_start_time
-            total_duration = task_end_time - travel_start_time
-            new_errand = ErrandAssignment(errand_id, errand_type, travel_start_time, travel_end_time, 
-                                          task_start_time, task_end_time, travel_duration, total_duration)
-            errand_entry = next(entry for entry in self.errands if entry[0] == date_key)
-            errand_entry[1].append(new_errand)
-            self._update_availability(date_key, travel_start_time, task_end_time)
-            logger.info(f"Reserved time slot for errand {errand_id}: {travel_start_time} - {task_end_time}")
+        return self.reserve_time_slot_minutes(errand_id, errand_type, self.to_minutes(travel_start_time),
+                                              self.to_minutes(travel_end_time), self.to_minutes(task_start_time),
+                                              self.to_minutes(task_end_time))
+
+    def reserve_time_slot_minutes(self, errand_id: str, errand_type: str, travel_start: int, travel_end: int,
+                                  task_start: int, task_end: int, customer_id: Optional[int] = None) -> bool:
+        if self.is_available_minutes(travel_start, task_end):
+            day = travel_start // MINUTES_PER_DAY
+            new_errand = ErrandAssignment(errand_id, errand_type, travel_start, travel_end,
+                                          task_start, task_end, self.start_date, customer_id)
+            self._add_errand(day, new_errand)
+            self._update_availability(day, travel_start, task_end)
+            logger.info(f"Reserved time slot for errand {errand_id}: minutes {travel_start} - {task_end}")
             return True
-        logger.warning(f"Failed to reserve time slot for errand {errand_id}: {travel_start_time} - {task_end_time}")
+        logger.warning(f"Failed to reserve time slot for errand {errand_id}: minutes {travel_start} - {task_end}")
         return False
 
-    def _update_availability(self, date_key: datetime, start_time: datetime, end_time: datetime):
-        calendar_entry = next(entry for entry in self.calendar if entry[0] == date_key)
-        updated_slots = []
-        for slot in calendar_entry[1]:
-            if not slot.available:
-                updated_slots.append(slot)
-                continue
-
-            if start_time >= slot.end_time or end_time <= slot.start_time:
-                # No overlap
-                updated_slots.append(slot)
-            elif start_time <= slot.start_time and end_time >= slot.end_time:
-                # Errand fully covers the slot
-                continue
-            else:
-                # Partial overlap
-                if slot.start_time < start_time:
-                    updated_slots.append(ContractorAvailabilitySlot(slot.start_time, start_time))
-                if end_time < slot.end_time:
-                    updated_slots.append(ContractorAvailabilitySlot(end_time, slot.end_time))
+    def release_errand_minutes(self, errand_id: str) -> Optional[ErrandAssignment]:
+        """Cancel a reserved errand, returning its time to the free intervals. Returns the errand, or None if unknown."""
+        for day, (_, errand_list) in enumerate(self.errands):
+            for index, errand in enumerate(errand_list):
+                if errand.errand_id == errand_id:
+                    self._delete_errand(day, index)
+                    self._release(day, errand.travel_start, errand.task_end)
+                    logger.info(f"Released time slot for errand {errand_id}: minutes {errand.travel_start} - {errand.task_end}")
+                    return errand
+        logger.warning(f"Failed to release unknown errand {errand_id}")
+        return None
+
+    def retime_travel_minutes(self, errand: ErrandAssignment, travel_start: int) -> bool:
+        """
+        Move the start of an errand's travel leg, keeping its task times, e.g. after the
+        errand before it changed. Starting earlier needs the extra time to be free.
+        """
+        day = errand.task_start // MINUTES_PER_DAY
+        index = next((index for index, other in enumerate(self.errands[day][1]) if other.errand_id == errand.errand_id),
+                     None)
+        if index is None or travel_start > errand.task_start:
+            return False
+        errand = self.errands[day][1][index]
+        if travel_start > errand.travel_start:
+            self._release(day, errand.travel_start, travel_start)
+        elif travel_start < errand.travel_start:
+            if not self.is_available_minutes(travel_start, errand.travel_start):
+                return False
+            self._update_availability(day, travel_start, errand.travel_start)
+        self._set_travel_start(day, index, travel_start)
+        return True
+
+    def changes_since(self, version: int) -> Optional[List[ErrandChange]]:
+        """
+        The changes to the errands made after `version`, oldest first, or None if they are
+        more than the calendar keeps.
+        """
+        count = self.version - version
+        if not 0 <= count <= len(self._changes):
+            return None
+        return list(self._changes)[len(self._changes) - count:]
+
+    def release_time_slot(self, start_time: datetime, end_time: datetime) -> bool:
+        return self.release_time_slot_minutes(self.to_minutes(start_time), self.to_minutes(end_time))
+
+    def release_time_slot_minutes(self, start: int, end: int) -> bool:
+        """
+        Return a range of busy time that holds no errand to the free intervals, e.g. time
+        taken out of a blocked day. The range must lie within one day's working hours;
+        ranges overlapping a reserved errand are refused (use release_errand_minutes).
+        A blocked day stays blocked until all of its working hours are free or held by errands.
+        """
+        day = start // MINUTES_PER_DAY
+        day_start = day * MINUTES_PER_DAY
+        if not (0 <= day < len(self._free_starts) and
+                day_start + self._work_start <= start < end <= day_start + self._work_end):
+            return False
+        if any(errand.travel_start < end and start < errand.task_end for errand in self.errands[day][1]):
+            logger.warning(f"Failed to release minutes {start} - {end}: the range holds an errand")
+            return False
+        self._release(day, start, end)
+        if self.get_unreserved_intervals_minutes(day) == [(day_start + self._work_start, day_start + self._work_end)]:
+            self._set_blocked(day, False)
+        return True
+
+    def coalesce(self, day: Optional[int] = None) -> int:
+        """
+        Merge overlapping and adjacent free intervals and drop empty ones, for one day or
+        all days. Reservations and releases keep the intervals coalesced, so this is only
+        needed after the intervals were changed by other means.
+
+        Returns:
+            int: The number of intervals removed.
+        """
+        days = range(len(self._free_starts)) if day is None else [day]
+        removed = 0
+        for index in days:
+            merged_starts: List[int] = []
+            merged_ends: List[int] = []
+            for start, end in sorted(zip(self._free_starts[index], self._free_ends[index])):
+                if end <= start:
+                    continue
+                if merged_ends and start <= merged_ends[-1]:
+                    merged_ends[-1] = max(merged_ends[-1], end)
+                else:
+                    merged_starts.append(start)
+                    merged_ends.append(end)
+            removed += len(self._free_starts[index]) - len(merged_starts)
+            if merged_starts != self._free_starts[index] or merged_ends != self._free_ends[index]:
+                self._set_intervals(index, 0, len(self._free_starts[index]), merged_starts, merged_ends)
+        return removed
+
+    def snapshot(self) -> 'ContractorCalendar':
+        """
+        Copy of the calendar that shares its days with this one until either of them
+        changes a day, which then gets a private copy of that day's intervals and errands.
+        Taking a snapshot costs O(1); memory grows with the days modified afterwards.
+        """
+        clone = object.__new__(ContractorCalendar)
+        clone.__dict__.update(self.__dict__)
+        clone._blocked_days = set(self._blocked_days)
+        clone._changes = deque(maxlen=CHANGE_LOG_LENGTH)
+        clone._undo_log = None
+        self._shared = clone._shared = True
+        return clone
+
+    def savepoint(self) -> int:
+        """Start recording changes if needed and return a position to roll back to."""
+        if self._undo_log is None:
+            self._undo_log = UndoLog()
+        return self._undo_log.savepoint()
+
+    def rollback(self, savepoint: int = 0) -> int:
+        """Revert the changes made since the savepoint, returning how many were reverted."""
+        if self._undo_log is None:
+            raise ValueError("No transaction is open")
+        return self._undo_log.rollback(savepoint)
+
+    def commit(self) -> None:
+        """Keep the changes made and stop recording them."""
+        self._undo_log = None
+
+    def attach_undo_log(self, undo_log: Optional[UndoLog]) -> None:
+        """Record changes in a log shared with other objects (e.g. a Schedule), or stop recording with None."""
+        self._undo_log = undo_log
+
+    def get_fragmentation(self, day: int) -> float:
+        """
+        Fragmentation of a day's free time: 1 - largest free interval / total free minutes.
+        0 when the free time is one interval (or there is none), approaching 1 as it is
+        scattered over many small gaps that fit no errand.
+        """
+        lengths = [end - start for start, end in zip(self._free_starts[day], self._free_ends[day])]
+        total = sum(lengths)
+        if not total:
+            return 0.0
+        return 1 - max(lengths) / total
+
+    def get_fragmentation_stats(self) -> dict:
+        """Free interval counts and fragmentation over all days, to monitor calendars under churn."""
+        fragmentation = [self.get_fragmentation(day) for day in range(len(self._free_starts))]
+        counts = [len(starts) for starts in self._free_starts]
+        return {
+            'free_intervals': sum(counts),
+            'max_free_intervals_per_day': max(counts, default=0),
+            'mean_fragmentation': sum(fragmentation) / len(fragmentation) if fragmentation else 0.0,
+            'max_fragmentation': max(fragmentation, default=0.0),
+        }
+
+    def _release(self, day: int, start: int, end: int):
+        """Return [start, end) to the free intervals of a day, merged with the free intervals it touches."""
+        starts = self._free_starts[day]
+        ends = self._free_ends[day]
+
+        # Intervals [first, last) are the ones overlapping or adjacent to the released range.
+        first = bisect_left(ends, start)
+        last = bisect_right(starts, end, first)
+        if first < last:
+            start = min(start, starts[first])
+            end = max(end, ends[last - 1])
+        self._set_intervals(day, first, last, [start], [end])
 
-        # Update the calendar entry with the new list of slots
-        calendar_index = next(i for i, entry in enumerate(self.calendar) if entry[0] == date_key)
-        self.calendar[calendar_index] = (date_key, updated_slots)
-        logger.debug(f"Updated availability for {date_key}: {len(updated_slots)} slots")
+    def _update_availability(self, day: int, start: int, end: int):
+        starts = self._free_starts[day]
+        ends = self._free_ends[day]
+
+        # Intervals [first, last) are the ones overlapping the reserved range.
+        first = bisect_right(ends, start)
+        last = bisect_left(starts, end, first)
+        if first >= last:
+            return
+
+        remaining_starts = []
+        remaining_ends = []
+        if starts[first] < start:
+            remaining_starts.append(starts[first])
+            remaining_ends.append(start)
+        if end < ends[last - 1]:
+            remaining_starts.append(end)
+            remaining_ends.append(ends[last - 1])
+
+        self._set_intervals(day, first, last, remaining_starts, remaining_ends)
+
+    def _own_day(self, day: int):
+        """Make the day's lists private to this calendar before they are changed (copy on write)."""
+        if self._shared:
+            self._free_starts = list(self._free_starts)
+            self._free_ends = list(self._free_ends)
+            self.errands = list(self.errands)
+            self._owned_days = [False] * len(self._free_starts)
+            self._shared = False
+        if not self._owned_days[day]:
+            self._free_starts[day] = list(self._free_starts[day])
+            self._free_ends[day] = list(self._free_ends[day])
+            date_key, errand_list = self.errands[day]
+            self.errands[day] = (date_key, list(errand_list))  # Errands are replaced, not modified, so they are shared
+            self._owned_days[day] = True
+
+    def _set_intervals(self, day: int, first: int, last: int, starts: List[int], ends: List[int]):
+        """Replace free intervals [first, last) of a day, recording the change in an open transaction."""
+        self._own_day(day)
+        if self._undo_log is not None:
+            old_starts, old_ends, count = self._free_starts[day][first:last], self._free_ends[day][first:last], len(starts)
+
+            def undo():
+                self._own_day(day)
+                self._free_starts[day][first:first + count] = old_starts
+                self._free_ends[day][first:first + count] = old_ends
+            self._undo_log.record(undo)
+        self._free_starts[day][first:last] = starts
+        self._free_ends[day][first:last] = ends
+
+    def _record_change(self, day: int, removed: Optional[ErrandAssignment], added: Optional[ErrandAssignment]):
+        self.version += 1
+        self._changes.append((day, removed, added))
+
+    def _add_errand(self, day: int, errand: ErrandAssignment):
+        self._own_day(day)
+        self.errands[day][1].append(errand)
+        self._record_change(day, None, errand)
+        if self._undo_log is not None:
+            def undo():
+                self._own_day(day)
+                self._record_change(day, self.errands[day][1].pop(), None)
+            self._undo_log.record(undo)
+
+    def _delete_errand(self, day: int, index: int):
+        self._own_day(day)
+        errand = self.errands[day][1].pop(index)
+        self._record_change(day, errand, None)
+        if self._undo_log is not None:
+            def undo():
+                self._own_day(day)
+                self.errands[day][1].insert(index, errand)
+                self._record_change(day, None, errand)
+            self._undo_log.record(undo)
+
+    def _set_travel_start(self, day: int, index: int, travel_start: int):
+        self._own_day(day)
+        errand = self.errands[day][1][index]
+        retimed = copy.copy(errand)
+        retimed.travel_start = travel_start
+        self.errands[day][1][index] = retimed
+        self._record_change(day, errand, retimed)
+        if self._undo_log is not None:
+            def undo():
+                self._own_day(day)
+                self.errands[day][1][index] = errand
+                self._record_change(day, retimed, errand)
+            self._undo_log.record(undo)
+
+    def _set_blocked(self, day: int, blocked: bool):
+        if blocked == (day in self._blocked_days):
+            return
+        if blocked:
+            self._blocked_days.add(day)
+        else:
+            self._blocked_days.discard(day)
+        if self._undo_log is not None:
+            self._undo_log.record(lambda: (self._blocked_days.discard if blocked else self._blocked_days.add)(day))
 
     def get_next_available_slot(self, start_datetime: datetime, min_duration: timedelta) -> Optional[dict]:
-        current_date = start_datetime.replace(hour=0, minute=0, second=0, microsecond=0)
-        logger.debug(f"Searching for next available slot from {start_datetime} with duration {min_duration}")
-        
-        for calendar_entry in self.calendar:
-            if calendar_entry[0] >= current_date:
-                logger.debug(f"Checking date: {calendar_entry[0]}")
-                for slot in calendar_entry[1]:
-                    if slot.available:
-                        start = max(slot.start_time, start_datetime)
-                        if slot.end_time - start >= min_duration:
-                            end = start + min_duration
-                            if self.is_available(start, end):
-                                logger.debug(f"Found valid slot: {start} - {end}")
-                                return {'start': start, 'end': end}
-                        else:
-                            logger.debug(f"Slot {slot.start_time} - {slot.end_time} is too short for duration {min_duration}")
-                    else:
-                        logger.debug(f"Slot {slot.start_time} - {slot.end_time} is not available")
-                
-                logger.debug(f"No available slot found for {calendar_entry[0]}, moving to next day")
-                current_date = get_next_working_day(calendar_entry[0])
-                start_datetime = current_date.replace(hour=WORK_START_TIME_OBJ.hour, minute=WORK_START_TIME_OBJ.minute)
+        duration = min_duration // timedelta(minutes=1)
+        start = self.get_next_available_minute(self.to_minutes(start_datetime), duration)
+        if start is None:
+            return None
+        return {'start': minutes_to_datetime(start, self.start_date),
+                'end': minutes_to_datetime(start + duration, self.start_date)}
+
+    def get_next_available_minute(self, start: int, duration: int) -> Optional[int]:
+        """
+        First-fit search for a free range of the given length starting at or after start.
+        Days after the first one are only searched if they are working days.
+        """
+        day = max(start // MINUTES_PER_DAY, 0)
+        while day < len(self._free_starts):
+            slot_start = self._find_slot_in_day(day, start, duration)
+            if slot_start is not None:
+                return slot_start
+
+            day = self._next_working_day(day)
+            start = day * MINUTES_PER_DAY + self._work_start
 
         logger.debug("No available slot found within scheduling period")
         return None
 
+    def _find_slot_in_day(self, day: int, start: int, duration: int) -> Optional[int]:
+        """First-fit search within one day, skipping intervals that end before start."""
+        starts = self._free_starts[day]
+        ends = self._free_ends[day]
+        for slot_index in range(bisect_right(ends, start), len(starts)):
+            slot_start = max(starts[slot_index], start)
+            if ends[slot_index] - slot_start >= duration:
+                return slot_start
+        return None
+
+    def _next_working_day(self, day: int) -> int:
+        day += 1
+        while day < len(self._working_days) and not self._working_days[day]:
+            day += 1
+        return day
+
 def is_overlapping(start1: datetime, end1: datetime, start2: datetime, end2: datetime) -> bool:
     return start1 < end2 and end1 > start2
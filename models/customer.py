@@ -8,6 +8,14 @@ from datetime import datetime
 from models.errand import Errand
 
 class Customer:
+    """
+    A customer with the errand they want done and their availability.
+
+    Generated customers share one availability structure per planning context and
+    their errands share specs by type, so neither is to be modified in place.
+    """
+
+    __slots__ = ('id', 'location', 'desired_errand', 'availability')
 
     def __init__(self, id: int, location: Tuple[int, int], desired_errand: Errand, availability: List[Tuple[datetime, List[Tuple[datetime, datetime]]]]):
         self.id: int = id
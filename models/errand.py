@@ -3,11 +3,58 @@ Errand model for the Synthetic Errands Scheduler
 
 This module defines the Errand class, which represents an errand in the scheduling system.
 It includes methods for calculating charges, applying incentives and disincentives.
+The attributes that come from the errand's type (base time, incentive, disincentive and
+base charge) live in an ErrandSpec shared by all errands of that kind (errand_spec()),
+so an errand only holds its id and its spec.
+Final charges are looked up in a ChargeTable shared by all errands (CHARGE_TABLE), which
+holds them per kind of errand and day offset and also serves array lookups.
 """
 
 from datetime import datetime, timedelta, date
+import numpy as np
 from constants import MAX_INCENTIVE_MULTIPLIER, ERRAND_RATES, SCHEDULING_DAYS, ErrandType
-from typing import Dict, Union
+from typing import Dict, List, Optional, Union
+
+Disincentive = Union[Dict[str, Union[str, int, float]], None]
+
+class ErrandSpec:
+    """
+    The type-level attributes of errands, shared by every errand of the same kind.
+
+    Specs are interned by errand_spec() and must not be modified. The charge kind (row
+    in CHARGE_TABLE) is looked up once per spec; unpickling re-interns the spec, so the
+    kind is looked up again in the receiving process.
+    """
+
+    __slots__ = ('type', 'base_time', 'base_minutes', 'incentive', 'disincentive', 'charge', 'charge_kind')
+
+    def __init__(self, type: ErrandType, base_time: timedelta, incentive: float, disincentive: Disincentive):
+        self.type: ErrandType = type
+        self.base_time: timedelta = base_time
+        self.base_minutes: int = base_time // timedelta(minutes=1)
+        self.incentive: float = incentive
+        self.disincentive: Disincentive = disincentive
+        # Default to $1 per minute if type not found
+        self.charge: float = base_time.total_seconds() / 60 * ERRAND_RATES.get(type, 1)
+        self.charge_kind: Optional[int] = None
+
+    def __reduce__(self):
+        return errand_spec, (self.type, self.base_time, self.incentive, self.disincentive)
+
+    def __str__(self) -> str:
+        return f"ErrandSpec(type={self.type.name}, base_time={self.base_time}, charge=${self.charge:.2f})"
+
+    __repr__ = __str__
+
+_errand_specs: Dict[tuple, ErrandSpec] = {}
+
+def errand_spec(type: ErrandType, base_time: timedelta, incentive: float, disincentive: Disincentive) -> ErrandSpec:
+    """The shared spec of errands with the given type, base time, incentive and disincentive."""
+    key = (type, base_time, incentive, tuple(sorted(disincentive.items())) if disincentive else None)
+    spec = _errand_specs.get(key)
+    if spec is None:
+        spec = _errand_specs[key] = ErrandSpec(type, base_time, incentive, disincentive)
+    return spec
 
 class Errand:
     """
@@ -15,20 +62,52 @@ class Errand:
 
     Attributes:
         id (int): Unique identifier for the errand.
+        spec (ErrandSpec): The shared attributes of the errand's kind, which the following read from.
         type (ErrandType): Type of the errand.
         base_time (timedelta): Base time required to complete the errand.
+        base_minutes (int): Base time in whole minutes, for the integer-minute scheduling core.
         incentive (float): Incentive multiplier for same-day service.
         disincentive (Dict[str, Union[str, int, float]] or None): Disincentive rules for late completion.
         charge (float): Base charge for the errand.
     """
 
-    def __init__(self, id: int, type: ErrandType, base_time: timedelta, incentive: float, disincentive: Union[Dict[str, Union[str, int, float]], None]):
+    __slots__ = ('id', 'spec')
+
+    def __init__(self, id: int, type: ErrandType, base_time: timedelta, incentive: float, disincentive: Disincentive):
         self.id: int = id
-        self.type: ErrandType = type
-        self.base_time: timedelta = base_time
-        self.incentive: float = incentive
-        self.disincentive: Union[Dict[str, Union[str, int, float]], None] = disincentive
-        self.charge: float = self.calculate_base_charge()
+        self.spec: ErrandSpec = errand_spec(type, base_time, incentive, disincentive)
+
+    @classmethod
+    def from_spec(cls, id: int, spec: ErrandSpec) -> 'Errand':
+        """An errand of an already interned spec, skipping the lookup."""
+        errand = cls.__new__(cls)
+        errand.id = id
+        errand.spec = spec
+        return errand
+
+    @property
+    def type(self) -> ErrandType:
+        return self.spec.type
+
+    @property
+    def base_time(self) -> timedelta:
+        return self.spec.base_time
+
+    @property
+    def base_minutes(self) -> int:
+        return self.spec.base_minutes
+
+    @property
+    def incentive(self) -> float:
+        return self.spec.incentive
+
+    @property
+    def disincentive(self) -> Disincentive:
+        return self.spec.disincentive
+
+    @property
+    def charge(self) -> float:
+        return self.spec.charge
 
     def calculate_base_charge(self) -> float:
         """
@@ -50,13 +129,7 @@ class Errand:
         Returns:
             float: The charge after applying the incentive.
         """
-        scheduled_date_only = scheduled_date.date() if isinstance(scheduled_date, datetime) else scheduled_date
-        request_date_only = request_date.date() if isinstance(request_date, datetime) else request_date
-
-        if scheduled_date_only == request_date_only:
-            incentive_charge = self.charge * self.incentive
-            return min(incentive_charge, self.charge * MAX_INCENTIVE_MULTIPLIER)
-        return self.charge
+        return self._incentive_charge(self._days_between(scheduled_date, request_date))
 
     def apply_disincentive(self, scheduled_date: Union[datetime, date], request_date: Union[datetime, date]) -> float:
         """
@@ -69,13 +142,62 @@ class Errand:
         Returns:
             float: The charge after applying the disincentive.
         """
-        if self.disincentive is None:
-            return self.charge
+        return self._disincentive_charge(self._days_between(scheduled_date, request_date))
+
+    def calculate_final_charge(self, scheduled_date: Union[datetime, date], request_date: Union[datetime, date]) -> float:
+        """
+        Calculate the final charge for the errand, considering incentives and disincentives.
+
+        Args:
+            scheduled_date (Union[datetime, date]): The date or datetime the errand is scheduled for.
+            request_date (Union[datetime, date]): The date or datetime the errand was requested.
+
+        Returns:
+            float: The final charge for the errand.
+        """
+        return self.calculate_final_charge_for_offset(self._days_between(scheduled_date, request_date))
+
+    def calculate_final_charge_for_offset(self, days_difference: int) -> float:
+        """
+        Calculate the final charge for an errand scheduled a number of days after it was requested.
+
+        Args:
+            days_difference (int): Days between the request date and the scheduled date.
+
+        Returns:
+            float: The final charge for the errand.
+        """
+        return CHARGE_TABLE.charge(self.charge_kind, days_difference)
 
+    @property
+    def charge_kind(self) -> int:
+        """Row of the errand in CHARGE_TABLE, shared by errands charged alike (in practice, by type)."""
+        spec = self.spec
+        if spec.charge_kind is None:
+            spec.charge_kind = CHARGE_TABLE.kind_of(self)
+        return spec.charge_kind
+
+    def compute_final_charge_for_offset(self, days_difference: int) -> float:
+        """The final charge for a day offset computed from the incentive and disincentive rules."""
+        incentive_charge = self._incentive_charge(days_difference)
+        final_charge = self._disincentive_charge(days_difference)
+        return max(incentive_charge, final_charge)
+
+    @staticmethod
+    def _days_between(scheduled_date: Union[datetime, date], request_date: Union[datetime, date]) -> int:
         scheduled_date_only = scheduled_date.date() if isinstance(scheduled_date, datetime) else scheduled_date
         request_date_only = request_date.date() if isinstance(request_date, datetime) else request_date
+        return (scheduled_date_only - request_date_only).days
 
-        days_difference = (scheduled_date_only - request_date_only).days
+    def _incentive_charge(self, days_difference: int) -> float:
+        if days_difference == 0:
+            incentive_charge = self.charge * self.incentive
+            return min(incentive_charge, self.charge * MAX_INCENTIVE_MULTIPLIER)
+        return self.charge
+
+    def _disincentive_charge(self, days_difference: int) -> float:
+        if self.disincentive is None:
+            return self.charge
 
         # Apply gradual disincentive within SLA window
         if days_difference <= SCHEDULING_DAYS:
@@ -91,23 +213,60 @@ class Errand:
             return max(0, self.charge - (self.disincentive['value'] * days_past))
         return self.charge
 
-    def calculate_final_charge(self, scheduled_date: Union[datetime, date], request_date: Union[datetime, date]) -> float:
-        """
-        Calculate the final charge for the errand, considering incentives and disincentives.
-
-        Args:
-            scheduled_date (Union[datetime, date]): The date or datetime the errand is scheduled for.
-            request_date (Union[datetime, date]): The date or datetime the errand was requested.
-
-        Returns:
-            float: The final charge for the errand.
-        """
-        incentive_charge = self.apply_incentive(scheduled_date, request_date)
-        final_charge = self.apply_disincentive(scheduled_date, request_date)
-        return max(incentive_charge, final_charge)
-
     def __str__(self) -> str:
         return f"Errand(id={self.id}, type={self.type.name}, base_time={self.base_time}, charge=${self.charge:.2f})"
 
     def __repr__(self) -> str:
-        return self.__str__()
\ No newline at end of file
+        return self.__str__()
+
+class ChargeTable:
+    """
+    Final charges by kind of errand and day offset, computed once per kind.
+
+    A kind is a combination of errand type, base charge, incentive and disincentive;
+    errands generated from ERRAND_TYPES give one kind per type. Rows cover a range of
+    day offsets (scheduled day - request day) that grows when an offset outside it is
+    looked up. Errands are assumed not to change their charge rules once looked up.
+    """
+
+    def __init__(self, min_offset: int = -SCHEDULING_DAYS, max_offset: int = 2 * SCHEDULING_DAYS):
+        self.min_offset: int = min_offset
+        self.max_offset: int = max_offset
+        self._kinds: Dict[tuple, int] = {}
+        self._errands: List[Errand] = []  # An errand of each kind, whose rules fill its row
+        self.charges_by_kind: np.ndarray = np.zeros((0, max_offset - min_offset + 1))
+
+    def kind_of(self, errand: Errand) -> int:
+        disincentive = tuple(sorted(errand.disincentive.items())) if errand.disincentive else None
+        key = (errand.type, errand.charge, errand.incentive, disincentive)
+        kind = self._kinds.get(key)
+        if kind is None:
+            kind = self._kinds[key] = len(self._errands)
+            self._errands.append(errand)
+            self.charges_by_kind = np.vstack([self.charges_by_kind, self._row(errand)])
+        return kind
+
+    def charge(self, kind: int, days_difference: int) -> float:
+        if not self.min_offset <= days_difference <= self.max_offset:
+            self._extend(days_difference, days_difference)
+        return self.charges_by_kind.item(kind, days_difference - self.min_offset)
+
+    def charges(self, kinds: np.ndarray, days_differences: np.ndarray) -> np.ndarray:
+        """Final charges of kinds at day offsets, broadcast against each other."""
+        days_differences = np.asarray(days_differences, dtype=np.int64)
+        if days_differences.size:
+            low, high = int(days_differences.min()), int(days_differences.max())
+            if low < self.min_offset or high > self.max_offset:
+                self._extend(low, high)
+        return self.charges_by_kind[np.asarray(kinds, dtype=np.int64), days_differences - self.min_offset]
+
+    def _row(self, errand: Errand) -> List[float]:
+        return [errand.compute_final_charge_for_offset(offset) for offset in range(self.min_offset, self.max_offset + 1)]
+
+    def _extend(self, low: int, high: int) -> None:
+        self.min_offset = min(self.min_offset, low)
+        self.max_offset = max(self.max_offset, high)
+        self.charges_by_kind = np.array([self._row(errand) for errand in self._errands], dtype=float).reshape(
+            len(self._errands), self.max_offset - self.min_offset + 1)
+
+CHARGE_TABLE: ChargeTable = ChargeTable()
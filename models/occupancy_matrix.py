@@ -0,0 +1,122 @@
+"""
+Occupancy matrix calendar backend for the Synthetic Errands Scheduler.
+
+Stores the working hours of every contractor over the scheduling horizon as a
+contractors x days x cells boolean matrix (one cell per `resolution` minutes) and
+answers "earliest start where a free run of N minutes exists" for all contractors
+at once with NumPy array operations.
+
+The matrix mirrors ContractorCalendar instances, which remain the source of truth
+for reservations. With a resolution of 1 minute the answers are exact; coarser
+resolutions round reservations outwards to whole cells, so the matrix may miss a
+slot the calendar would accept but never offers one the calendar would reject.
+"""
+
+from typing import Optional, Sequence
+import numpy as np
+from models.contractor_calendar import ContractorCalendar
+from utils.planning_context import PlanningContext, get_planning_context
+from utils.time_utils import MINUTES_PER_DAY
+
+class OccupancyMatrix:
+    """Vectorized occupancy of a fleet of contractor calendars."""
+
+    def __init__(self, calendars: Sequence[ContractorCalendar], resolution: int = 1,
+                 context: Optional[PlanningContext] = None):
+        if resolution < 1:
+            raise ValueError("Resolution must be at least 1 minute")
+        if context is None:
+            context = calendars[0].context if calendars else get_planning_context()
+        self.resolution: int = resolution
+        self.work_start_minutes: int = context.work_start_minutes
+        self.cells_per_day: int = context.day_minutes // resolution
+        self.num_days: int = context.num_days
+        self._cell_offsets: np.ndarray = np.arange(self.cells_per_day, dtype=np.int16)
+
+        shape = (len(calendars), self.num_days, self.cells_per_day)
+        self.busy: np.ndarray = np.ones(shape, dtype=bool)
+        # Free cells from each cell up to the next busy cell or the end of the day.
+        self._runs: np.ndarray = np.zeros(shape, dtype=np.int16)
+        # Longest free run per contractor-day, used to find the first day that can fit.
+        self._max_runs: np.ndarray = np.zeros(shape[:2], dtype=np.int16)
+        self._working_days: np.ndarray = np.zeros(self.num_days, dtype=bool)
+
+        for row, calendar in enumerate(calendars):
+            for day in range(self.num_days):
+                for start, end in calendar.get_free_intervals_minutes(day):
+                    first_cell = -(-(start - self._day_base(day)) // resolution)
+                    last_cell = (end - self._day_base(day)) // resolution
+                    self.busy[row, day, max(first_cell, 0):max(last_cell, 0)] = False
+        if calendars:
+            self._working_days[:] = [calendars[0].is_working_day(day) for day in range(self.num_days)]
+        self._recompute(slice(None), slice(None))
+
+    def _day_base(self, day: int) -> int:
+        return day * MINUTES_PER_DAY + self.work_start_minutes
+
+    def _recompute(self, rows, days) -> None:
+        busy = self.busy[rows, days]
+        next_busy = np.where(busy, self._cell_offsets, self.cells_per_day).astype(np.int16)
+        next_busy = np.minimum.accumulate(next_busy[..., ::-1], axis=-1)[..., ::-1]
+        runs = next_busy - self._cell_offsets
+        self._runs[rows, days] = runs
+        self._max_runs[rows, days] = runs.max(axis=-1) if self.cells_per_day else 0
+
+    def reserve(self, row: int, start: int, end: int) -> None:
+        """Mark minutes [start, end) of a contractor's calendar as busy."""
+        day = start // MINUTES_PER_DAY
+        if not 0 <= day < self.num_days:
+            return
+        first_cell = (start - self._day_base(day)) // self.resolution
+        last_cell = -(-(end - self._day_base(day)) // self.resolution)
+        self.busy[row, day, max(first_cell, 0):max(last_cell, 0)] = True
+        self._recompute(row, day)
+
+    def earliest_fit(self, durations: np.ndarray, start: int, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Find, for every contractor, the earliest start at or after `start` with a free run
+        of durations[row] minutes.
+
+        Follows ContractorCalendar.get_next_available_minute: the day containing `start`
+        is always searched, later days only if they are working days.
+
+        Args:
+            durations (np.ndarray): Required minutes per contractor row.
+            start (int): Earliest start in minutes since the planning epoch.
+            rows (Optional[np.ndarray]): Contractor rows to search, with durations aligned to them;
+                all rows if omitted.
+
+        Returns:
+            np.ndarray: Start minute per searched row, or -1 where nothing fits.
+        """
+        rows = np.arange(self.busy.shape[0]) if rows is None else np.asarray(rows, dtype=np.int64)
+        needed = -(-np.asarray(durations, dtype=np.int64) // self.resolution)
+        result = np.full(len(rows), -1, dtype=np.int64)
+        start_day = max(start // MINUTES_PER_DAY, 0)
+        if start_day >= self.num_days or not len(rows):
+            return result
+
+        # Day containing start: if start falls inside working hours, only cells at or after it are
+        # eligible, so that day is scanned cell by cell; otherwise it is handled like later days.
+        first_cell = max(-(-(start - self._day_base(start_day)) // self.resolution), 0)
+        candidate_days = np.flatnonzero(self._working_days[start_day + 1:]) + start_day + 1
+        positions = np.arange(len(rows))
+        if first_cell == 0:
+            candidate_days = np.concatenate(([start_day], candidate_days))
+        elif first_cell < self.cells_per_day:
+            fits = self._runs[rows, start_day, first_cell:] >= needed[:, None]
+            found = fits.any(axis=1)
+            offsets = fits.argmax(axis=1) + first_cell
+            result[found] = self._day_base(start_day) + offsets[found] * self.resolution
+            positions = positions[~found]
+
+        # Pick each remaining contractor's first day whose longest free run fits, then the first cell.
+        if positions.size and candidate_days.size:
+            day_fits = self._max_runs[np.ix_(rows[positions], candidate_days)] >= needed[positions, None]
+            has_day = day_fits.any(axis=1)
+            positions = positions[has_day]
+            days = candidate_days[day_fits[has_day].argmax(axis=1)]
+            offsets = (self._runs[rows[positions], days] >= needed[positions, None]).argmax(axis=1)
+            result[positions] = days * MINUTES_PER_DAY + self.work_start_minutes + offsets * self.resolution
+
+        return result
@@ -0,0 +1,317 @@
+"""
+Route plan model for the Synthetic Errands Scheduler.
+
+A RoutePlan is a lightweight working representation of a schedule for construction
+and improvement algorithms. Each contractor has one route per day: an ordered list
+of customers served back to back from the start of working hours (or of the longest
+time left on a day partly blocked or holding errands of customers outside the plan),
+starting at the contractor's initial location. Travel times come from a TravelMatrix by point index,
+and charges from a customers x days table, so evaluating a change to a route is a few
+array lookups instead of calendar searches.
+
+A plan is turned into a regular Schedule with to_schedule().
+"""
+
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+from models.contractor import Contractor
+from models.customer import Customer
+from models.errand import CHARGE_TABLE
+from models.schedule import Schedule
+from utils.planning_context import PlanningContext, get_planning_context
+from utils.time_utils import MINUTES_PER_DAY
+from utils.travel_matrix import TravelMatrix
+
+class RoutePlan:
+    """Per contractor-day routes of customers, packed from the start minute of each route."""
+
+    def __init__(self, customers: Sequence[Customer], contractors: Sequence[Contractor],
+                 travel_matrix: Optional[TravelMatrix] = None, num_days: Optional[int] = None,
+                 context: Optional[PlanningContext] = None):
+        if context is None:
+            context = contractors[0].calendar.context if contractors else get_planning_context()
+        self.context: PlanningContext = context
+        self.customers: Sequence[Customer] = customers
+        self.contractors: Sequence[Contractor] = contractors
+        if travel_matrix is None:
+            travel_matrix = TravelMatrix.from_problem(customers, contractors)
+        self.travel_matrix: TravelMatrix = travel_matrix
+        self.num_days: int = num_days if num_days is not None else context.num_days
+        self.day_minutes: int = context.day_minutes
+
+        self.travel: np.ndarray = self.travel_matrix.minutes
+        self.depot_points: np.ndarray = np.array(
+            [self.travel_matrix.index_of(contractor.initial_location) for contractor in contractors], dtype=np.int64)
+        self.customer_points: np.ndarray = np.array(
+            [self.travel_matrix.index_of(customer.location) for customer in customers], dtype=np.int64)
+        self.base_minutes: np.ndarray = np.array([customer.desired_errand.base_minutes for customer in customers],
+                                                 dtype=np.int64)
+        self.rates: np.ndarray = np.array([contractor.rate for contractor in contractors], dtype=float)
+        request_day = context.request_day
+        kinds = np.array([customer.desired_errand.charge_kind for customer in customers], dtype=np.int64)
+        self.charges: np.ndarray = CHARGE_TABLE.charges(kinds[:, None], np.arange(self.num_days)[None, :] - request_day)
+
+        num_days = self.num_days
+        self.routes: List[List[List[int]]] = [[[] for _ in range(num_days)] for _ in contractors]
+        self.durations: np.ndarray = np.zeros((len(contractors), num_days), dtype=np.int64)
+        # Minute each contractor-day route starts at and the minutes available to it: the working day, or on
+        # days blocked in the calendar or holding errands of customers outside the plan, which keep their time,
+        # the longest time left (none if all of it is taken).
+        self.start_minutes: np.ndarray = np.tile(
+            np.arange(num_days, dtype=np.int64) * MINUTES_PER_DAY + context.work_start_minutes, (len(contractors), 1))
+        self.capacities: np.ndarray = np.full((len(contractors), num_days), self.day_minutes, dtype=np.int64)
+        customer_ids = {customer.id for customer in customers}
+        for row, contractor in enumerate(contractors):
+            calendar = contractor.calendar
+            blocked_days = set(calendar.blocked_days)
+            for day in range(min(num_days, len(calendar.errands))):
+                held = [(errand.travel_start, errand.task_end) for errand in calendar.errands[day][1]
+                        if errand.customer_id not in customer_ids]
+                if held or day in blocked_days:
+                    start, end = max(_subtract_spans(calendar.get_unreserved_intervals_minutes(day), held),
+                                     key=lambda interval: interval[1] - interval[0], default=(0, 0))
+                    self.start_minutes[row, day] = start
+                    self.capacities[row, day] = end - start
+        # Contractor row and day of each customer's route, or -1 while unassigned.
+        self.assigned_rows: np.ndarray = np.full(len(customers), -1, dtype=np.int64)
+        self.assigned_days: np.ndarray = np.full(len(customers), -1, dtype=np.int64)
+
+    @classmethod
+    def from_schedule(cls, schedule: Schedule) -> 'RoutePlan':
+        """
+        Build a plan from the assignments of a schedule.
+
+        Each contractor-day route takes the schedule's errands in time order, packed from
+        the route's start minute. If the packed route does not fit its capacity
+        (travel is recomputed from the previous errand in time order), errands are
+        dropped from it, least profitable first, and left unassigned.
+        """
+        plan = cls(schedule.customers, schedule.contractors, schedule.travel_matrix, context=schedule.context)
+        customer_positions = {customer.id: position for position, customer in enumerate(schedule.customers)}
+        contractor_rows = {contractor.id: row for row, contractor in enumerate(schedule.contractors)}
+        for errand, customer, contractor in schedule.get_assignments():
+            day = errand.travel_start // MINUTES_PER_DAY
+            if 0 <= day < plan.num_days:
+                plan.routes[contractor_rows[contractor.id]][day].append(customer_positions[customer.id])
+        for row in range(len(plan.contractors)):
+            for day in range(plan.num_days):
+                route = plan.routes[row][day]
+                while plan.route_duration(row, route) > plan.capacities[row, day]:
+                    # Drop the errand whose removal leaves the most profitable route.
+                    losses = [plan.charges[customer, day] - plan.rates[row] * (
+                        plan.route_duration(row, route) - plan.route_duration(row, route[:i] + route[i + 1:]))
+                        for i, customer in enumerate(route)]
+                    del route[int(np.argmin(losses))]
+                plan.set_route(row, day, route)
+        return plan
+
+    def route_points(self, row: int, day: int) -> List[int]:
+        """Travel matrix indices along a route, starting with the contractor's initial location."""
+        return [int(self.depot_points[row])] + [int(self.customer_points[p]) for p in self.routes[row][day]]
+
+    def route_duration(self, row: int, route: Sequence[int]) -> int:
+        """Travel and errand minutes of a sequence of customers served by a contractor."""
+        previous = self.depot_points[row]
+        duration = 0
+        for customer in route:
+            point = self.customer_points[customer]
+            duration += self.travel.item(previous, point) + self.base_minutes.item(customer)
+            previous = point
+        return duration
+
+    def insertion_costs(self, row: int, day: int, customers: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Cheapest insertion of each of the given customers into a route.
+
+        Args:
+            row (int): Contractor row.
+            day (int): Day of the route.
+            customers (np.ndarray): Customer positions to evaluate.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Added minutes and insertion position per customer.
+        """
+        points = np.asarray(self.route_points(row, day), dtype=np.int64)
+        targets = self.customer_points[customers]
+        # added[i] = travel(points[i] -> c) + travel(c -> points[i + 1]) - travel(points[i] -> points[i + 1]).
+        added = self.travel[np.ix_(points, targets)].astype(np.int64)
+        if len(points) > 1:
+            edges = self.travel[points[:-1], points[1:]].astype(np.int64)
+            added[:-1] += self.travel[np.ix_(targets, points[1:])].T - edges[:, None]
+        positions = added.argmin(axis=0)
+        return added[positions, np.arange(len(targets))] + self.base_minutes[customers], positions
+
+    def insertion_costs_batch(self, rows: np.ndarray, days: np.ndarray,
+                              customers: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Cheapest insertion of each of the given customers into each of several routes.
+
+        Gives the same result as calling insertion_costs() per route, with the routes of
+        each length evaluated together.
+
+        Args:
+            rows (np.ndarray): Contractor row of each route.
+            days (np.ndarray): Day of each route.
+            customers (np.ndarray): Customer positions to evaluate.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Added minutes and insertion position, routes x customers.
+        """
+        routes = [self.routes[row][day] for row, day in zip(rows.tolist(), days.tolist())]
+        lengths = np.array([len(route) for route in routes], dtype=np.int64)
+        targets = self.customer_points[customers]
+
+        added = np.empty((len(routes), len(targets)), dtype=np.int64)
+        positions = np.empty((len(routes), len(targets)), dtype=np.int64)
+        for length in np.unique(lengths).tolist():
+            group = np.flatnonzero(lengths == length)
+            points = np.empty((len(group), length + 1), dtype=np.int64)
+            points[:, 0] = self.depot_points[rows[group]]
+            if length:
+                points[:, 1:] = self.customer_points[np.array([routes[i] for i in group.tolist()], dtype=np.int64)]
+            edges = self.travel[points[:, :-1], points[:, 1:]].astype(np.int64)[:, :, None]
+            chunk = max(1, 4_000_000 // (len(group) * (length + 1)))
+            for start in range(0, len(targets), chunk):
+                block = targets[None, None, start:start + chunk]
+                costs = self.travel[points[:, :, None], block].astype(np.int64)
+                if length:
+                    costs[:, :-1] += self.travel[block, points[:, 1:, None]] - edges
+                best = costs.argmin(axis=1)
+                positions[group, start:start + chunk] = best
+                added[group, start:start + chunk] = np.take_along_axis(costs, best[:, None, :], axis=1)[:, 0, :]
+        return added + self.base_minutes[customers], positions
+
+    def insertion_profit(self, row: int, day: int, customer: int, added_minutes: int) -> float:
+        return self.charges.item(customer, day) - self.rates.item(row) * added_minutes
+
+    def fits(self, row: int, day: int, added_minutes: int) -> bool:
+        return self.durations.item(row, day) + added_minutes <= self.capacities.item(row, day)
+
+    def insert(self, customer: int, row: int, day: int, position: int) -> None:
+        """Insert an unassigned customer into a route at the given position."""
+        route = self.routes[row][day]
+        route.insert(position, customer)
+        self.durations[row, day] = self.route_duration(row, route)
+        self.assigned_rows[customer] = row
+        self.assigned_days[customer] = day
+
+    def remove(self, customer: int) -> Tuple[int, int, int]:
+        """Remove an assigned customer from its route, returning its former (row, day, position)."""
+        row, day = int(self.assigned_rows[customer]), int(self.assigned_days[customer])
+        route = self.routes[row][day]
+        position = route.index(customer)
+        del route[position]
+        self.durations[row, day] = self.route_duration(row, route)
+        self.assigned_rows[customer] = -1
+        self.assigned_days[customer] = -1
+        return row, day, position
+
+    def set_route(self, row: int, day: int, route: List[int]) -> None:
+        """Replace a route with a new order or selection of customers."""
+        for customer in self.routes[row][day]:
+            # Customers already moved into another route keep that assignment.
+            if self.assigned_rows[customer] == row and self.assigned_days[customer] == day:
+                self.assigned_rows[customer] = -1
+                self.assigned_days[customer] = -1
+        self.routes[row][day] = route
+        self.durations[row, day] = self.route_duration(row, route)
+        self.assigned_rows[route] = row
+        self.assigned_days[route] = day
+
+    def unassigned(self) -> np.ndarray:
+        return np.flatnonzero(self.assigned_rows < 0)
+
+    def route_profit(self, row: int, day: int) -> float:
+        route = self.routes[row][day]
+        return float(self.charges[route, day].sum()) - self.rates.item(row) * self.durations.item(row, day)
+
+    def total_profit(self) -> float:
+        assigned = np.flatnonzero(self.assigned_rows >= 0)
+        charges = self.charges[assigned, self.assigned_days[assigned]].sum()
+        return float(charges - (self.rates[:, None] * self.durations).sum())
+
+    def copy(self) -> 'RoutePlan':
+        """Copy of the plan sharing the read-only problem tables."""
+        plan = object.__new__(RoutePlan)
+        plan.__dict__.update(self.__dict__)
+        plan.routes = [[list(route) for route in days] for days in self.routes]
+        plan.durations = self.durations.copy()
+        plan.assigned_rows = self.assigned_rows.copy()
+        plan.assigned_days = self.assigned_days.copy()
+        return plan
+
+    def to_schedule(self, in_place: bool = False, schedule: Optional[Schedule] = None) -> Schedule:
+        """
+        Build a Schedule from the plan.
+
+        The schedule gets fresh copies of the contractors (keeping blocked time), so the
+        calendars of the contractors the plan was built from are left untouched and a
+        plan can be converted any number of times. With in_place, the errands are instead
+        reserved in the plan's own contractors, replacing the errands the plan's customers
+        had there and keeping those of other customers; the errands are then added through
+        the given schedule, if any, which must know the plan's customers and the others. If a route does
+        not fit, the contractors are left as they were.
+        """
+        if not in_place:
+            contractors = [contractor.copy_unscheduled() for contractor in self.contractors]
+            schedule = Schedule(contractors, list(self.customers), self.travel_matrix, self.context)
+            self._reserve_routes(schedule, contractors)
+            return schedule
+
+        contractors = list(self.contractors)
+        if schedule is None:
+            schedule = Schedule(contractors, list(self.customers), self.travel_matrix, self.context)
+        opened = not schedule.in_transaction
+        savepoint = schedule.savepoint()
+        try:
+            customer_ids = {customer.id for customer in self.customers}
+            for contractor in contractors:
+                replaced = [errand.errand_id for _, errands in contractor.calendar.errands for errand in errands
+                            if errand.customer_id in customer_ids]
+                for errand_id in replaced:
+                    contractor.calendar.release_errand_minutes(errand_id)
+            self._reserve_routes(schedule, contractors)
+        except ValueError:
+            schedule.rollback(savepoint)
+            for contractor in contractors:
+                contractor.reset_location()
+            raise
+        finally:
+            if opened:
+                schedule.commit()
+        return schedule
+
+    def _reserve_routes(self, schedule: Schedule, contractors: List[Contractor]) -> None:
+        """Reserve every route's errands through the schedule in the given contractors, one per plan row."""
+        for row, contractor in enumerate(contractors):
+            for day, route in enumerate(self.routes[row]):
+                contractor.reset_location()
+                minute = int(self.start_minutes[row, day])
+                for customer_position in route:
+                    customer = self.customers[customer_position]
+                    travel = schedule.get_travel_minutes(contractor.location, customer.location)
+                    if not schedule.add_assignment_minutes(minute, customer, contractor):
+                        raise ValueError(f"Route of contractor {contractor.id} on day {day} does not fit the calendar")
+                    minute += travel + customer.desired_errand.base_minutes
+            contractor.reset_location()
+
+    def __str__(self) -> str:
+        assigned = int((self.assigned_rows >= 0).sum())
+        return f"RoutePlan({assigned}/{len(self.customers)} customers assigned, {len(self.contractors)} contractors)"
+
+    __repr__ = __str__
+
+def _subtract_spans(intervals: List[Tuple[int, int]], spans: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """The parts of sorted, disjoint (start, end) intervals that none of the spans covers."""
+    spans = sorted(spans)
+    remaining: List[Tuple[int, int]] = []
+    for start, end in intervals:
+        for span_start, span_end in spans:
+            if span_end <= start or span_start >= end:
+                continue
+            if span_start > start:
+                remaining.append((start, span_start))
+            start = max(start, span_end)
+        if start < end:
+            remaining.append((start, end))
+    return remaining
@@ -1,63 +1,628 @@
 """
 Schedule class for managing assignments of errands to contractors.
+
+Assignments are read from the contractors' calendars through an index: per contractor,
+the (errand, customer, contractor) triples of each day in travel start order, and over
+all contractors one merged list with a customer id lookup. The views are built on first
+use; after calendars change, the errands removed, added or re-timed since the version a
+view was built at are taken from the calendars' change logs and updated in place, so a
+query after a reservation, release, re-timing or rollback costs in proportion to the
+changes. A view is only rebuilt when its calendar changed more than its log holds.
+
+Revenue and cost are kept the same way as running totals per contractor-day, adjusted
+in O(1) when the schedule adds or removes an errand, so the total profit is a sum over
+contractors rather than over assignments.
 """
 
-from typing import List, Dict, Tuple
+import heapq
+import logging
+import time
+from bisect import bisect_left, insort
+from itertools import chain
+from typing import Any, Callable, List, Dict, Tuple, Optional
 from datetime import datetime, timedelta
+import numpy as np
 from models.contractor import Contractor
 from models.customer import Customer
 from models.contractor_calendar import ContractorCalendar, ErrandAssignment
+from models.errand import CHARGE_TABLE
+from constants import PROFIT_AUDIT, CANDIDATE_LIMIT, CANDIDATE_RADIUS, CANDIDATE_FALLBACK
 from utils.scheduling_utils import SchedulingUtilities
-from utils.travel_time import calculate_travel_time
+from utils.spatial_index import SpatialIndex
+from utils.travel_time import calculate_travel_minutes
+from utils.travel_matrix import TravelMatrix
+from utils.time_utils import MINUTES_PER_DAY
+from utils.planning_context import PlanningContext, get_planning_context
+from utils.undo_log import UndoLog
+
+logger = logging.getLogger(__name__)
+
+Assignment = Tuple[ErrandAssignment, Customer, Contractor]
+
+def _travel_start(assignment: Assignment) -> int:
+    return assignment[0].travel_start
+
+def _remove_sorted(assignments: List[Assignment], errand: ErrandAssignment, key: Callable[[Assignment], Any],
+                   value: Any) -> Optional[Assignment]:
+    """Remove and return the errand's assignment from a list sorted by key, given the key value of the errand."""
+    index = bisect_left(assignments, value, key=key)
+    while index < len(assignments) and key(assignments[index]) == value:
+        if assignments[index][0] is errand:
+            return assignments.pop(index)
+        index += 1
+    return None
+
+class ScheduleUpdate:
+    """Outcome of an online insertion or removal of a customer, with the time taken to decide it."""
+
+    def __init__(self, customer: Customer, contractor: Optional[Contractor], errand: Optional[ErrandAssignment],
+                 profit_change: float, latency_seconds: float):
+        self.customer = customer
+        self.contractor = contractor
+        self.errand = errand  # The errand inserted or removed, None if nothing changed
+        self.profit_change = profit_change
+        self.latency_seconds = latency_seconds
+
+    @property
+    def succeeded(self) -> bool:
+        return self.errand is not None
+
+    def __str__(self) -> str:
+        if not self.succeeded:
+            return f"ScheduleUpdate(customer {self.customer.id} unchanged, {self.latency_seconds * 1000:.2f} ms)"
+        return (f"ScheduleUpdate(customer {self.customer.id}, contractor {self.contractor.id}, "
+                f"minutes {self.errand.travel_start} - {self.errand.task_end}, profit {self.profit_change:+.2f}, "
+                f"{self.latency_seconds * 1000:.2f} ms)")
+
+    __repr__ = __str__
+
+class _ProfitTotals:
+    """Revenue and cost of one contractor's errands per day, as of a calendar version."""
+
+    def __init__(self, version: int, num_days: int):
+        self.version = version
+        self.revenue: List[float] = [0.0] * num_days
+        self.cost: List[float] = [0.0] * num_days
+        self.total_revenue = 0.0
+        self.total_cost = 0.0
+
+    def add(self, day: int, revenue: float, cost: float) -> None:
+        self.revenue[day] += revenue
+        self.cost[day] += cost
+        self.total_revenue += revenue
+        self.total_cost += cost
 
 class Schedule:
-    def __init__(self, contractors: List[Contractor], customers: List[Customer]):
+    def __init__(self, contractors: List[Contractor], customers: List[Customer], travel_matrix: Optional[TravelMatrix] = None,
+                 context: Optional[PlanningContext] = None):
+        if context is None:
+            context = contractors[0].calendar.context if contractors else get_planning_context()
+        self.context: PlanningContext = context
         self.contractors: List[Contractor] = contractors
         self.customers: List[Customer] = customers
+        self.travel_matrix: Optional[TravelMatrix] = travel_matrix
         self.contractor_calendars: Dict[int, ContractorCalendar] = {
             contractor.id: contractor.calendar for contractor in contractors
         }
+        self._undo_log: Optional[UndoLog] = None  # Shared with the calendars while a transaction is open
+
+        # Assignment index (see the module docstring), keyed by the calendar versions it was built at.
+        self._contractors_by_id: Dict[int, Contractor] = {contractor.id: contractor for contractor in contractors}
+        self._contractor_positions: Dict[int, int] = {
+            contractor_id: position for position, contractor_id in enumerate(self.contractor_calendars)}
+        self._customers_by_id: Dict[int, Customer] = {}
+        self._indexed_customers: Optional[List[Customer]] = None
+        self._contractor_views: Dict[int, Tuple[int, List[List[Assignment]]]] = {}
+        self._assignments: Optional[Tuple[List[int], List[Assignment], Dict[int, Assignment]]] = None
+        # Running profit totals by contractor id, valid for the request day they were computed on.
+        self._profit_totals: Dict[int, _ProfitTotals] = {}
+        self._profit_request_day: Optional[int] = None
+        # Contractor rows by initial location, built when insertions are restricted to nearby contractors.
+        self._contractor_index: Optional[SpatialIndex] = None
 
     def add_assignment(self, start_time: datetime, customer: Customer, contractor: Contractor) -> bool:
         calendar = self.contractor_calendars[contractor.id]
-        errand_id = f"errand_{customer.id}_{contractor.id}_{start_time.strftime('%Y%m%d%H%M')}"
-        travel_duration, _ = calculate_travel_time(contractor.location, customer.location)
-        task_duration = customer.desired_errand.base_time
-        total_duration = travel_duration + task_duration
-
-        travel_start_time = start_time
-        travel_end_time = start_time + travel_duration
-        task_start_time = travel_end_time
-        task_end_time = task_start_time + task_duration
-
-        if calendar.reserve_time_slot(errand_id, customer.desired_errand.type, travel_start_time, travel_end_time, 
-                                      task_start_time, task_end_time):
-            contractor.update_location(customer.location)
+        return self.add_assignment_minutes(calendar.to_minutes(start_time), customer, contractor)
+
+    def add_assignment_minutes(self, start_minute: int, customer: Customer, contractor: Contractor,
+                               travel_minutes: Optional[int] = None) -> bool:
+        """
+        Reserve the customer's errand for the contractor, travelling from the contractor's current location.
+
+        The travel time is looked up unless it is given, e.g. when replaying known assignments.
+        """
+        calendar = self.contractor_calendars[contractor.id]
+        errand_id = f"errand_{customer.id}_{contractor.id}_{start_minute}"
+
+        if travel_minutes is None:
+            travel_minutes = self.get_travel_minutes(contractor.location, customer.location)
+        travel_start = start_minute
+        travel_end = start_minute + travel_minutes
+        task_start = travel_end
+        task_end = task_start + customer.desired_errand.base_minutes
+
+        version = calendar.version
+        if calendar.reserve_time_slot_minutes(errand_id, customer.desired_errand.type, travel_start, travel_end,
+                                              task_start, task_end, customer.id):
+            self._adjust_profit_totals(contractor, version, travel_start // MINUTES_PER_DAY,
+                                       lambda: self._errand_charge(customer, travel_start),
+                                       contractor.rate * (task_end - travel_start))
+            self._move_contractor(contractor, customer.location)
             return True
         return False
 
-    def get_assignments(self) -> List[Tuple[ErrandAssignment, Customer, Contractor]]:
-        assignments = []
-        for contractor_id, calendar in self.contractor_calendars.items():
-            contractor = next(c for c in self.contractors if c.id == contractor_id)
-            for _, errand_list in calendar.errands:
-                for errand in errand_list:
-                    customer_id = int(errand.errand_id.split('_')[1])
-                    customer = next(c for c in self.customers if c.id == customer_id)
-                    assignments.append((errand, customer, contractor))
-        return sorted(assignments, key=lambda x: x[0].travel_start_time)
-
-    def calculate_total_profit(self) -> float:
-        total_profit = 0
-        for errand, customer, contractor in self.get_assignments():
-            if SchedulingUtilities.is_valid_assignment(contractor, customer, errand.travel_start_time, errand.task_end_time):
-                total_profit += SchedulingUtilities.calculate_profit(customer, contractor, errand.travel_start_time, errand.total_duration)
+    def snapshot(self) -> 'Schedule':
+        """
+        Clone of the schedule for trying variants, in O(contractors).
+
+        The clone has its own contractors whose calendars share every contractor-day
+        with this schedule until either schedule changes it (copy on write), so memory
+        grows only with the days modified. Customers and the travel matrix are shared.
+        """
+        return Schedule([contractor.snapshot() for contractor in self.contractors], self.customers, self.travel_matrix,
+                        self.context)
+
+    def savepoint(self) -> int:
+        """
+        Start recording changes if needed and return a position to roll back to.
+
+        While a transaction is open, the reservations, releases and contractor moves made
+        through the schedule and its calendars are recorded in one undo log, so a tentative
+        change is reverted by rollback() without copying the schedule. Savepoints nest.
+        """
+        if self._undo_log is None:
+            self._undo_log = UndoLog()
+            for calendar in self.contractor_calendars.values():
+                calendar.attach_undo_log(self._undo_log)
+        return self._undo_log.savepoint()
+
+    @property
+    def in_transaction(self) -> bool:
+        return self._undo_log is not None
+
+    def rollback(self, savepoint: int = 0) -> int:
+        """Revert the changes made since the savepoint, returning how many were reverted."""
+        if self._undo_log is None:
+            raise ValueError("No transaction is open")
+        return self._undo_log.rollback(savepoint)
+
+    def commit(self) -> None:
+        """Keep the changes made and stop recording them."""
+        if self._undo_log is not None:
+            for calendar in self.contractor_calendars.values():
+                calendar.attach_undo_log(None)
+            self._undo_log = None
+
+    def _move_contractor(self, contractor: Contractor, location: Tuple[int, int]) -> None:
+        if self._undo_log is not None:
+            self._undo_log.record(lambda previous=contractor.location: contractor.update_location(previous))
+        contractor.update_location(location)
+
+    def _set_customers(self, customers: List[Customer], added: Optional[Customer] = None,
+                       removed: Optional[Customer] = None) -> None:
+        """Replace the customer list, updating a current id index for the customer added or removed."""
+        if self._undo_log is not None:
+            self._undo_log.record(lambda previous=self.customers: setattr(self, 'customers', previous))
+        if self._indexed_customers is self.customers:
+            if added is not None:
+                self._customers_by_id[added.id] = added
+            if removed is not None:
+                self._customers_by_id.pop(removed.id, None)
+            self._indexed_customers = customers
+        self.customers = customers
+
+    def get_travel_minutes(self, start: Tuple[int, int], end: Tuple[int, int]) -> int:
+        """Travel time between two locations, from the travel matrix when the schedule has one."""
+        if self.travel_matrix is not None:
+            return self.travel_matrix.travel_minutes(start, end)
+        return calculate_travel_minutes(start, end)
+
+    def _adjust_profit_totals(self, contractor: Contractor, version: int, day: int,
+                              revenue: Callable[[], float], cost: float) -> None:
+        """
+        Apply the revenue and cost changes of calendar changes made since `version`, if the
+        contractor's totals were current then; otherwise they are rebuilt when next read.
+        """
+        totals = self._profit_totals.get(contractor.id)
+        if totals is not None and totals.version == version:
+            totals.add(day, revenue(), cost)
+            totals.version = self.contractor_calendars[contractor.id].version
+
+    def _errand_charge(self, customer: Customer, travel_start: int) -> float:
+        request_day = self.context.request_day
+        return customer.desired_errand.calculate_final_charge_for_offset(travel_start // MINUTES_PER_DAY - request_day)
+
+    def _check_profit_request_day(self) -> int:
+        request_day = self.context.request_day
+        if request_day != self._profit_request_day:
+            # Charges depend on the request day, so totals from an earlier day are stale.
+            self._profit_totals = {}
+            self._profit_request_day = request_day
+        return request_day
+
+    def _contractor_profit_totals(self, contractor_id: int) -> _ProfitTotals:
+        """
+        A contractor's running totals, rebuilt from its assignments after other calendar
+        changes. Callers check the request day first.
+        """
+        request_day = self._profit_request_day
+        calendar = self.contractor_calendars[contractor_id]
+        totals = self._profit_totals.get(contractor_id)
+        if totals is None or totals.version != calendar.version:
+            view = self._contractor_view(contractor_id)
+            totals = _ProfitTotals(calendar.version, len(view))
+            for day, assignments in enumerate(view):
+                for errand, customer, contractor in assignments:
+                    charge = customer.desired_errand.calculate_final_charge_for_offset(day - request_day)
+                    totals.add(day, charge, contractor.rate * (errand.task_end - errand.travel_start))
+            self._profit_totals[contractor_id] = totals
+        return totals
+
+    def _calendar_versions(self) -> List[int]:
+        return [calendar.version for calendar in self.contractor_calendars.values()]
+
+    def _customer_index(self) -> Dict[int, Customer]:
+        """Customers by id, rebuilt when the customer list was replaced."""
+        if self._indexed_customers is not self.customers:
+            self._customers_by_id = {customer.id: customer for customer in self.customers}
+            self._indexed_customers = self.customers
+        return self._customers_by_id
+
+    def _errand_customer(self, errand: ErrandAssignment) -> Customer:
+        return self._customer_index()[self._errand_customer_id(errand)]
+
+    def _calendar_changes(self, contractor_id: int, version: int) -> Optional[Tuple[List[Tuple[int, ErrandAssignment]],
+                                                                                    List[Tuple[int, ErrandAssignment]]]]:
+        """
+        The (day, errand) pairs removed from and added to a contractor's calendar since a
+        version, leaving out errands added and removed again; None if the calendar no
+        longer has the changes.
+        """
+        changes = self.contractor_calendars[contractor_id].changes_since(version)
+        if changes is None:
+            return None
+        removed: List[Tuple[int, ErrandAssignment]] = []
+        added: Dict[int, Tuple[int, ErrandAssignment]] = {}
+        for day, old, new in changes:
+            if old is not None and added.pop(id(old), None) is None:
+                removed.append((day, old))
+            if new is not None:
+                added[id(new)] = (day, new)
+        return removed, list(added.values())
+
+    def _contractor_view(self, contractor_id: int) -> List[List[Assignment]]:
+        """A contractor's assignments per day in travel start order, updated after its calendar changed."""
+        calendar = self.contractor_calendars[contractor_id]
+        view = self._contractor_views.get(contractor_id)
+        if view is not None and view[0] != calendar.version:
+            view = self._update_contractor_view(contractor_id, *view)
+        if view is None:
+            contractor = self._contractors_by_id[contractor_id]
+            days = [sorted(((errand, self._errand_customer(errand), contractor) for errand in errand_list),
+                           key=_travel_start)
+                    for _, errand_list in calendar.errands]
+            view = (calendar.version, days)
+            self._contractor_views[contractor_id] = view
+        return view[1]
+
+    def _update_contractor_view(self, contractor_id: int, version: int,
+                                days: List[List[Assignment]]) -> Optional[Tuple[int, List[List[Assignment]]]]:
+        """Apply the calendar's changes since the view's version to the view, or return None to rebuild it."""
+        changes = self._calendar_changes(contractor_id, version)
+        if changes is None:
+            return None
+        removed, added = changes
+        for day, errand in removed:
+            if _remove_sorted(days[day], errand, _travel_start, errand.travel_start) is None:
+                return None
+        contractor = self._contractors_by_id[contractor_id]
+        for day, errand in added:
+            insort(days[day], (errand, self._errand_customer(errand), contractor), key=_travel_start)
+        view = (self.contractor_calendars[contractor_id].version, days)
+        self._contractor_views[contractor_id] = view
+        return view
+
+    def _indexed_assignments(self) -> Tuple[List[Assignment], Dict[int, Assignment]]:
+        """All assignments in travel start order and by customer id, updated after calendars changed."""
+        versions = self._calendar_versions()
+        if self._assignments is not None and self._assignments[0] != versions and not self._update_assignments(versions):
+            self._assignments = None
+        if self._assignments is None:
+            # Merging keeps the contractor order among errands starting at the same minute.
+            assignments = list(heapq.merge(*(chain.from_iterable(self._contractor_view(contractor_id))
+                                             for contractor_id in self.contractor_calendars), key=_travel_start))
+            by_customer = {assignment[1].id: assignment for assignment in assignments}
+            self._assignments = (versions, assignments, by_customer)
+        return self._assignments[1], self._assignments[2]
+
+    def _update_assignments(self, versions: List[int]) -> bool:
+        """Apply the calendars' changes to the merged assignments, returning False if they must be rebuilt."""
+        indexed_versions, assignments, by_customer = self._assignments
+        positions = self._contractor_positions
+        # Same order as a rebuild: by travel start, then contractor.
+        key = lambda assignment: (assignment[0].travel_start, positions[assignment[2].id])
+        for position, (contractor_id, version) in enumerate(zip(self.contractor_calendars, versions)):
+            if indexed_versions[position] == version:
+                continue
+            changes = self._calendar_changes(contractor_id, indexed_versions[position])
+            if changes is None:
+                return False
+            removed, added = changes
+            for _, errand in removed:
+                assignment = _remove_sorted(assignments, errand, key, (errand.travel_start, position))
+                if assignment is None:
+                    return False
+                if by_customer.get(assignment[1].id) is assignment:
+                    del by_customer[assignment[1].id]
+            contractor = self._contractors_by_id[contractor_id]
+            for _, errand in added:
+                assignment = (errand, self._errand_customer(errand), contractor)
+                insort(assignments, assignment, key=key)
+                by_customer[assignment[1].id] = assignment
+            indexed_versions[position] = version
+        return True
+
+    def get_assignments(self) -> List[Assignment]:
+        """All (errand, customer, contractor) assignments in travel start order."""
+        return list(self._indexed_assignments()[0])
+
+    def get_contractor_assignments(self, contractor_id: int, day: Optional[int] = None) -> List[Assignment]:
+        """A contractor's assignments in travel start order, on one day or all days."""
+        view = self._contractor_view(contractor_id)
+        if day is not None:
+            return list(view[day])
+        return list(chain.from_iterable(view))
+
+    def get_day_assignments(self, day: int) -> List[Assignment]:
+        """The assignments of all contractors on one day, in travel start order."""
+        return list(heapq.merge(*(self._contractor_view(contractor_id)[day]
+                                  for contractor_id in self.contractor_calendars), key=_travel_start))
+
+    def get_customer_assignment(self, customer_id: int) -> Optional[Assignment]:
+        """The assignment of a customer, or None if the customer is not scheduled."""
+        return self._indexed_assignments()[1].get(customer_id)
+
+    def to_compact(self) -> np.ndarray:
+        """
+        The assignments as an integer array with one row per errand, in travel start order.
+
+        Columns are customer id, contractor id, travel start minute and travel minutes.
+        This is all that is needed to rebuild the schedule with from_compact(), and is
+        cheap to send between processes.
+        """
+        compact = [(customer.id, contractor.id, errand.travel_start, errand.travel_minutes)
+                   for errand, customer, contractor in self.get_assignments()]
+        return np.array(compact, dtype=np.int64).reshape(len(compact), 4)
+
+    @classmethod
+    def from_compact(cls, contractors: List[Contractor], customers: List[Customer], compact: np.ndarray,
+                     travel_matrix: Optional[TravelMatrix] = None) -> 'Schedule':
+        """Rebuild a schedule from to_compact() output by reserving its errands in the contractors' calendars."""
+        schedule = cls(contractors, customers, travel_matrix)
+        contractors_by_id = {contractor.id: contractor for contractor in contractors}
+        customers_by_id = {customer.id: customer for customer in customers}
+        for customer_id, contractor_id, travel_start, travel_minutes in compact.tolist():
+            contractor = contractors_by_id[contractor_id]
+            if not schedule.add_assignment_minutes(travel_start, customers_by_id[customer_id], contractor, travel_minutes):
+                raise ValueError(f"Errand of customer {customer_id} does not fit the calendar of contractor {contractor_id}")
+        for contractor in contractors:
+            contractor.reset_location()
+        return schedule
+
+    @staticmethod
+    def _errand_customer_id(errand: ErrandAssignment) -> int:
+        if errand.customer_id is not None:
+            return errand.customer_id
+        # Errands reserved directly in a calendar only carry the customer in their id.
+        return int(errand.errand_id.split('_')[1])
+
+    def insert_customer(self, customer: Customer, candidate_limit: Optional[int] = CANDIDATE_LIMIT,
+                        candidate_radius: Optional[int] = CANDIDATE_RADIUS,
+                        candidate_fallback: bool = CANDIDATE_FALLBACK) -> ScheduleUpdate:
+        """
+        Place the errand of a new or unscheduled customer into the existing schedule without re-solving.
+
+        Every free interval of every contractor-day from the request day on is tried,
+        travelling from the errand before the interval (or the contractor's initial
+        location). If an errand follows, its travel leg is re-timed to start from the
+        new customer and must still end when its task starts. The placement with the
+        largest profit change wins, the earliest one among equals.
+
+        As in the greedy scheduler, a candidate limit or radius restricts the search to
+        the contractors whose initial locations are nearest to the customer; the other
+        contractors are only tried if none of them has room and candidate_fallback is set.
+
+        Returns:
+            ScheduleUpdate: The inserted errand and its profit change, or no errand if nothing fits.
+        """
+        started = time.perf_counter()
+        is_new = customer.id not in self._customer_index()
+        if not is_new and self.get_customer_assignment(customer.id) is not None:
+            raise ValueError(f"Customer {customer.id} is already scheduled")
+        base_minutes = customer.desired_errand.base_minutes
+        request_day = self.context.request_day
+        first_day = max(request_day, 0)
+        num_days = max(len(calendar.errands) for calendar in self.contractor_calendars.values())
+        charges = CHARGE_TABLE.charges(customer.desired_errand.charge_kind,
+                                       np.arange(first_day, num_days) - request_day).tolist()
+
+        rows = self._candidate_rows(customer.location, candidate_limit, candidate_radius)
+        if rows is None:
+            best = self._best_insertion(customer, self.contractors, first_day, charges)
+        else:
+            best = self._best_insertion(customer, [self.contractors[row] for row in rows], first_day, charges)
+            if best is None and candidate_fallback and len(rows) < len(self.contractors):
+                candidates = set(rows)
+                best = self._best_insertion(customer, [contractor for row, contractor in enumerate(self.contractors)
+                                                       if row not in candidates], first_day, charges)
+
+        if best is None:
+            update = ScheduleUpdate(customer, None, None, 0.0, time.perf_counter() - started)
+            logger.info(f"No slot for customer {customer.id} ({update.latency_seconds * 1000:.2f} ms)")
+            return update
+        profit_change, contractor, travel_start, travel_minutes, following, following_start = best
+        version = self.contractor_calendars[contractor.id].version
+        cost = contractor.rate * (travel_minutes + base_minutes)
+        if following is not None:
+            cost += contractor.rate * (following.travel_start - following_start)
+            self.contractor_calendars[contractor.id].retime_travel_minutes(following, following_start)
+        if is_new:
+            self._set_customers(self.customers + [customer], added=customer)
+        location = contractor.location
+        self.add_assignment_minutes(travel_start, customer, contractor, travel_minutes)
+        self._move_contractor(contractor, location)
+        self._adjust_profit_totals(contractor, version, travel_start // MINUTES_PER_DAY,
+                                   lambda: self._errand_charge(customer, travel_start), cost)
+        errand = next(errand for errand, scheduled, _ in
+                      self._contractor_view(contractor.id)[travel_start // MINUTES_PER_DAY] if scheduled is customer)
+        update = ScheduleUpdate(customer, contractor, errand, profit_change, time.perf_counter() - started)
+        logger.info(f"Inserted {update}")
+        return update
+
+    def _candidate_rows(self, location: Tuple[int, int], limit: Optional[int],
+                        radius: Optional[int]) -> Optional[List[int]]:
+        """Rows of the contractors whose initial locations are nearest to a location, in list order, or None for all."""
+        if limit is None:
+            limit = len(self.contractors)
+        if limit >= len(self.contractors) and radius is None:
+            return None
+        if self._contractor_index is None:
+            self._contractor_index = SpatialIndex((row, contractor.initial_location)
+                                                  for row, contractor in enumerate(self.contractors))
+        return sorted(self._contractor_index.nearest(location, limit, radius))
+
+    def _best_insertion(self, customer: Customer, contractors: List[Contractor], first_day: int,
+                        charges: List[float]) -> Optional[Tuple]:
+        """
+        The most profitable placement of the customer's errand with the given contractors, as
+        (profit change, contractor, travel start, travel minutes, following errand, its new
+        travel start), or None if it fits nowhere.
+        """
+        base_minutes = customer.desired_errand.base_minutes
+        best = None
+        for contractor in contractors:
+            calendar = self.contractor_calendars[contractor.id]
+            for day in range(first_day, len(calendar.errands)):
+                charge = charges[day - first_day]
+                # Travel only lowers the profit, so a day whose charge less errand cost cannot beat the best is skipped.
+                if best is not None and charge - contractor.rate * base_minutes < best[0]:
+                    continue
+                intervals = calendar.get_free_intervals_minutes(day)
+                if not intervals:
+                    continue
+                assignments = self._contractor_view(contractor.id)[day]
+                position = 0
+                for interval_start, interval_end in intervals:
+                    while position < len(assignments) and assignments[position][0].task_end <= interval_start:
+                        position += 1
+                    previous = assignments[position - 1][1].location if position else contractor.initial_location
+                    task_end = interval_start + self.get_travel_minutes(previous, customer.location) + base_minutes
+                    added_minutes = task_end - interval_start
+                    following = assignments[position][0] if position < len(assignments) else None
+                    following_start = None
+                    if following is None:
+                        if task_end > interval_end:
+                            continue
+                    else:
+                        following_location = assignments[position][1].location
+                        following_start = following.task_start - self.get_travel_minutes(customer.location,
+                                                                                          following_location)
+                        if task_end > following_start:
+                            continue
+                        added_minutes += following.travel_start - following_start
+                    profit_change = charge - contractor.rate * added_minutes
+                    if best is None or profit_change > best[0] or (profit_change == best[0] and interval_start < best[2]):
+                        best = (profit_change, contractor, interval_start, task_end - interval_start - base_minutes,
+                                following, following_start)
+        return best
+
+    def remove_customer(self, customer: Customer) -> ScheduleUpdate:
+        """
+        Cancel a customer's errand and drop the customer from the schedule.
+
+        The errand's time is returned to the contractor's free intervals, and the travel
+        leg of the errand after it is re-timed to start from the errand before it.
+
+        Returns:
+            ScheduleUpdate: The removed errand and the profit change, or no errand if the customer had none.
+        """
+        started = time.perf_counter()
+        assignment = self.get_customer_assignment(customer.id)
+        if assignment is None:
+            self._set_customers([known for known in self.customers if known.id != customer.id], removed=customer)
+            return ScheduleUpdate(customer, None, None, 0.0, time.perf_counter() - started)
+        errand, _, contractor = assignment
+        calendar = self.contractor_calendars[contractor.id]
+        # The view is brought up to date while the customer is still known.
+        day_assignments = self._contractor_view(contractor.id)[errand.travel_start // MINUTES_PER_DAY]
+        self._set_customers([known for known in self.customers if known.id != customer.id], removed=customer)
+        position = next(index for index, other in enumerate(day_assignments) if other[0] is errand)
+        charge = self._errand_charge(customer, errand.travel_start)
+        cost = contractor.rate * (errand.task_end - errand.travel_start)
+        version = calendar.version
+        calendar.release_errand_minutes(errand.errand_id)
+        if position + 1 < len(day_assignments):
+            following, following_customer, _ = day_assignments[position + 1]
+            previous = day_assignments[position - 1][1].location if position else contractor.initial_location
+            following_start = following.task_start - self.get_travel_minutes(previous, following_customer.location)
+            old_start = following.travel_start
+            if calendar.retime_travel_minutes(following, following_start):
+                cost += contractor.rate * (following_start - old_start)
+        self._adjust_profit_totals(contractor, version, errand.travel_start // MINUTES_PER_DAY, lambda: -charge, -cost)
+        profit_change = cost - charge
+        update = ScheduleUpdate(customer, contractor, errand, profit_change, time.perf_counter() - started)
+        logger.info(f"Removed {update}")
+        return update
+
+    def calculate_total_profit(self, audit: bool = PROFIT_AUDIT) -> float:
+        """
+        Total profit from the running totals.
+
+        With audit, the profit of every assignment is also recomputed from scratch; a
+        difference from the running totals is logged as an error and the recomputed
+        value is returned.
+        """
+        total_profit = self.get_profit_totals()['profit']
+        if audit:
+            audited = 0
+            for errand, customer, contractor in self._indexed_assignments()[0]:
+                audited += SchedulingUtilities.calculate_profit_minutes(customer, contractor, errand.travel_start,
+                                                                        errand.task_end, self.context)
+            if abs(audited - total_profit) > 1e-6 * max(1.0, abs(audited)):
+                logger.error(f"Running profit total ${total_profit:.2f} differs from the recomputed ${audited:.2f}")
+            return audited
         return total_profit
 
+    def get_profit_totals(self) -> Dict[str, float]:
+        """Total revenue, cost and profit of the schedule."""
+        self._check_profit_request_day()
+        revenue = cost = 0.0
+        for contractor_id in self.contractor_calendars:
+            totals = self._contractor_profit_totals(contractor_id)
+            revenue += totals.total_revenue
+            cost += totals.total_cost
+        return {'revenue': revenue, 'cost': cost, 'profit': revenue - cost}
+
+    def get_contractor_profit(self, contractor_id: int, day: Optional[int] = None) -> float:
+        """Profit of a contractor's errands, on one day or all days."""
+        self._check_profit_request_day()
+        totals = self._contractor_profit_totals(contractor_id)
+        if day is not None:
+            return totals.revenue[day] - totals.cost[day]
+        return totals.total_revenue - totals.total_cost
+
+    def get_day_profit(self, day: int) -> float:
+        """Profit of all contractors' errands on one day."""
+        self._check_profit_request_day()
+        profit = 0.0
+        for contractor_id in self.contractor_calendars:
+            totals = self._contractor_profit_totals(contractor_id)
+            profit += totals.revenue[day] - totals.cost[day]
+        return profit
+
     def get_errand_end_time(self, customer: Customer, contractor: Contractor, start_time: datetime) -> datetime:
-        travel_duration, _ = calculate_travel_time(contractor.location, customer.location)
-        total_time = travel_duration + customer.desired_errand.base_time
-        return start_time + total_time
+        travel_minutes = self.get_travel_minutes(contractor.location, customer.location)
+        return start_time + timedelta(minutes=travel_minutes + customer.desired_errand.base_minutes)
 
     def __str__(self) -> str:
         return f"Schedule with {len(self.contractors)} contractors and {len(self.customers)} customers"
@@ -0,0 +1,101 @@
+"""
+Planning context for the Synthetic Errands Scheduler.
+
+A PlanningContext carries what every time computation of a run depends on: the
+planning epoch (minute 0), the number of days in the horizon, the working hours and
+the request date of errands. Calendars, schedules, the problem generator and the
+schedulers take it from their arguments or from the contractors' calendars, so two
+runs with equal contexts compute the same times and profits, and results can be
+cached under the context's key.
+
+Usage:
+    from utils.planning_context import PlanningContext, set_planning_context
+
+    context = PlanningContext(datetime(2024, 1, 8), request_time=datetime(2024, 1, 8, 9))
+    customers, contractors = generate_problem(100, 10, context=context)
+"""
+
+import datetime
+from typing import Optional, Tuple
+from constants import SCHEDULING_DAYS, WORK_START_MINUTES, WORK_END_MINUTES
+from utils.time_utils import (MINUTES_PER_DAY, get_planning_epoch, set_planning_epoch, get_current_time,
+                              datetime_to_minutes, convert_minutes_to_time)
+
+class PlanningContext:
+    """
+    Epoch, horizon, working hours and request date of a planning run.
+
+    Args:
+        epoch (Optional[datetime]): Start of day 0, truncated to midnight; the process-wide planning epoch if None.
+        num_days (int): Days in the scheduling horizon.
+        work_start_minutes (int): Start of working hours, in minutes since midnight.
+        work_end_minutes (int): End of working hours, in minutes since midnight.
+        request_time (Optional[datetime]): When errands are requested; read from the planning clock if None.
+    """
+
+    def __init__(self, epoch: Optional[datetime.datetime] = None, num_days: int = SCHEDULING_DAYS,
+                 work_start_minutes: int = WORK_START_MINUTES, work_end_minutes: int = WORK_END_MINUTES,
+                 request_time: Optional[datetime.datetime] = None):
+        if epoch is None:
+            epoch = get_planning_epoch()
+        if not 0 <= work_start_minutes <= work_end_minutes < MINUTES_PER_DAY:
+            raise ValueError(f"Invalid working hours: minutes {work_start_minutes} - {work_end_minutes}")
+        self.epoch: datetime.datetime = epoch.replace(hour=0, minute=0, second=0, microsecond=0)
+        self.num_days: int = num_days
+        self.work_start_minutes: int = work_start_minutes
+        self.work_end_minutes: int = work_end_minutes
+        self.request_time: Optional[datetime.datetime] = request_time
+
+    @property
+    def day_minutes(self) -> int:
+        return self.work_end_minutes - self.work_start_minutes
+
+    @property
+    def work_start_time(self) -> datetime.time:
+        return convert_minutes_to_time(self.work_start_minutes)
+
+    @property
+    def work_end_time(self) -> datetime.time:
+        return convert_minutes_to_time(self.work_end_minutes)
+
+    @property
+    def request_day(self) -> int:
+        """Day index of the request date relative to the epoch."""
+        request_time = self.request_time if self.request_time is not None else get_current_time()
+        return datetime_to_minutes(request_time, self.epoch) // MINUTES_PER_DAY
+
+    def frozen(self) -> 'PlanningContext':
+        """
+        The context with its request time fixed (read from the planning clock now if unset),
+        so that it gives the same request day in other processes, which have their own clocks.
+        """
+        if self.request_time is not None:
+            return self
+        return PlanningContext(self.epoch, self.num_days, self.work_start_minutes, self.work_end_minutes,
+                               get_current_time())
+
+    @property
+    def key(self) -> Tuple:
+        """Hashable summary of everything times and profits depend on, e.g. to memoize results across runs."""
+        return (self.epoch.isoformat(), self.num_days, self.work_start_minutes, self.work_end_minutes, self.request_day)
+
+    def __str__(self) -> str:
+        return (f"PlanningContext(epoch={self.epoch.date()}, days={self.num_days}, "
+                f"hours={self.work_start_time:%H:%M}-{self.work_end_time:%H:%M}, request_day={self.request_day})")
+
+    __repr__ = __str__
+
+_planning_context: Optional[PlanningContext] = None
+
+def get_planning_context() -> PlanningContext:
+    """The context used when none is given: set with set_planning_context(), or built from the configuration."""
+    global _planning_context
+    if _planning_context is None or _planning_context.epoch != get_planning_epoch():
+        _planning_context = PlanningContext()
+    return _planning_context
+
+def set_planning_context(context: Optional[PlanningContext]) -> None:
+    """Make a context the default, also fixing the process-wide planning epoch; None restores the configured one."""
+    global _planning_context
+    _planning_context = context
+    set_planning_epoch(context.epoch if context is not None else None)
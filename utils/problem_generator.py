@@ -1,18 +1,27 @@
 """
 Problem generator module for the Synthetic Errands Scheduler.
 Generates random problem instances with customers and contractors.
+
+generate_problem() builds the objects one at a time from the `random` module.
+generate_bulk_problem() draws a whole instance as NumPy arrays from a seeded
+Generator (ProblemArrays, a struct of arrays) for very large stress instances, and
+turns it into objects only when asked to. generate_problem_stream() draws the
+customers the same way, one batch at a time as they are consumed.
 """
 
 import random
 import logging
-from typing import List, Tuple, Dict
+from typing import Iterator, List, Tuple, Dict, Optional, Union
 from datetime import datetime, timedelta
+import numpy as np
 
 from models.customer import Customer
 from models.contractor import Contractor
-from models.errand import Errand
-from utils.city_map import is_valid_road_location, GRID_SIZE
-from constants import ERRAND_TYPES, DEFAULT_NUM_CUSTOMERS, DEFAULT_NUM_CONTRACTORS, SCHEDULING_DAYS, WORK_START_TIME_OBJ, WORK_END_TIME_OBJ
+from models.errand import Errand, ErrandSpec, errand_spec
+from utils.city_map import is_valid_road_location, city_grid, GRID_SIZE
+from utils.time_utils import MINUTES_PER_DAY
+from utils.planning_context import PlanningContext, get_planning_context
+from constants import ERRAND_TYPES, DEFAULT_NUM_CUSTOMERS, DEFAULT_NUM_CONTRACTORS, STREAM_BATCH_SIZE
 
 logger: logging.Logger = logging.getLogger(__name__)
 
@@ -20,30 +29,32 @@ class ProblemGenerationError(Exception):
     """Custom exception for errors during problem generation."""
     pass
 
-def generate_problem(num_customers: int = DEFAULT_NUM_CUSTOMERS, num_contractors: int = DEFAULT_NUM_CONTRACTORS, contractor_rate: float = 0.5) -> Tuple[List[Customer], List[Contractor]]:
-    """Generate a random problem instance with customers and contractors."""
+def generate_problem(num_customers: int = DEFAULT_NUM_CUSTOMERS, num_contractors: int = DEFAULT_NUM_CONTRACTORS, contractor_rate: float = 0.5,
+                     context: Optional[PlanningContext] = None) -> Tuple[List[Customer], List[Contractor]]:
+    """Generate a random problem instance with customers and contractors, planned in the given (or default) context."""
     try:
-        start_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        customers = [_generate_customer(i, start_date) for i in range(num_customers)]
-        contractors = [_generate_contractor(i, contractor_rate) for i in range(num_contractors)]
+        context = context or get_planning_context()
+        errand_specs = _errand_type_specs()
+        customers = [_generate_customer(i, context, errand_specs) for i in range(num_customers)]
+        contractors = [_generate_contractor(i, contractor_rate, context) for i in range(num_contractors)]
         
         return customers, contractors
     except Exception as e:
         logger.error(f"Error during problem generation: {str(e)}")
         raise ProblemGenerationError(f"Failed to generate problem: {str(e)}")
 
-def _generate_customer(customer_id: int, start_date: datetime) -> Customer:
-    """Generate a single customer with random attributes."""
+def _generate_customer(customer_id: int, context: PlanningContext, errand_specs: List[ErrandSpec]) -> Customer:
+    """Generate a single customer with random attributes and an errand of one of the given specs."""
     return Customer(
         customer_id,
         _generate_valid_location(),
-        _generate_random_errand(customer_id),
-        _generate_full_day_availability(start_date)
+        _generate_random_errand(customer_id, errand_specs),
+        _generate_full_day_availability(context)
     )
 
-def _generate_contractor(contractor_id: int, rate: float) -> Contractor:
+def _generate_contractor(contractor_id: int, rate: float, context: PlanningContext) -> Contractor:
     """Generate a single contractor with random attributes."""
-    return Contractor(contractor_id, _generate_valid_location(), rate)
+    return Contractor(contractor_id, _generate_valid_location(), rate, context)
 
 def _generate_valid_location() -> Tuple[int, int]:
     """Generate a random valid road location."""
@@ -53,19 +64,153 @@ def _generate_valid_location() -> Tuple[int, int]:
             return x, y
     raise ProblemGenerationError("Failed to find valid road location")
 
-def _generate_random_errand(errand_id: int) -> Errand:
-    """Generate a random errand."""
-    errand_type, base_time, incentive, disincentive = random.choice(ERRAND_TYPES)
-    return Errand(errand_id, errand_type, timedelta(minutes=base_time), incentive, disincentive)
-
-def _generate_full_day_availability(start_date: datetime) -> Dict[datetime, List[Tuple[datetime, datetime]]]:
-    """Generate full-day availability for all scheduling days."""
-    return {
-        start_date + timedelta(days=day): [
-            (
-                datetime.combine(start_date + timedelta(days=day), WORK_START_TIME_OBJ),
-                datetime.combine(start_date + timedelta(days=day), WORK_END_TIME_OBJ)
-            )
-        ]
-        for day in range(SCHEDULING_DAYS)
-    }
+def _generate_random_errand(errand_id: int, errand_specs: List[ErrandSpec]) -> Errand:
+    """Generate a random errand of one of the given specs."""
+    return Errand.from_spec(errand_id, random.choice(errand_specs))
+
+def _errand_type_specs() -> List[ErrandSpec]:
+    """The shared spec of each entry of ERRAND_TYPES, in order."""
+    return [errand_spec(errand_type, timedelta(minutes=base_time), incentive, disincentive)
+            for errand_type, base_time, incentive, disincentive in ERRAND_TYPES]
+
+def _generate_full_day_availability(context: PlanningContext) -> Dict[datetime, List[Tuple[datetime, datetime]]]:
+    """Full-day availability for all scheduling days, shared by all customers of equal contexts."""
+    days = range(0, context.num_days * MINUTES_PER_DAY, MINUTES_PER_DAY)
+    return _shared_availability(context.epoch, [(day + context.work_start_minutes, day + context.work_end_minutes)
+                                                for day in days])
+
+# Availability structures by epoch and windows, so customers with equal windows share one.
+_availabilities: Dict[tuple, Dict[datetime, List[Tuple[datetime, datetime]]]] = {}
+
+def _shared_availability(epoch: datetime, windows: List[Tuple[int, int]]) -> Dict[datetime, List[Tuple[datetime, datetime]]]:
+    """Availability with one (start, end) window per day, given in minutes since the epoch."""
+    key = (epoch, tuple(windows))
+    availability = _availabilities.get(key)
+    if availability is None:
+        availability = _availabilities[key] = {
+            epoch + timedelta(days=day): [(epoch + timedelta(minutes=start), epoch + timedelta(minutes=end))]
+            for day, (start, end) in enumerate(windows)
+        }
+    return availability
+
+class ProblemArrays:
+    """
+    A generated instance as parallel arrays, one entry per customer or contractor.
+
+    Customer i has id first_customer_id + i, location customer_locations[i] and an
+    errand of type ERRAND_TYPES[errand_types[i]]. All customers share the availability
+    windows, one (start, end) pair per day in minutes since the context's epoch.
+    """
+
+    def __init__(self, customer_locations: np.ndarray, errand_types: np.ndarray, contractor_locations: np.ndarray,
+                 contractor_rates: np.ndarray, availability: np.ndarray, context: PlanningContext,
+                 first_customer_id: int = 0):
+        self.first_customer_id: int = first_customer_id
+        self.customer_locations: np.ndarray = customer_locations
+        self.errand_types: np.ndarray = errand_types
+        self.contractor_locations: np.ndarray = contractor_locations
+        self.contractor_rates: np.ndarray = contractor_rates
+        self.availability: np.ndarray = availability
+        self.context: PlanningContext = context
+
+    @property
+    def num_customers(self) -> int:
+        return len(self.customer_locations)
+
+    @property
+    def num_contractors(self) -> int:
+        return len(self.contractor_locations)
+
+    @property
+    def errand_base_minutes(self) -> np.ndarray:
+        return np.array([base_time for _, base_time, _, _ in ERRAND_TYPES], dtype=np.int64)[self.errand_types]
+
+    def to_objects(self) -> Tuple[List[Customer], List[Contractor]]:
+        """Customers and contractors for the schedulers. All customers share one availability dict."""
+        availability = _shared_availability(self.context.epoch, [tuple(window) for window in self.availability.tolist()])
+        errand_specs = _errand_type_specs()
+        customers = [Customer(customer_id, (x, y), Errand.from_spec(customer_id, errand_specs[errand_type]), availability)
+                     for customer_id, ((x, y), errand_type) in
+                     enumerate(zip(self.customer_locations.tolist(), self.errand_types.tolist()), self.first_customer_id)]
+        contractors = [Contractor(contractor_id, (x, y), rate, self.context)
+                       for contractor_id, ((x, y), rate) in
+                       enumerate(zip(self.contractor_locations.tolist(), self.contractor_rates.tolist()))]
+        return customers, contractors
+
+    def __str__(self) -> str:
+        return f"ProblemArrays({self.num_customers} customers, {self.num_contractors} contractors)"
+
+    __repr__ = __str__
+
+def generate_bulk_problem(num_customers: int = DEFAULT_NUM_CUSTOMERS, num_contractors: int = DEFAULT_NUM_CONTRACTORS,
+                          contractor_rate: float = 0.5, seed: Union[int, np.random.Generator, None] = None,
+                          context: Optional[PlanningContext] = None,
+                          as_arrays: bool = False) -> Union[Tuple[List[Customer], List[Contractor]], ProblemArrays]:
+    """
+    Generate a random problem instance in one pass of array draws.
+
+    Locations are drawn uniformly from the road cells of the city grid, which is the
+    distribution generate_problem() gets by rejection sampling, and errand types
+    uniformly from ERRAND_TYPES. Customers are available all working hours of every
+    day of the horizon.
+
+    Args:
+        num_customers (int): Number of customers.
+        num_contractors (int): Number of contractors.
+        contractor_rate (float): Rate of every contractor per minute.
+        seed (Union[int, np.random.Generator, None]): Seed or generator; the same seed gives the same instance.
+        context (Optional[PlanningContext]): Planning context, the default one if None.
+        as_arrays (bool): Return the ProblemArrays instead of customer and contractor objects.
+
+    Returns:
+        Union[Tuple[List[Customer], List[Contractor]], ProblemArrays]: The instance.
+    """
+    try:
+        context = context or get_planning_context()
+        rng = np.random.default_rng(seed)
+        problem = _draw_problem(rng, num_customers, num_contractors, contractor_rate, context)
+    except Exception as e:
+        logger.error(f"Error during problem generation: {str(e)}")
+        raise ProblemGenerationError(f"Failed to generate problem: {str(e)}")
+    logger.info(f"Generated {problem}")
+    return problem if as_arrays else problem.to_objects()
+
+def generate_problem_stream(num_customers: int = DEFAULT_NUM_CUSTOMERS, num_contractors: int = DEFAULT_NUM_CONTRACTORS,
+                            contractor_rate: float = 0.5, batch_size: int = STREAM_BATCH_SIZE,
+                            seed: Union[int, np.random.Generator, None] = None,
+                            context: Optional[PlanningContext] = None) -> Tuple[Iterator[List[Customer]], List[Contractor]]:
+    """
+    Generate a problem whose customers are drawn lazily in batches, like generate_bulk_problem().
+
+    The contractors are created at once; customers (ids 0 to num_customers - 1) are drawn
+    only when the returned iterator is advanced, so at most one batch is held by the
+    generator. Schedulers take the customers as a stream with
+    itertools.chain.from_iterable(batches).
+
+    Returns:
+        Tuple[Iterator[List[Customer]], List[Contractor]]: The customer batches and the contractors.
+    """
+    if batch_size < 1:
+        raise ProblemGenerationError("The batch size must be at least 1")
+    context = context or get_planning_context()
+    rng = np.random.default_rng(seed)
+    _, contractors = _draw_problem(rng, 0, num_contractors, contractor_rate, context).to_objects()
+
+    def batches() -> Iterator[List[Customer]]:
+        for first_customer_id in range(0, num_customers, batch_size):
+            count = min(batch_size, num_customers - first_customer_id)
+            customers, _ = _draw_problem(rng, count, 0, contractor_rate, context, first_customer_id).to_objects()
+            yield customers
+    return batches(), contractors
+
+def _draw_problem(rng: np.random.Generator, num_customers: int, num_contractors: int, contractor_rate: float,
+                  context: PlanningContext, first_customer_id: int = 0) -> ProblemArrays:
+    road_cells = np.argwhere(city_grid == 1).astype(np.int64)
+    days = np.arange(context.num_days, dtype=np.int64) * MINUTES_PER_DAY
+    return ProblemArrays(
+        road_cells[rng.integers(0, len(road_cells), num_customers)],
+        rng.integers(0, len(ERRAND_TYPES), num_customers),
+        road_cells[rng.integers(0, len(road_cells), num_contractors)],
+        np.full(num_contractors, contractor_rate, dtype=float),
+        np.stack([days + context.work_start_minutes, days + context.work_end_minutes], axis=1),
+        context, first_customer_id)
@@ -0,0 +1,292 @@
+"""
+Road network routing engine for the Synthetic Errands Scheduler.
+
+RoadNetwork turns a city grid (non-zero cells are roads, indexed grid[y, x]) into a
+directed graph stored as compact CSR adjacency arrays, with one node per road cell
+and an edge of 1 minute between neighbouring road cells. Roads can be closed or
+made one-way, and the grid can be any shape, so it models irregular maps that the
+closed-form Manhattan model in utils.travel_time cannot.
+
+Queries go through a distance oracle:
+- distances_from / distances_to run a single-source Dijkstra (forward or on the
+  reversed graph) and keep the result in an LRU cache, so repeated queries from or
+  to the same point are array lookups;
+- point-to-point queries that hit neither cache use A* with ALT (landmark and
+  triangle inequality) lower bounds precomputed from a few far-apart landmarks.
+
+The network is a drop-in travel time provider: pass it as the router of a
+TravelMatrix to give the scheduler road-network travel times. With a
+utils.travel_cache.TravelCache the landmark tables are kept on disk between runs.
+"""
+
+import hashlib
+import heapq
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from utils.city_map import city_grid
+from utils.travel_cache import TravelCache
+
+Point = Tuple[int, int]
+
+# Travel time reported between points with no connecting route.
+UNREACHABLE_MINUTES: int = 1_000_000
+
+class RoadNetwork:
+    """Directed road graph over a city grid with a cached shortest-path distance oracle."""
+
+    def __init__(self, grid: np.ndarray, closed_roads: Iterable[Tuple[Point, Point]] = (),
+                 one_way_roads: Iterable[Tuple[Point, Point]] = (), num_landmarks: int = 8, cache_size: int = 1024,
+                 cache: Optional[TravelCache] = None):
+        """
+        Args:
+            grid (np.ndarray): City grid indexed [y, x]; non-zero cells are roads.
+            closed_roads (Iterable[Tuple[Point, Point]]): Straight road stretches (x, y) -> (x, y) closed in both directions.
+            one_way_roads (Iterable[Tuple[Point, Point]]): Straight road stretches that may only be driven from the first point to the second.
+            num_landmarks (int): Number of ALT landmarks used to speed up point-to-point queries.
+            cache_size (int): Number of single-source results kept per direction.
+            cache (Optional[TravelCache]): Persistent cache for the landmark tables.
+        """
+        self.grid: np.ndarray = np.asarray(grid)
+        road_cells = np.argwhere(self.grid != 0)
+        # Node coordinates as (x, y), ordered by row then column.
+        self.node_points: np.ndarray = road_cells[:, ::-1].astype(np.int64)
+        self.node_ids: np.ndarray = np.full(self.grid.shape, -1, dtype=np.int64)
+        self.node_ids[road_cells[:, 0], road_cells[:, 1]] = np.arange(len(road_cells))
+        self.num_nodes: int = len(road_cells)
+
+        removed = set()
+        for start, end in closed_roads:
+            for u, v in self._segment_edges(start, end):
+                removed.add((u, v))
+                removed.add((v, u))
+        for start, end in one_way_roads:
+            for u, v in self._segment_edges(start, end):
+                removed.add((v, u))
+
+        self.indptr, self.indices, self.weights = self._build_csr(removed, reverse=False)
+        self.reverse_indptr, self.reverse_indices, self.reverse_weights = self._build_csr(removed, reverse=True)
+        self._forward = (self.indptr.tolist(), self.indices.tolist(), self.weights.tolist())
+        self._backward = (self.reverse_indptr.tolist(), self.reverse_indices.tolist(), self.reverse_weights.tolist())
+
+        self.cache_size: int = cache_size
+        self._from_cache: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        self._to_cache: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        self._nearest_cache: Dict[Point, Tuple[int, int]] = {}
+
+        # Identifies the road layout, including closures and one-way roads, for persistent caches.
+        digest = hashlib.sha256(str(self.grid.shape).encode())
+        for array in (self.node_points, self.indptr, self.indices, self.weights):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        self.fingerprint: str = digest.hexdigest()
+
+        if cache is not None:
+            key = cache.key('landmarks', self.fingerprint, np.array([num_landmarks]))
+            tables = cache.get_or_compute(key, lambda: np.stack(self._select_landmarks(num_landmarks)))
+            self._landmarks_from, self._landmarks_to = tables[0], tables[1]
+        else:
+            self._landmarks_from, self._landmarks_to = self._select_landmarks(num_landmarks)
+
+    @classmethod
+    def from_city_map(cls, **kwargs) -> 'RoadNetwork':
+        """Build the network for the default Busyville grid from utils.city_map."""
+        return cls(city_grid, **kwargs)
+
+    def _segment_edges(self, start: Point, end: Point) -> List[Tuple[int, int]]:
+        """Directed edges along a straight road stretch from start to end."""
+        (x0, y0), (x1, y1) = start, end
+        if x0 != x1 and y0 != y1:
+            raise ValueError(f"Road stretch {start} -> {end} is not horizontal or vertical")
+        steps = max(abs(x1 - x0), abs(y1 - y0))
+        dx, dy = (x1 > x0) - (x1 < x0), (y1 > y0) - (y1 < y0)
+        cells = [self.node_of((x0 + dx * i, y0 + dy * i)) for i in range(steps + 1)]
+        if any(node < 0 for node in cells):
+            raise ValueError(f"Road stretch {start} -> {end} leaves the road network")
+        return list(zip(cells, cells[1:]))
+
+    def _build_csr(self, removed, reverse: bool) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        height, width = self.grid.shape
+        sources, targets = [], []
+        for dy, dx in ((0, 1), (1, 0), (0, -1), (-1, 0)):
+            ys, xs = self.node_points[:, 1], self.node_points[:, 0]
+            ny, nx = ys + dy, xs + dx
+            inside = (ny >= 0) & (ny < height) & (nx >= 0) & (nx < width)
+            neighbours = np.full(self.num_nodes, -1, dtype=np.int64)
+            neighbours[inside] = self.node_ids[ny[inside], nx[inside]]
+            has_edge = neighbours >= 0
+            sources.append(np.flatnonzero(has_edge))
+            targets.append(neighbours[has_edge])
+        sources = np.concatenate(sources)
+        targets = np.concatenate(targets)
+        if removed:
+            keep = np.array([(u, v) not in removed for u, v in zip(sources.tolist(), targets.tolist())], dtype=bool)
+            sources, targets = sources[keep], targets[keep]
+        if reverse:
+            sources, targets = targets, sources
+
+        order = np.argsort(sources, kind='stable')
+        indptr = np.zeros(self.num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=self.num_nodes), out=indptr[1:])
+        return indptr, targets[order].astype(np.int32), np.ones(len(order), dtype=np.int32)
+
+    def node_of(self, point: Point) -> int:
+        """Node id of a road cell, or -1 if the point is not on a road."""
+        x, y = point
+        height, width = self.grid.shape
+        if 0 <= x < width and 0 <= y < height:
+            return int(self.node_ids[y, x])
+        return -1
+
+    def _access(self, point: Point) -> Tuple[int, int]:
+        """Nearest road node of a point and the straight-line minutes needed to reach it."""
+        point = (int(point[0]), int(point[1]))
+        cached = self._nearest_cache.get(point)
+        if cached is None:
+            node = self.node_of(point)
+            if node >= 0:
+                cached = (node, 0)
+            else:
+                offsets = np.abs(self.node_points - np.array(point)).sum(axis=1)
+                node = int(offsets.argmin())
+                cached = (node, int(offsets[node]))
+            self._nearest_cache[point] = cached
+        return cached
+
+    def _dijkstra(self, source: int, graph) -> np.ndarray:
+        indptr, indices, weights = graph
+        dist = [UNREACHABLE_MINUTES] * self.num_nodes
+        dist[source] = 0
+        heap = [(0, source)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            for k in range(indptr[u], indptr[u + 1]):
+                v = indices[k]
+                nd = d + weights[k]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    heapq.heappush(heap, (nd, v))
+        return np.array(dist, dtype=np.int32)
+
+    def _cached(self, cache: "OrderedDict[int, np.ndarray]", node: int, graph) -> np.ndarray:
+        dist = cache.get(node)
+        if dist is not None:
+            cache.move_to_end(node)
+            return dist
+        dist = self._dijkstra(node, graph)
+        cache[node] = dist
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return dist
+
+    def distances_from(self, node: int) -> np.ndarray:
+        """Shortest travel minutes from a node to every node (cached)."""
+        return self._cached(self._from_cache, node, self._forward)
+
+    def distances_to(self, node: int) -> np.ndarray:
+        """Shortest travel minutes from every node to a node (cached)."""
+        return self._cached(self._to_cache, node, self._backward)
+
+    def _select_landmarks(self, count: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Pick far-apart landmarks and their distance tables in both directions."""
+        count = min(count, self.num_nodes)
+        if count == 0:
+            empty = np.zeros((0, self.num_nodes), dtype=np.int64)
+            return empty, empty
+        landmarks = [0]
+        nearest = self._dijkstra(0, self._forward).astype(np.int64)
+        while len(landmarks) < count:
+            candidates = np.where(nearest >= UNREACHABLE_MINUTES, -1, nearest)
+            landmark = int(candidates.argmax())
+            if candidates[landmark] <= 0:
+                break
+            landmarks.append(landmark)
+            nearest = np.minimum(nearest, self._dijkstra(landmark, self._forward))
+        landmarks_from = np.array([self._dijkstra(node, self._forward) for node in landmarks], dtype=np.int64)
+        landmarks_to = np.array([self._dijkstra(node, self._backward) for node in landmarks], dtype=np.int64)
+        return landmarks_from, landmarks_to
+
+    def _heuristic(self, target: int) -> List[int]:
+        """ALT lower bounds on the distance from every node to target."""
+        if not len(self._landmarks_from):
+            return [0] * self.num_nodes
+        from_landmark, to_landmark = self._landmarks_from, self._landmarks_to
+        # d(v, t) >= d(L, t) - d(L, v) and d(v, t) >= d(v, L) - d(t, L)
+        forward = from_landmark[:, target:target + 1] - from_landmark
+        forward[(from_landmark >= UNREACHABLE_MINUTES) | (from_landmark[:, target:target + 1] >= UNREACHABLE_MINUTES)] = 0
+        backward = to_landmark - to_landmark[:, target:target + 1]
+        backward[(to_landmark >= UNREACHABLE_MINUTES) | (to_landmark[:, target:target + 1] >= UNREACHABLE_MINUTES)] = 0
+        return np.maximum(np.maximum(forward, backward).max(axis=0), 0).tolist()
+
+    def shortest_path_minutes(self, source: int, target: int) -> int:
+        """Shortest travel minutes between two nodes, from the caches or by ALT A* search."""
+        if source == target:
+            return 0
+        if source in self._from_cache:
+            return int(self.distances_from(source)[target])
+        if target in self._to_cache:
+            return int(self.distances_to(target)[source])
+
+        indptr, indices, weights = self._forward
+        heuristic = self._heuristic(target)
+        best = {source: 0}
+        heap = [(heuristic[source], 0, source)]
+        while heap:
+            _, d, u = heapq.heappop(heap)
+            if u == target:
+                return d
+            if d > best[u]:
+                continue
+            for k in range(indptr[u], indptr[u + 1]):
+                v = indices[k]
+                nd = d + weights[k]
+                if nd < best.get(v, UNREACHABLE_MINUTES):
+                    best[v] = nd
+                    heapq.heappush(heap, (nd + heuristic[v], nd, v))
+        return UNREACHABLE_MINUTES
+
+    def travel_minutes(self, start: Point, end: Point) -> int:
+        """Travel time between two points; off-road points first walk to their nearest road cell."""
+        if start == end:
+            return 0
+        start_node, start_access = self._access(start)
+        end_node, end_access = self._access(end)
+        minutes = self.shortest_path_minutes(start_node, end_node)
+        if minutes >= UNREACHABLE_MINUTES:
+            return UNREACHABLE_MINUTES
+        return start_access + minutes + end_access
+
+    def travel_minutes_batch(self, starts: Sequence[Point], end: Point) -> np.ndarray:
+        """Travel times from many points to one point, from a single reverse search."""
+        end_node, end_access = self._access(end)
+        to_end = self.distances_to(end_node)
+        result = np.empty(len(starts), dtype=np.int64)
+        for i, start in enumerate(starts):
+            start_node, start_access = self._access(start)
+            minutes = int(to_end[start_node])
+            result[i] = UNREACHABLE_MINUTES if minutes >= UNREACHABLE_MINUTES else start_access + minutes + end_access
+        result[[tuple(start) == tuple(end) for start in starts]] = 0
+        return result
+
+    def travel_matrix(self, points: Sequence[Point]) -> np.ndarray:
+        """All-pairs travel minutes between the given points, one single-source search per distinct road node."""
+        accesses = [self._access(point) for point in points]
+        nodes = np.array([node for node, _ in accesses], dtype=np.int64)
+        access = np.array([minutes for _, minutes in accesses], dtype=np.int64)
+        minutes = np.empty((len(points), len(points)), dtype=np.int64)
+        rows: Dict[int, np.ndarray] = {}
+        for i, node in enumerate(nodes.tolist()):
+            if node not in rows:
+                rows[node] = self._dijkstra(node, self._forward)[nodes].astype(np.int64)
+            minutes[i] = rows[node]
+        unreachable = minutes >= UNREACHABLE_MINUTES
+        minutes += access[:, None] + access[None, :]
+        minutes[unreachable] = UNREACHABLE_MINUTES
+        np.fill_diagonal(minutes, 0)
+        return minutes
+
+    def __str__(self) -> str:
+        return f"RoadNetwork({self.num_nodes} nodes, {len(self.indices)} edges)"
+
+    __repr__ = __str__
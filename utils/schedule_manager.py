@@ -2,8 +2,13 @@ from typing import List, Tuple
 from models.customer import Customer
 from models.contractor import Contractor
 from models.schedule import Schedule
-from algorithms.initial_greedy_scheduler import initial_greedy_schedule, InitialSchedulingError
+from algorithms.initial_greedy_scheduler import InitialSchedulingError
+from algorithms.registry import get_algorithm
+from algorithms.local_search import improve_schedule
+from algorithms.lns_optimizer import optimize_schedule
+from constants import SCHEDULER_MODE, USE_LOCAL_SEARCH, USE_LNS, OPTIMIZATION_MAX_TIME
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -16,7 +21,15 @@ class ScheduleManager:
             if not contractor_calendars:
                 raise ValueError("Failed to initialize contractor calendars.")
             
-            schedule = initial_greedy_schedule(customers, contractors)
+            schedule = get_algorithm(SCHEDULER_MODE)(customers, contractors)
+            # The optimizers share one time budget: LNS gets half of it when local search follows,
+            # and local search whatever is left.
+            deadline = time.perf_counter() + OPTIMIZATION_MAX_TIME
+            if USE_LNS:
+                lns_deadline = deadline - OPTIMIZATION_MAX_TIME / 2 if USE_LOCAL_SEARCH else deadline
+                schedule = optimize_schedule(schedule, max(0.0, lns_deadline - time.perf_counter()))
+            if USE_LOCAL_SEARCH:
+                schedule = improve_schedule(schedule, max(0.0, deadline - time.perf_counter()))
             
             total_assignments = len(schedule.get_assignments())
             logger.info(f"Total assignments made: {total_assignments}")
@@ -6,12 +6,15 @@ Provides common utility functions for scheduling operations used across differen
 import logging
 from typing import Optional, Tuple
 from datetime import datetime, timedelta
+import numpy as np
 from models.customer import Customer
 from models.contractor import Contractor
-from models.errand import Errand
-from utils.travel_time import calculate_travel_time
+from models.errand import Errand, CHARGE_TABLE
+from utils.travel_time import calculate_travel_minutes
+from utils.travel_matrix import TravelMatrix
+from utils.planning_context import PlanningContext, get_planning_context
 from constants import WORK_START_TIME_OBJ, WORK_END_TIME_OBJ
-from utils.time_utils import is_time_within_range, calculate_time_difference
+from utils.time_utils import is_time_within_range, calculate_time_difference, MINUTES_PER_DAY, get_current_time
 
 logger = logging.getLogger(__name__)
 
@@ -22,10 +25,18 @@ class SchedulingUtilities:
         return (is_time_within_range(start_time.time(), WORK_START_TIME_OBJ, WORK_END_TIME_OBJ) and
                 is_time_within_range(end_time.time(), WORK_START_TIME_OBJ, WORK_END_TIME_OBJ))
 
+    @staticmethod
+    def is_within_working_hours_minutes(start: int, end: int, context: Optional[PlanningContext] = None) -> bool:
+        """Check if the errand starts and ends within working hours, given minutes since the planning epoch."""
+        context = context or get_planning_context()
+        work_start, work_end = context.work_start_minutes, context.work_end_minutes
+        return (work_start <= start % MINUTES_PER_DAY <= work_end and
+                work_start <= end % MINUTES_PER_DAY <= work_end)
+
     @staticmethod
     def calculate_next_available_time(contractor: Contractor, customer: Customer, current_datetime: datetime) -> Optional[datetime]:
         """Calculate the next available time for a contractor, considering travel time and working hours."""
-        travel_duration, _ = calculate_travel_time(contractor.location, customer.location)
+        travel_duration = timedelta(minutes=calculate_travel_minutes(contractor.location, customer.location))
         total_time = travel_duration + customer.desired_errand.base_time
         next_available_slot = contractor.calendar.get_next_available_slot(current_datetime, total_time)
         
@@ -42,11 +53,42 @@ class SchedulingUtilities:
     @staticmethod
     def calculate_profit(customer: Customer, contractor: Contractor, travel_start_time: datetime, task_end_time: datetime) -> float:
         """Calculate the profit for a specific errand assignment."""
-        charge = customer.desired_errand.calculate_final_charge(travel_start_time, datetime.now())
+        charge = customer.desired_errand.calculate_final_charge(travel_start_time, get_current_time())
         total_time = task_end_time - travel_start_time
         cost = total_time.total_seconds() / 60 * contractor.rate
         return charge - cost
 
+    @staticmethod
+    def get_request_day(context: Optional[PlanningContext] = None) -> int:
+        """Day index of the request date of errands relative to the epoch of the (default) planning context."""
+        return (context or get_planning_context()).request_day
+
+    @staticmethod
+    def calculate_profit_minutes(customer: Customer, contractor: Contractor, travel_start: int, task_end: int,
+                                 context: Optional[PlanningContext] = None) -> float:
+        """Calculate the profit for an errand assignment given as minutes since the planning epoch."""
+        request_day = SchedulingUtilities.get_request_day(context or contractor.calendar.context)
+        charge = customer.desired_errand.calculate_final_charge_for_offset(travel_start // MINUTES_PER_DAY - request_day)
+        cost = (task_end - travel_start) * contractor.rate
+        return charge - cost
+
+    @staticmethod
+    def calculate_profits_batch(kinds: np.ndarray, day_offsets: np.ndarray, durations: np.ndarray,
+                                rates: np.ndarray) -> np.ndarray:
+        """
+        Profits of many assignments in one array pass.
+
+        Args:
+            kinds (np.ndarray): Charge kind of each errand (Errand.charge_kind).
+            day_offsets (np.ndarray): Days from the request day to the scheduled day.
+            durations (np.ndarray): Minutes from travel start to task end.
+            rates (np.ndarray): Contractor rate per minute.
+
+        Returns:
+            np.ndarray: Charge less cost of each assignment, broadcast over the arguments.
+        """
+        return CHARGE_TABLE.charges(kinds, day_offsets) - np.asarray(rates) * np.asarray(durations)
+
     @staticmethod
     def is_valid_assignment(contractor: Contractor, customer: Customer, travel_start_time: datetime, task_end_time: datetime) -> bool:
         """Check if an assignment is valid based on contractor availability and working hours."""
@@ -55,20 +97,30 @@ class SchedulingUtilities:
             contractor.calendar.is_available(travel_start_time, task_end_time)
         ])
 
+    @staticmethod
+    def is_valid_assignment_minutes(contractor: Contractor, customer: Customer, travel_start: int, task_end: int) -> bool:
+        """Check if an assignment given as minutes since the planning epoch is valid."""
+        return (SchedulingUtilities.is_within_working_hours_minutes(travel_start, task_end, contractor.calendar.context) and
+                contractor.calendar.is_available_minutes(travel_start, task_end))
+
     @staticmethod
     def has_sufficient_travel_time(contractor: Contractor, customer: Customer, travel_start_time: datetime, task_end_time: datetime) -> bool:
         """
         Check if the errand base time + travel time fits within the time slot being evaluated.
         Returns True if there is sufficient time, False otherwise.
         """
-        travel_duration, _ = calculate_travel_time(contractor.location, customer.location)
+        travel_duration = timedelta(minutes=calculate_travel_minutes(contractor.location, customer.location))
         total_time = travel_duration + customer.desired_errand.base_time
         return task_end_time - travel_start_time >= total_time
 
     @staticmethod
-    def get_assignment_details(customer: Customer, contractor: Contractor, travel_start_time: datetime) -> Tuple[datetime, datetime, timedelta, float]:
+    def get_assignment_details(customer: Customer, contractor: Contractor, travel_start_time: datetime,
+                               travel_matrix: Optional[TravelMatrix] = None) -> Tuple[datetime, datetime, timedelta, float]:
         """Get the details of an assignment including travel end time, task end time, total time, and profit."""
-        travel_duration, _ = calculate_travel_time(contractor.location, customer.location)
+        if travel_matrix is not None:
+            travel_duration = timedelta(minutes=travel_matrix.travel_minutes(contractor.location, customer.location))
+        else:
+            travel_duration = timedelta(minutes=calculate_travel_minutes(contractor.location, customer.location))
         task_duration = customer.desired_errand.base_time
         total_duration = travel_duration + task_duration
         travel_end_time = travel_start_time + travel_duration
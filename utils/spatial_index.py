@@ -0,0 +1,201 @@
+"""
+Spatial index over locations on the city grid.
+
+SpatialIndex buckets items by location into square cells the size of the road
+spacing of utils.city_map, centred on the road intersections so that a point on a
+road is never on a cell border. Nearest-neighbour and radius queries only visit
+the cells around the query point instead of every item. Distances are Manhattan
+distances, which never exceed the travel time between two points under the road
+models of utils.travel_time and utils.road_network. A radius query in travel
+minutes therefore never misses a point that is within that travel time.
+
+Items are any hashable keys (contractor ids, customer ids, row numbers) and can be
+moved, so the index can follow contractors as they are assigned errands.
+"""
+
+import heapq
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Set, Tuple
+from utils.city_map import ROAD_SPACING
+
+Point = Tuple[int, int]
+
+class SpatialIndex:
+    """Uniform bucket grid of items keyed by location."""
+
+    def __init__(self, items: Iterable[Tuple[Hashable, Point]] = (), cell_size: int = ROAD_SPACING):
+        if cell_size < 1:
+            raise ValueError("Cell size must be at least 1")
+        self.cell_size: int = cell_size
+        self._locations: Dict[Hashable, Point] = {}
+        self._buckets: Dict[Tuple[int, int], Set[Hashable]] = {}
+        # Insertion order of the items, used to break distance ties deterministically.
+        self._order: Dict[Hashable, int] = {}
+        self._inserted: int = 0
+        # Cells are offset by half a cell so that roads run through their middle.
+        self._offset: int = cell_size // 2
+        self._extent: Optional[Tuple[int, int, int, int]] = None  # Bounding box of occupied cells
+        for item, location in items:
+            self.insert(item, location)
+
+    def _cell(self, location: Point) -> Tuple[int, int]:
+        return (location[0] + self._offset) // self.cell_size, (location[1] + self._offset) // self.cell_size
+
+    def insert(self, item: Hashable, location: Point) -> None:
+        """Add an item, or move it if it is already indexed."""
+        if item in self._locations:
+            self.move(item, location)
+            return
+        location = (int(location[0]), int(location[1]))
+        self._locations[item] = location
+        self._order[item] = self._inserted
+        self._inserted += 1
+        self._add_to_bucket(self._cell(location), item)
+
+    def remove(self, item: Hashable) -> None:
+        """Remove an item; raises KeyError if it is not indexed."""
+        location = self._locations.pop(item)
+        del self._order[item]
+        self._remove_from_bucket(self._cell(location), item)
+
+    def move(self, item: Hashable, location: Point) -> None:
+        """Update the location of an indexed item."""
+        location = (int(location[0]), int(location[1]))
+        old_cell = self._cell(self._locations[item])
+        new_cell = self._cell(location)
+        self._locations[item] = location
+        if old_cell != new_cell:
+            self._remove_from_bucket(old_cell, item)
+            self._add_to_bucket(new_cell, item)
+
+    def _add_to_bucket(self, cell: Tuple[int, int], item: Hashable) -> None:
+        bucket = self._buckets.get(cell)
+        if bucket is None:
+            bucket = self._buckets[cell] = set()
+            self._extent = None
+        bucket.add(item)
+
+    def _remove_from_bucket(self, cell: Tuple[int, int], item: Hashable) -> None:
+        bucket = self._buckets[cell]
+        bucket.discard(item)
+        if not bucket:
+            del self._buckets[cell]
+            self._extent = None
+
+    def location_of(self, item: Hashable) -> Point:
+        return self._locations[item]
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    def __contains__(self, item: Hashable) -> bool:
+        return item in self._locations
+
+    def _ring(self, center: Tuple[int, int], radius: int) -> Iterable[Tuple[int, int]]:
+        """Cells at Chebyshev distance `radius` from the center cell."""
+        cx, cy = center
+        if radius == 0:
+            yield center
+            return
+        for dx in range(-radius, radius + 1):
+            yield cx + dx, cy - radius
+            yield cx + dx, cy + radius
+        for dy in range(-radius + 1, radius):
+            yield cx - radius, cy + dy
+            yield cx + radius, cy + dy
+
+    def _outside_distance(self, location: Point, center: Tuple[int, int], ring: int) -> int:
+        """Smallest distance from the location to any cell beyond the given ring."""
+        x, y = location
+        cx, cy = center
+        low_x = (cx - ring) * self.cell_size - self._offset
+        low_y = (cy - ring) * self.cell_size - self._offset
+        high_x = low_x + (2 * ring + 1) * self.cell_size
+        high_y = low_y + (2 * ring + 1) * self.cell_size
+        return min(x - low_x + 1, high_x - x, y - low_y + 1, high_y - y)
+
+    def _scan_ring(self, location: Point, center: Tuple[int, int], ring: int,
+                   max_distance: Optional[int]) -> List[Tuple[int, int, Hashable]]:
+        """(distance, insertion order, item) of the items in a ring within max_distance."""
+        x, y = location
+        locations, order = self._locations, self._order
+        found = []
+        for cell in self._ring(center, ring):
+            for item in self._buckets.get(cell, ()):
+                item_x, item_y = locations[item]
+                distance = abs(item_x - x) + abs(item_y - y)
+                if max_distance is None or distance <= max_distance:
+                    found.append((distance, order[item], item))
+        return found
+
+    def nearest(self, location: Point, k: int, max_distance: Optional[int] = None) -> List[Hashable]:
+        """
+        Find the k items closest to a location.
+
+        Cells are visited in rings around the location's cell. The search stops once the
+        k-th best distance is no larger than the smallest distance any unvisited ring can
+        contain. Ties are broken by insertion order.
+
+        Args:
+            location (Point): Query location.
+            k (int): Maximum number of items to return.
+            max_distance (Optional[int]): Only return items within this Manhattan distance.
+
+        Returns:
+            List[Hashable]: Items ordered by distance, then insertion order.
+        """
+        if k <= 0 or not self._locations:
+            return []
+        center = self._cell(location)
+        max_ring = self._max_ring(center, max_distance)
+        found: List[Tuple[int, int, Hashable]] = []
+        for ring in range(max_ring + 1):
+            found.extend(self._scan_ring(location, center, ring, max_distance))
+            if len(found) >= k:
+                found.sort(key=lambda entry: entry[:2])
+                if found[k - 1][0] < self._outside_distance(location, center, ring):
+                    break
+        found.sort(key=lambda entry: entry[:2])
+        return [item for _, _, item in found[:k]]
+
+    def iter_nearest(self, location: Point, max_distance: Optional[int] = None) -> Iterator[Tuple[int, Hashable]]:
+        """
+        Yield (distance, item) pairs in order of distance, then insertion order, visiting cells lazily.
+
+        The index must not be modified while the iterator is in use.
+        """
+        if not self._locations:
+            return
+        center = self._cell(location)
+        pending: List[Tuple[int, int, Hashable]] = []
+        for ring in range(self._max_ring(center, max_distance) + 1):
+            pending.extend(self._scan_ring(location, center, ring, max_distance))
+            heapq.heapify(pending)
+            # Items closer than any cell beyond this ring can be yielded now.
+            bound = self._outside_distance(location, center, ring)
+            while pending and pending[0][0] < bound:
+                distance, _, item = heapq.heappop(pending)
+                yield distance, item
+        while pending:
+            distance, _, item = heapq.heappop(pending)
+            yield distance, item
+
+    def within(self, location: Point, radius: int) -> List[Hashable]:
+        """Items within a Manhattan distance of a location, ordered by distance, then insertion order."""
+        return self.nearest(location, len(self._locations), radius)
+
+    def _max_ring(self, center: Tuple[int, int], max_distance: Optional[int]) -> int:
+        """Last ring that can hold items: within max_distance, and never beyond the occupied cells."""
+        if self._extent is None:
+            xs = [cell[0] for cell in self._buckets]
+            ys = [cell[1] for cell in self._buckets]
+            self._extent = (min(xs), max(xs), min(ys), max(ys))
+        min_x, max_x, min_y, max_y = self._extent
+        last_ring = max(abs(center[0] - min_x), abs(center[0] - max_x), abs(center[1] - min_y), abs(center[1] - max_y))
+        if max_distance is not None:
+            last_ring = min(last_ring, max_distance // self.cell_size + 1)
+        return last_ring
+
+    def __str__(self) -> str:
+        return f"SpatialIndex({len(self._locations)} items, {len(self._buckets)} cells)"
+
+    __repr__ = __str__
@@ -1,5 +1,10 @@
 import datetime
-from typing import Union
+from typing import Callable, Optional, Union
+
+MINUTES_PER_DAY: int = 24 * 60
+
+_planning_epoch: Optional[datetime.datetime] = None
+_planning_clock: Callable[[], datetime.datetime] = datetime.datetime.now
 
 def convert_minutes_to_time(minutes: int) -> datetime.time:
     # Convert minutes since midnight to a datetime.time object.
@@ -38,4 +43,52 @@ def calculate_time_difference(start: Union[datetime.datetime, datetime.time],
     elif isinstance(start, datetime.datetime) and isinstance(end, datetime.datetime):
         return end - start
     else:
-        raise TypeError("Both start and end must be of the same type (either datetime or time)")
\ No newline at end of file
+        raise TypeError("Both start and end must be of the same type (either datetime or time)")
+
+def set_planning_clock(clock: Union[datetime.datetime, Callable[[], datetime.datetime], None]) -> None:
+    # Set the clock giving the current time, which is the request date of errands: a callable,
+    # a fixed datetime (e.g. to replay or test a plan at a given date) or None for the system clock.
+
+    global _planning_clock
+    if clock is None:
+        _planning_clock = datetime.datetime.now
+    elif isinstance(clock, datetime.datetime):
+        _planning_clock = lambda: clock
+    else:
+        _planning_clock = clock
+
+def get_current_time() -> datetime.datetime:
+    # Get the current time from the planning clock.
+
+    return _planning_clock()
+
+def get_planning_epoch() -> datetime.datetime:
+    # Get the planning epoch: midnight of the day the first scheduling component was created.
+    # The scheduling core represents times as integer minutes since this instant.
+
+    global _planning_epoch
+    if _planning_epoch is None:
+        _planning_epoch = get_current_time().replace(hour=0, minute=0, second=0, microsecond=0)
+    return _planning_epoch
+
+def set_planning_epoch(epoch: Optional[datetime.datetime]) -> None:
+    # Set the planning epoch (truncated to midnight), or None to take it from the planning clock
+    # when next needed. Calendars created before keep the epoch they were created with.
+
+    global _planning_epoch
+    _planning_epoch = epoch.replace(hour=0, minute=0, second=0, microsecond=0) if epoch is not None else None
+
+def datetime_to_minutes(value: datetime.datetime, epoch: datetime.datetime) -> int:
+    # Convert a datetime to whole minutes since the given epoch.
+
+    return (value - epoch) // datetime.timedelta(minutes=1)
+
+def minutes_to_datetime(minutes: int, epoch: datetime.datetime) -> datetime.datetime:
+    # Convert minutes since the given epoch back to a datetime.
+
+    return epoch + datetime.timedelta(minutes=minutes)
+
+def timedelta_to_minutes(value: datetime.timedelta) -> int:
+    # Convert a timedelta to whole minutes.
+
+    return value // datetime.timedelta(minutes=1)
@@ -0,0 +1,149 @@
+"""
+Persistent travel time cache for the Synthetic Errands Scheduler.
+
+TravelCache keeps computed travel tables (travel matrices, road network landmark
+tables) as .npy files in a directory and maps them back read-only with
+np.load(mmap_mode='r'), so later runs and worker processes share the pages
+instead of recomputing them.
+
+Entries are keyed by a hash of the road model fingerprint (the city grid and
+GRID_SIZE, or a road network's graph) and of the points involved. A change to the
+grid or the road layout therefore produces new keys, and store() removes entries
+of the same kind that were built for another road model. Files are written
+atomically and the directory is kept under a size limit by evicting the least
+recently used entries.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+from typing import Callable, List, Optional, Tuple
+import numpy as np
+from utils.city_map import GRID_SIZE, city_grid
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+def grid_fingerprint(grid: np.ndarray = city_grid, grid_size: int = GRID_SIZE) -> str:
+    """Hash of a city grid and GRID_SIZE, identifying the road model that travel tables were built for."""
+    grid = np.ascontiguousarray(grid)
+    digest = hashlib.sha256()
+    digest.update(f"{grid_size}:{grid.shape}:{grid.dtype.str}".encode())
+    digest.update(grid.tobytes())
+    return digest.hexdigest()
+
+class TravelCache:
+    """Directory of memory-mapped travel tables with LRU eviction."""
+
+    def __init__(self, directory: str, max_megabytes: float = 256):
+        self.directory: str = directory
+        self.max_bytes: int = int(max_megabytes * 1024 * 1024)
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(kind: str, fingerprint: str, points: Optional[np.ndarray] = None) -> str:
+        """
+        Cache key for a table of the given kind.
+
+        Args:
+            kind (str): Table kind, e.g. 'matrix' or 'landmarks'; used as the file name prefix.
+            fingerprint (str): Road model fingerprint, e.g. from grid_fingerprint().
+            points (Optional[np.ndarray]): Points or other parameters the table depends on.
+
+        Returns:
+            str: The key, '<kind>-<road model hash>-<points hash>'.
+        """
+        digest = hashlib.sha256()
+        if points is not None:
+            points = np.ascontiguousarray(points, dtype=np.int64)
+            digest.update(str(points.shape).encode())
+            digest.update(points.tobytes())
+        return f"{kind}-{fingerprint[:16]}-{digest.hexdigest()[:32]}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.npy")
+
+    def _entries(self) -> List[Tuple[str, os.stat_result]]:
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.npy'):
+                try:
+                    entries.append((name, os.stat(os.path.join(self.directory, name))))
+                except FileNotFoundError:
+                    continue  # Removed by another process
+        return entries
+
+    def load(self, key: str) -> Optional[np.ndarray]:
+        """Map a cached table read-only, or return None if it is not cached or unreadable."""
+        path = self._path(key)
+        try:
+            table = np.load(path, mmap_mode='r')
+            os.utime(path)  # Mark as recently used
+            return table
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable travel cache entry {path}: {e}")
+            self.invalidate(key)
+            return None
+
+    def store(self, key: str, table: np.ndarray) -> None:
+        """Write a table atomically, drop entries of its kind built for other road models and enforce the size limit."""
+        descriptor, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                np.save(file, np.ascontiguousarray(table))
+            os.replace(temp_path, self._path(key))
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        kind, fingerprint = key.split('-')[:2]
+        for name, _ in self._entries():
+            parts = name.split('-')
+            if len(parts) == 3 and parts[0] == kind and parts[1] != fingerprint:
+                self._remove(name)
+        self.evict()
+
+    def get_or_compute(self, key: str, compute: Callable[[], np.ndarray]) -> np.ndarray:
+        """Return the cached table for a key, computing and storing it first if needed."""
+        table = self.load(key)
+        if table is None:
+            table = compute()
+            self.store(key, table)
+            # Tables larger than the size limit are evicted straight away and stay in memory.
+            mapped = self.load(key)
+            if mapped is not None:
+                table = mapped
+        return table
+
+    def evict(self) -> None:
+        """Remove least recently used entries until the directory fits within the size limit."""
+        entries = sorted(self._entries(), key=lambda entry: entry[1].st_mtime)
+        total = sum(stat.st_size for _, stat in entries)
+        for name, stat in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(name)
+            total -= stat.st_size
+
+    def invalidate(self, key: str) -> None:
+        """Remove one cached table."""
+        self._remove(f"{key}.npy")
+
+    def clear(self) -> None:
+        """Remove all cached tables."""
+        for name, _ in self._entries():
+            self._remove(name)
+
+    def _remove(self, name: str) -> None:
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except FileNotFoundError:
+            pass
+
+    def __str__(self) -> str:
+        return f"TravelCache({self.directory}, {len(self._entries())} entries)"
+
+    __repr__ = __str__
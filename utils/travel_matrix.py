@@ -0,0 +1,101 @@
+"""
+Precomputed travel times for a problem instance.
+
+TravelMatrix snaps every distinct customer and contractor location to the road
+grid once and computes all pairwise travel times with NumPy, using the same road
+model as utils.travel_time.calculate_travel_minutes: from the start point to its
+nearest road intersection, along the roads to the destination's intersection,
+then to the destination. Lookups are O(1) by point index or by location, and
+batched lookups return arrays for vectorized scheduling code.
+
+A router such as utils.road_network.RoadNetwork can be passed to take travel times
+from a road graph instead; it must provide travel_matrix(points) and
+travel_minutes(start, end). With a utils.travel_cache.TravelCache the matrix is
+mapped from disk when an earlier run built it for the same points and road model.
+
+The matrix holds N x N int32 values for N distinct points (about 16 MB for
+2,000 points), so it is meant for one instance at a time.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from models.customer import Customer
+from models.contractor import Contractor
+from utils.travel_cache import TravelCache, grid_fingerprint
+from utils.travel_time import calculate_travel_minutes, snap_to_road_array
+
+class TravelMatrix:
+    """All-pairs travel times in whole minutes between the locations of a problem instance."""
+
+    def __init__(self, locations: Sequence[Tuple[int, int]], router: Optional[Any] = None,
+                 cache: Optional[TravelCache] = None):
+        self.router = router
+        self.locations: List[Tuple[int, int]] = []
+        self._index: Dict[Tuple[int, int], int] = {}
+        for location in locations:
+            location = tuple(location)
+            if location not in self._index:
+                self._index[location] = len(self.locations)
+                self.locations.append(location)
+
+        points = np.array(self.locations, dtype=np.int64).reshape(-1, 2)
+        if cache is not None:
+            fingerprint = router.fingerprint if router is not None else grid_fingerprint()
+            key = cache.key('road_matrix' if router is not None else 'matrix', fingerprint, points)
+            self.minutes: np.ndarray = cache.get_or_compute(key, lambda: self._build_minutes(points))
+        else:
+            self.minutes = self._build_minutes(points)
+
+    def _build_minutes(self, points: np.ndarray) -> np.ndarray:
+        if self.router is not None:
+            return np.asarray(self.router.travel_matrix(self.locations), dtype=np.int32)
+        return self._compute_minutes(points)
+
+    @classmethod
+    def from_problem(cls, customers: Sequence[Customer], contractors: Sequence[Contractor],
+                     router: Optional[Any] = None, cache: Optional[TravelCache] = None) -> 'TravelMatrix':
+        """Build the matrix for the contractors' starting locations and the customers' locations."""
+        return cls([contractor.initial_location for contractor in contractors] +
+                   [customer.location for customer in customers], router, cache)
+
+    @staticmethod
+    def _compute_minutes(points: np.ndarray) -> np.ndarray:
+        road_points = snap_to_road_array(points)
+        to_road = np.abs(points - road_points).sum(axis=1)
+        between_roads = (np.abs(road_points[:, None, 0] - road_points[None, :, 0]) +
+                         np.abs(road_points[:, None, 1] - road_points[None, :, 1]))
+        minutes = to_road[:, None] + between_roads + to_road[None, :]
+        np.fill_diagonal(minutes, 0)
+        return minutes.astype(np.int32)
+
+    def __len__(self) -> int:
+        return len(self.locations)
+
+    def __contains__(self, location: Tuple[int, int]) -> bool:
+        return location in self._index
+
+    def index_of(self, location: Tuple[int, int]) -> int:
+        """Point index of a location; raises KeyError for locations outside the instance."""
+        return self._index[location]
+
+    def minutes_between(self, start_index: int, end_index: int) -> int:
+        return self.minutes.item(start_index, end_index)
+
+    def travel_minutes(self, start: Tuple[int, int], end: Tuple[int, int]) -> int:
+        """Travel time between two locations, computed directly (or by the router) if either is not in the matrix."""
+        start_index = self._index.get(start)
+        end_index = self._index.get(end)
+        if start_index is None or end_index is None:
+            if self.router is not None:
+                return self.router.travel_minutes(start, end)
+            return calculate_travel_minutes(start, end)
+        return self.minutes.item(start_index, end_index)
+
+    def batch_minutes(self, start_indices: np.ndarray, end_index: int) -> np.ndarray:
+        """Travel times from many points to one point, as an array aligned with start_indices."""
+        return self.minutes[start_indices, end_index]
+
+    def __str__(self) -> str:
+        return f"TravelMatrix({len(self.locations)} points)"
+
+    __repr__ = __str__
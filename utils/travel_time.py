@@ -1,6 +1,17 @@
+"""
+Travel time model for the city of Busyville.
+
+A trip goes from the start point to its nearest road intersection, along the roads
+to the destination's nearest intersection, and on to the destination; 1 grid unit
+takes 1 minute. Scheduling code only needs durations, so calculate_travel_minutes
+and calculate_travel_minutes_batch compute them in closed form without building the
+route. calculate_route builds the route geometry on demand for visualization.
+"""
+
 from typing import Tuple
 from datetime import timedelta
 from functools import lru_cache
+import numpy as np
 
 @lru_cache(maxsize=1000)
 def get_nearest_road_point(point: Tuple[int, int]) -> Tuple[int, int]:
@@ -13,18 +24,60 @@ def get_nearest_road_point(point: Tuple[int, int]) -> Tuple[int, int]:
     x, y = point
     return (round(x / 10) * 10, round(y / 10) * 10)
 
-@lru_cache(maxsize=10000)
-def calculate_travel_time(start: Tuple[int, int], end: Tuple[int, int]) -> Tuple[timedelta, Tuple[Tuple[int, int], ...]]:
+def snap_to_road_array(points: np.ndarray) -> np.ndarray:
+    """
+    Vectorized get_nearest_road_point for an (N, 2) array of points.
+
+    :param points: np.ndarray of shape (N, 2)
+    :return: np.ndarray of shape (N, 2) with the nearest road point of each point
+    """
+    # np.round rounds halves to even, like the built-in round.
+    return (np.round(np.asarray(points) / 10) * 10).astype(np.int64)
+
+@lru_cache(maxsize=100000)
+def calculate_travel_minutes(start: Tuple[int, int], end: Tuple[int, int]) -> int:
     """
-    Calculate the travel time between two points along the city roads.
-    Assume 1 grid unit = 1 minute.
+    Calculate the travel time in minutes between two points along the city roads.
     
     :param start: Tuple[int, int] representing the starting point
     :param end: Tuple[int, int] representing the ending point
-    :return: Tuple[timedelta, Tuple[Tuple[int, int], ...]] representing (travel_time, route)
+    :return: int travel time in minutes
+    """
+    if start == end:
+        return 0
+    start_road = get_nearest_road_point(start)
+    end_road = get_nearest_road_point(end)
+    return (abs(start[0] - start_road[0]) + abs(start[1] - start_road[1]) +
+            abs(start_road[0] - end_road[0]) + abs(start_road[1] - end_road[1]) +
+            abs(end_road[0] - end[0]) + abs(end_road[1] - end[1]))
+
+def calculate_travel_minutes_batch(starts: np.ndarray, end: Tuple[int, int]) -> np.ndarray:
+    """
+    Calculate the travel times in minutes from many points to one point.
+    
+    :param starts: np.ndarray of shape (N, 2) with the starting points
+    :param end: Tuple[int, int] representing the ending point
+    :return: np.ndarray of N travel times in minutes
+    """
+    starts = np.asarray(starts, dtype=np.int64).reshape(-1, 2)
+    end_point = np.asarray(end, dtype=np.int64)
+    start_roads = snap_to_road_array(starts)
+    end_road = snap_to_road_array(end_point)
+    minutes = (np.abs(starts - start_roads).sum(axis=1) + np.abs(start_roads - end_road).sum(axis=1) +
+               np.abs(end_road - end_point).sum())
+    minutes[(starts == end_point).all(axis=1)] = 0
+    return minutes
+
+def calculate_route(start: Tuple[int, int], end: Tuple[int, int]) -> Tuple[Tuple[int, int], ...]:
+    """
+    Build the route between two points along the city roads.
+    
+    :param start: Tuple[int, int] representing the starting point
+    :param end: Tuple[int, int] representing the ending point
+    :return: Tuple[Tuple[int, int], ...] with the points of the route
     """
     if start == end:
-        return timedelta(), (start,)
+        return (start,)
     
     route = [start]
     
@@ -48,8 +101,15 @@ def calculate_travel_time(start: Tuple[int, int], end: Tuple[int, int]) -> Tuple
     if end != end_road:
         route.append(end)
     
-    # Calculate total travel time
-    travel_time_minutes = sum(abs(p2[0] - p1[0]) + abs(p2[1] - p1[1]) for p1, p2 in zip(route, route[1:]))
-    
-    return timedelta(minutes=travel_time_minutes), tuple(route)
+    return tuple(route)
 
+def calculate_travel_time(start: Tuple[int, int], end: Tuple[int, int]) -> Tuple[timedelta, Tuple[Tuple[int, int], ...]]:
+    """
+    Calculate the travel time and route between two points along the city roads.
+    Prefer calculate_travel_minutes when the route is not needed.
+    
+    :param start: Tuple[int, int] representing the starting point
+    :param end: Tuple[int, int] representing the ending point
+    :return: Tuple[timedelta, Tuple[Tuple[int, int], ...]] representing (travel_time, route)
+    """
+    return timedelta(minutes=calculate_travel_minutes(start, end)), calculate_route(start, end)
@@ -0,0 +1,43 @@
+"""
+Undo log for transactional changes to schedules and calendars.
+
+Objects that take part in a transaction record, for each mutation, a callable that
+reverts it. A savepoint is a position in the log; rolling back to it calls the
+recorded callables in reverse order. Applying and reverting a tentative change
+therefore costs time proportional to the entries it changed, not a copy of the
+whole schedule.
+"""
+
+from typing import Callable, List
+
+class UndoLog:
+    def __init__(self):
+        self._entries: List[Callable[[], None]] = []
+
+    def record(self, undo: Callable[[], None]) -> None:
+        """Record how to revert a mutation that has just been made."""
+        self._entries.append(undo)
+
+    def savepoint(self) -> int:
+        return len(self._entries)
+
+    def rollback(self, savepoint: int = 0) -> int:
+        """
+        Revert every mutation recorded after the savepoint, newest first.
+
+        Returns:
+            int: The number of mutations reverted.
+        """
+        if not 0 <= savepoint <= len(self._entries):
+            raise ValueError(f"Unknown savepoint {savepoint}")
+        reverted = len(self._entries) - savepoint
+        while len(self._entries) > savepoint:
+            self._entries.pop()()
+        return reverted
+
+    def clear(self) -> None:
+        """Forget the recorded mutations, keeping the current state."""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
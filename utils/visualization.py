@@ -8,7 +8,7 @@ from models.customer import Customer
 from models.contractor import Contractor
 from models.contractor_calendar import ErrandAssignment
 from utils.city_map import GRID_SIZE, create_city_grid
-from utils.travel_time import calculate_travel_time
+from utils.travel_time import calculate_route
 from datetime import date, datetime
 import logging
 
@@ -44,7 +44,7 @@ def visualize_schedule(schedule: Schedule, ax_or_filename: Union[Axes, str, None
     ax.scatter([loc[0] for loc in contractor_locations], [loc[1] for loc in contractor_locations], 
                color='red', label='Contractors', s=150, marker='s', zorder=3)
     
-    # Plot routes using the exact path from calculate_travel_time
+    # Plot routes using the exact path from calculate_route
     contractor_colors: np.ndarray = plt.cm.Set1(np.linspace(0, 1, len(schedule.contractors)))
     
     # Group assignments by day
@@ -73,7 +73,7 @@ def visualize_schedule(schedule: Schedule, ax_or_filename: Union[Axes, str, None
             
             for i in range(len(route) - 1):
                 start, end = route[i], route[i+1]
-                _, path = calculate_travel_time(start, end)
+                path = calculate_route(start, end)
                 
                 path_x, path_y = zip(*path)
                 offset: float = 0.15  # Add a slight offset to make routes more visible